@@ -0,0 +1,306 @@
+"""Headless benchmarks for the tracking -> canvas -> database pipeline.
+
+Runs without a display or camera and reports per-operation latency
+percentiles, throughput and peak RSS, optionally checked against a stored
+baseline:
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --segments 100000
+    python benchmarks/bench_pipeline.py --save-baseline
+    python benchmarks/bench_pipeline.py --check --tolerance 0.5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# resource is Unix only; on Windows peak RSS comes from psutil if installed,
+# else from tracemalloc, which counts Python allocations only and slows
+# every operation, so timings are then not comparable with the baseline
+try:
+    import resource
+except ImportError:
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+if resource is None and psutil is None:
+    tracemalloc.start()
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from canvas import Canvas
+from stroke import rasterize_actions
+from restore import restore_session
+from database import Database
+from hand_tracking import HandTracker
+from gestures import GestureController
+from recording import load_recording, replay_frame
+from filters import make_tip_filter
+from frame_source import SyntheticSource, open_source
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+class Point:
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x, y, z):
+        self.x, self.y, self.z = x, y, z
+
+
+class LandmarkList:
+    """Minimal stand-in for a MediaPipe NormalizedLandmarkList"""
+
+    def __init__(self, positions):
+        self.landmark = [Point(*p) for p in positions]
+
+
+def synthetic_hands(count, seed=0):
+    """Random but plausible (count, 21, 3) landmark arrays"""
+    rng = np.random.default_rng(seed)
+    hands = rng.uniform(0.3, 0.7, size=(count, 21, 3)).astype(np.float32)
+    hands[..., 2] *= 0.1
+    return hands
+
+
+def synthetic_path(count, seed=0):
+    """Smooth random walk of normalized points, like a fingertip"""
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, 0.01, size=(count, 2))
+    return 0.1 + 0.8 * np.abs(((0.5 + np.cumsum(steps, axis=0)) % 2) - 1)
+
+
+def peak_rss_kb():
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KB on Linux and bytes on macOS
+        return usage // 1024 if sys.platform == 'darwin' else usage
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        # peak_wset is the peak working set on Windows
+        return getattr(info, 'peak_wset', info.rss) // 1024
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return tracemalloc.get_traced_memory()[1] // 1024
+
+
+def measure(name, operation, items):
+    """Time operation(item) for every item and summarize the latencies"""
+    latencies = np.empty(len(items))
+    clock = time.perf_counter
+    start = clock()
+    for i, item in enumerate(items):
+        t0 = clock()
+        operation(item)
+        latencies[i] = clock() - t0
+    elapsed = clock() - start
+
+    micros = latencies * 1e6
+    return {
+        'name': name,
+        'count': len(items),
+        'p50_us': float(np.percentile(micros, 50)),
+        'p95_us': float(np.percentile(micros, 95)),
+        'p99_us': float(np.percentile(micros, 99)),
+        'max_us': float(micros.max()),
+        'ops_per_s': len(items) / elapsed if elapsed else float('inf'),
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def bench_gestures(hands):
+    tracker = HandTracker()
+    landmark_lists = [LandmarkList(h) for h in hands]
+    results = [measure('recognize_gesture', tracker.recognize_gesture, landmark_lists)]
+
+    batches = [hands[i:i + 256] for i in range(0, len(hands), 256)]
+    batch_tracker = HandTracker(gesture_cache_size=0)
+    results.append(measure('classify_gestures[256]', batch_tracker.classify_gestures, batches))
+    return results
+
+
+def stroke_points(path, stroke_length):
+    """Yield (point, pen_up) pairs that split the path into strokes"""
+    for i, point in enumerate(path):
+        yield point, (i + 1) % stroke_length == 0
+
+
+def bench_canvas(path, db=None, stroke_length=50, label=''):
+    canvas = Canvas(db=db)
+    suffix = f'[{label}]' if label else ''
+
+    def draw(item):
+        point, pen_up = item
+        canvas.draw(point)
+        if pen_up:
+            canvas.reset_previous_points()
+
+    def erase(item):
+        point, pen_up = item
+        canvas.erase(point)
+        if pen_up:
+            canvas.reset_previous_points()
+
+    results = [measure('Canvas.draw' + suffix, draw, list(stroke_points(path, stroke_length)))]
+    results.append(measure('Canvas.erase' + suffix, erase, list(stroke_points(path[::-1], stroke_length))))
+    canvas.reset_previous_points()
+
+    undo_count = min(len(canvas.history), 200)
+    results.append(measure('Canvas.undo' + suffix, lambda _: canvas.undo(), range(undo_count)))
+    return results
+
+
+def bench_database(db, count):
+    points = [[(i, i), (i + 1, i + 1)] for i in range(count)]
+    results = [measure('Database.save_action', lambda p: db.save_action('draw', p, (0, 0, 0)), points)]
+    results.append(measure('Database.flush', lambda _: db.flush(), range(1)))
+    return results
+
+
+def bench_restore(db, repeat=5):
+    """Time the startup restore of the logged session, from its newest keyframe
+    and as a full replay of every action in it"""
+    arrays = db.get_action_arrays(session_id=db.session_id)
+    blank = np.full((480, 640, 3), 255, dtype=np.uint8)
+    results = [measure('restore_session', lambda _: restore_session(db, 640, 480), range(repeat))]
+    results.append(measure('rasterize_actions[session]',
+                           lambda _: rasterize_actions(blank.copy(), arrays), range(repeat)))
+    return results
+
+
+def bench_replay(recording_file):
+    """Time every frame of a landmark recording replayed through the gesture controller"""
+    records = load_recording(recording_file)
+    controller = GestureController(Canvas())
+    tip_filter = make_tip_filter()
+    return [measure('replay frame', lambda rec: replay_frame(rec, controller, tip_filter), records)]
+
+
+def bench_frames(source, frames):
+    """Time reading and hand tracking for frames from a FrameSource, as the pipeline does"""
+    tracker = HandTracker()
+    captured = []
+
+    def read(_):
+        ret, timestamp, frame = source.read()
+        if ret:
+            captured.append(frame)
+
+    with source:
+        results = [measure(f'{type(source).__name__}.read', read, range(frames))]
+    if captured:
+        results.append(measure('detect_hands', tracker.detect_hands, captured))
+    return results
+
+
+def run_suite(segments=20000, hands=5000, landmarks_file=None, recording_file=None,
+              source=None, frames=100):
+    """Run every benchmark and return the list of result dicts"""
+    results = []
+
+    if recording_file:
+        records = load_recording(recording_file)
+        hand_arrays = np.asarray(records['landmarks'][records['has_hand'] == 1])
+    elif landmarks_file:
+        hand_arrays = np.load(landmarks_file)
+    else:
+        hand_arrays = synthetic_hands(hands)
+    results.extend(bench_gestures(hand_arrays))
+
+    if recording_file:
+        results.extend(bench_replay(recording_file))
+
+    path = synthetic_path(segments)
+    results.extend(bench_canvas(path))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = Database(os.path.join(tmpdir, 'bench.db'))
+        try:
+            results.extend(bench_canvas(path, db=db, label='db'))
+            results.extend(bench_restore(db))
+            results.extend(bench_database(db, min(segments, 20000)))
+        finally:
+            db.close()
+
+    # Last: peak RSS is process-wide and loading MediaPipe raises it for
+    # every operation measured afterwards, whether or not frames are run
+    if frames:
+        results.extend(bench_frames(source or SyntheticSource(frame_count=frames), frames))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return (name, metric, value, reference) for every regression beyond tolerance"""
+    reference = {r['name']: r for r in baseline}
+    regressions = []
+    for result in results:
+        ref = reference.get(result['name'])
+        if ref is None:
+            continue
+        for metric in ('p95_us', 'p99_us'):
+            if result[metric] > ref[metric] * (1 + tolerance):
+                regressions.append((result['name'], metric, result[metric], ref[metric]))
+        if result['peak_rss_kb'] > ref['peak_rss_kb'] * (1 + tolerance):
+            regressions.append((result['name'], 'peak_rss_kb', result['peak_rss_kb'], ref['peak_rss_kb']))
+    return regressions
+
+
+def print_report(results):
+    print(f"{'operation':32} {'count':>8} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} "
+          f"{'ops/s':>12} {'rss MB':>8}")
+    for r in results:
+        print(f"{r['name']:32} {r['count']:8d} {r['p50_us']:10.1f} {r['p95_us']:10.1f} {r['p99_us']:10.1f} "
+              f"{r['ops_per_s']:12.0f} {r['peak_rss_kb'] / 1024:8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', type=int, default=20000,
+                        help='points drawn and erased per canvas run (use 100000 for a long session)')
+    parser.add_argument('--hands', type=int, default=5000, help='synthetic hands to classify')
+    parser.add_argument('--landmarks', help='.npy file of recorded (N, 21, 3) landmarks to classify')
+    parser.add_argument('--recording', help='.dwrec landmark recording to classify and replay')
+    parser.add_argument('--source', default='synthetic',
+                        help="frames for the tracking benchmark: 'synthetic', a video file or an image folder")
+    parser.add_argument('--frames', type=int, default=100, help='frames to read and track (0 to skip)')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--check', action='store_true', help='exit non-zero on regressions against the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative slowdown before a result counts as a regression')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.segments, args.hands, args.landmarks, args.recording,
+                        open_source(args.source, realtime=False), args.frames)
+    print_report(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"[BENCH] Baseline saved to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, metric, value, ref in regressions:
+            print(f"[REGRESSION] {name} {metric}: {value:.1f} (baseline {ref:.1f})")
+        if args.check and regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+import threading
+import time
+
+from frame_source import CameraSource, open_checked
+
+
+class CameraInfo:
+    """Last known state of one camera index"""
+    __slots__ = ('index', 'width', 'height', 'fps', 'available', 'last_success', 'checked_at')
+
+    def __init__(self, index, width=None, height=None, fps=None, available=False,
+                 last_success=None, checked_at=None):
+        self.index = index
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.available = available
+        self.last_success = last_success
+        self.checked_at = checked_at
+
+    def __repr__(self):
+        state = f"{self.width}x{self.height} @ {self.fps or 0:g} fps" if self.available else "unavailable"
+        return f"CameraInfo({self.index}, {state})"
+
+
+def probe_camera(index):
+    """Open a camera, read one frame and report what it delivered"""
+    source = open_checked(CameraSource(index))
+    if source is None:
+        return None
+    try:
+        width, height = source.resolution
+        return width, height, source.fps
+    finally:
+        source.release()
+
+
+class CameraRegistry:
+    """Cached, concurrently probed list of working cameras.
+
+    Probe results are kept in the ``cameras`` table so the painter starts
+    from what worked last time instead of opening every index. ``probe``
+    checks all indices at once, one daemon thread per device so a driver
+    that hangs only costs ``timeout`` seconds and cannot block exit;
+    ``revalidate_async`` does the same in the background.
+    """
+
+    def __init__(self, db=None, max_index=4, timeout=3.0, max_age=24 * 3600, probe=probe_camera):
+        self.db = db
+        self.max_index = max_index
+        self.timeout = timeout
+        self.max_age = max_age
+        self._probe = probe
+        self._lock = threading.Lock()
+        self._revalidation = None
+        self.cameras = {}
+        if db is not None:
+            for row in db.get_cameras():
+                self.cameras[row['camera_index']] = CameraInfo(
+                    row['camera_index'], row['width'], row['height'], row['fps'],
+                    row['available'], row['last_success'], row['checked_at'])
+
+    def available(self):
+        """Indices of the cameras that worked when last checked"""
+        with self._lock:
+            return sorted(i for i, info in self.cameras.items() if info.available)
+
+    def get(self, index):
+        with self._lock:
+            return self.cameras.get(index)
+
+    def next_camera(self, current):
+        """The available camera after ``current``, wrapping around, or None"""
+        others = [i for i in self.available() if i != current]
+        if not others:
+            return None
+        later = [i for i in others if i > current]
+        return later[0] if later else others[0]
+
+    def is_stale(self):
+        """True when nothing is cached or the oldest check is older than max_age"""
+        with self._lock:
+            if not self.cameras:
+                return True
+            oldest = min(info.checked_at or 0 for info in self.cameras.values())
+        return time.time() - oldest > self.max_age
+
+    def probe(self, indices=None, skip=()):
+        """Check the given indices (all by default) concurrently and cache the results.
+
+        Indices in ``skip`` are left alone, e.g. the camera that is open right
+        now. A device that has not answered within ``timeout`` is recorded as
+        unavailable. Returns the available indices.
+        """
+        if indices is None:
+            indices = range(self.max_index + 1)
+        indices = [i for i in indices if i not in skip]
+        results = {}
+
+        def run(index):
+            try:
+                results[index] = self._probe(index)
+            except Exception as e:
+                print(f"[WARNING] Error checking camera {index}: {e}")
+                results[index] = None
+
+        threads = [threading.Thread(target=run, args=(i,), daemon=True) for i in indices]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + self.timeout
+        for thread in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+
+        for index in indices:
+            found = results.get(index)
+            if index not in results:
+                print(f"[WARNING] Camera {index} did not answer within {self.timeout:g}s")
+            if found is None:
+                self.mark_failure(index)
+            else:
+                self.mark_success(index, *found)
+        return self.available()
+
+    def revalidate_async(self, skip=(), force=False):
+        """Re-probe in a background thread when the cache is stale (or forced)"""
+        if not force and not self.is_stale():
+            return None
+        if self._revalidation is not None and self._revalidation.is_alive():
+            return self._revalidation
+        self._revalidation = threading.Thread(target=self.probe, kwargs={'skip': set(skip)}, daemon=True)
+        self._revalidation.start()
+        return self._revalidation
+
+    def mark_success(self, index, width=None, height=None, fps=None):
+        """Record that a camera delivered frames, e.g. after the painter opened it"""
+        now = time.time()
+        with self._lock:
+            info = self.cameras.get(index) or CameraInfo(index)
+            if width:
+                info.width, info.height = width, height
+            if fps:
+                info.fps = fps
+            info.available = True
+            info.last_success = info.checked_at = now
+            self.cameras[index] = info
+        self._save(info)
+
+    def mark_failure(self, index):
+        with self._lock:
+            info = self.cameras.get(index) or CameraInfo(index)
+            info.available = False
+            info.checked_at = time.time()
+            self.cameras[index] = info
+        self._save(info)
+
+    def _save(self, info):
+        if self.db is not None:
+            self.db.save_camera(info.index, info.width, info.height, info.fps,
+                                info.available, info.last_success, info.checked_at)
@@ -1,105 +1,200 @@
-import cv2
 import numpy as np
 from PIL import Image
 from database import Database
+from history import TileHistory
+from keyframes import KeyframeIndex
+from stroke import Stroke, ERASE_COLOR, iter_strokes, rasterize_actions
+from profiler import profiler
+from tiled_canvas import TileStore, Viewport, rasterize_stroke, replay_strokes
+
+# Smoothed strokes get an interpolated point about every SPLINE_STEP pixels
+SPLINE_STEP = 4
+SPLINE_MAX_STEPS = 16
 
 class Canvas:
-    def __init__(self, width=640, height=480, db=None):
+    def __init__(self, width=640, height=480, db=None, history_budget=32 * 1024 * 1024,
+                 tiled=False, tile_size=256, tile_file=None, smoothing=False):
+        """With ``tiled`` the pixels live in a sparse TileStore (memory-mapped to
+        ``tile_file`` if given) and normalized points map through ``viewport``."""
         self.width = width
         self.height = height
-        self.canvas = np.ones((height, width, 3), dtype=np.uint8) * 255
+        self.tiled = tiled
+        if tiled:
+            self.canvas = TileStore(width, height, tile_size, path=tile_file)
+            self.viewport = Viewport(width, height)
+        else:
+            self.canvas = np.ones((height, width, 3), dtype=np.uint8) * 255
+            self.viewport = None
         self.previous_point_gesture = None
         self.previous_point_erase = None
         self.brush_size = 10
         self.color = (0, 0, 0)
-        self.history = []
-        self.redo_stack = []
+        self.history = TileHistory(memory_budget=history_budget)
+        self.redo_stack = self.history.redo_stack
         self.cursor_position = (0, 0)
-        self.history_limit = 1  
         self.db = db
+        self.keyframes = KeyframeIndex(db)
+        if db:
+            db.open_session(width, height)
+        self.stroke = None
+        self._raw_points = []
+        self._flushed = 0
+        # Catmull-Rom interpolation between input points
+        self.smoothing = smoothing
+        self.damage = None
         
     def set_cursor_position(self, x, y):
-        self.cursor_position = (int(x * self.width), int(y * self.height))
-
-    def draw_cursor(self):
-        temp_canvas = self.canvas.copy()
-        
-        cv2.circle(temp_canvas, self.cursor_position, 5, (0, 120, 255), -1)  
-        
-        if not hasattr(self, '_cursor_pulse_value'):
-            self._cursor_pulse_value = 0
-        if not hasattr(self, '_cursor_pulse_direction'):
-            self._cursor_pulse_direction = 1
-            
-        
-        self._cursor_pulse_value += 0.5 * self._cursor_pulse_direction
-        if self._cursor_pulse_value >= 10 or self._cursor_pulse_value <= 0:
-            self._cursor_pulse_direction *= -1  
-        
-        outer_radius = 8 + int(self._cursor_pulse_value)
-        cv2.circle(temp_canvas, self.cursor_position, outer_radius, (0, 165, 255), 2)  
-        
-       
-        crosshair_size = 8
-        x, y = self.cursor_position
-        cv2.line(temp_canvas, (x - crosshair_size, y), (x + crosshair_size, y), (0, 165, 255), 1)
-        cv2.line(temp_canvas, (x, y - crosshair_size), (x, y + crosshair_size), (0, 165, 255), 1)
-        
-        if hasattr(self, '_cursor_mode'):
-            mode_text = self._cursor_mode
-            cv2.putText(temp_canvas, mode_text, 
-                       (self.cursor_position[0] + 15, self.cursor_position[1] - 15), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 120, 255), 2)
-        
-        return temp_canvas 
+        self.cursor_position = self.to_pixel((x, y))
 
+    def to_pixel(self, point):
+        """Map a normalized (0..1) point to canvas pixels, through the viewport if any"""
+        if self.viewport is not None:
+            return self.viewport.to_canvas(point[0], point[1])
+        return (int(point[0] * self.width), int(point[1] * self.height))
 
     def draw(self, current_point, color=None):
-        current_point = (int(current_point[0] * self.width), int(current_point[1] * self.height))
+        self.queue_point(current_point, "draw")
+        self.flush_input()
 
-        if self.previous_point_gesture is None:
-            self.previous_point_gesture = current_point
-            return
+    def erase(self, current_point, width=None):
+        """Sweep the eraser disc from the previous erase position to this one.
 
-        if self.previous_point_gesture != current_point:
-            cv2.line(self.canvas, self.previous_point_gesture, current_point, self.color, self.brush_size)
+        Successive calls extend one erase stroke, so a whole erase gesture is a
+        single history entry and log record. ``width`` is the disc diameter in
+        canvas pixels, brush_size + 10 by default.
+        """
+        self.queue_point(current_point, "erase", width)
+        self.flush_input()
 
-            if self.db:
-                self.db.save_action("draw", [self.previous_point_gesture, current_point], self.color)
+    def queue_point(self, current_point, tool="draw", width=None):
+        """Buffer a pointer sample without drawing it; the next flush_input() does.
 
-            self.history.append(self.canvas.copy())
-            self.redo_stack.clear()
+        Lets fast input such as mouse moves pile up between display frames
+        and be rasterized as one polyline.
+        """
+        current_point = self.to_pixel(current_point)
+        if tool == "erase":
+            width = int(width or self.brush_size + 10)
+            if self.stroke is None or self.stroke.tool != "erase" or self.stroke.width != width:
+                self._begin_stroke("erase", ERASE_COLOR, width)
+            self.previous_point_erase = current_point
+        else:
+            if self.stroke is None or self.stroke.tool != "draw":
+                self._begin_stroke("draw", self.color, self.brush_size)
             self.previous_point_gesture = current_point
-    
 
+        raw = self._raw_points
+        if raw and raw[-1] == current_point:
+            return
+        raw.append(current_point)
+        if not self.smoothing:
+            self.stroke.add_point(current_point)
+            del raw[:-1]
+        elif len(raw) == 1:
+            self.stroke.add_point(current_point)
+        elif len(raw) >= 3:
+            # A Catmull-Rom segment needs the points on both sides of it
+            self._add_spline(raw[-4] if len(raw) > 3 else raw[0], raw[-3], raw[-2], raw[-1])
+            del raw[:-3]
 
-    def erase(self, current_point):
-        current_point = (int(current_point[0] * self.width), int(current_point[1] * self.height))
+    def _add_spline(self, p0, p1, p2, p3):
+        """Append the Catmull-Rom curve from p1 to p2 to the open stroke"""
+        steps = min(SPLINE_MAX_STEPS, max(1, int(np.hypot(p2[0] - p1[0], p2[1] - p1[1]) / SPLINE_STEP)))
+        for i in range(1, steps):
+            t = i / steps
+            t2, t3 = t * t, t * t * t
+            point = tuple(int(round(0.5 * (2 * b + (c - a) * t + (2 * a - 5 * b + 4 * c - d) * t2
+                                             + (3 * b - a - 3 * c + d) * t3)))
+                          for a, b, c, d in zip(p0, p1, p2, p3))
+            if point != self.stroke.last_point():
+                self.stroke.add_point(point)
+        if p2 != self.stroke.last_point():
+            self.stroke.add_point(p2)
 
-        if self.previous_point_erase is None:
-            self.previous_point_erase = current_point
-            cv2.circle(self.canvas, current_point, self.brush_size + 5, (255, 255, 255), -1)
-            
-            if self.db:
-                self.db.save_action("erase", [current_point, current_point], (255, 255, 255))
-                
-            self.history.append(self.canvas.copy())
+    def flush_input(self):
+        """Rasterize the points queued since the last flush as a single polyline,
+        with one history touch and one damage update for the whole batch"""
+        stroke = self.stroke
+        if stroke is None:
+            return
+        start, end = self._flushed, len(stroke)
+        if end <= start:
+            return
+        self._flushed = end
+        if stroke.tool == "draw" and end < 2:
             return
+        box = stroke.bounds(start)
+        with profiler.stage('history.touch'):
+            self.history.touch(self.canvas, *box)
+        self._add_damage(box)
+        with profiler.stage('Canvas.draw'):
+            self._rasterize(stroke, start)
 
-        if self.previous_point_erase != current_point:
-            cv2.line(self.canvas, self.previous_point_erase, current_point, (255, 255, 255), self.brush_size + 10)
+    def _begin_stroke(self, tool, color, width):
+        """Pen-down: end any open stroke and start collecting a new one"""
+        self.end_stroke()
+        self.stroke = Stroke(tool, color, width)
+        self._raw_points = []
+        self._flushed = 0
+        self.history.begin()
 
-            if self.db:
-                self.db.save_action("erase", [self.previous_point_erase, current_point], (255, 255, 255))
+    def _rasterize(self, stroke, start=0, end=None):
+        """Draw a stroke onto the pixels; tiled canvases go through a dense scratch region"""
+        if not self.tiled:
+            stroke.rasterize(self.canvas, start, end=end)
+            return
+        rasterize_stroke(self.canvas, stroke, start, end)
 
-            self.history.append(self.canvas.copy())
-            self.redo_stack.clear()
-        
-        self.previous_point_erase = current_point
+    def _add_damage(self, box):
+        """Grow the pending damage rectangle (inclusive x0, y0, x1, y1) by box"""
+        x0, y0 = max(0, box[0]), max(0, box[1])
+        x1, y1 = min(self.width - 1, box[2]), min(self.height - 1, box[3])
+        if x0 > x1 or y0 > y1:
+            return
+        if self.damage is not None:
+            x0, y0 = min(x0, self.damage[0]), min(y0, self.damage[1])
+            x1, y1 = max(x1, self.damage[2]), max(y1, self.damage[3])
+        self.damage = (x0, y0, x1, y1)
+
+    def _damage_all(self):
+        self._add_damage((0, 0, self.width - 1, self.height - 1))
+
+    def take_damage(self):
+        """Return the box changed since the last call, or None, and reset it"""
+        damage, self.damage = self.damage, None
+        return damage
+
+    def end_stroke(self):
+        """Pen-up: log the open stroke as one action and one history entry"""
+        if self.stroke is None:
+            return
+        raw = self._raw_points
+        if self.smoothing and len(raw) >= 2:
+            self._add_spline(raw[-3] if len(raw) >= 3 else raw[-2], raw[-2], raw[-1], raw[-1])
+        self.flush_input()
+        stroke, self.stroke = self.stroke, None
+        if stroke.tool == "draw" and len(stroke) < 2:
+            self.history.discard()
+            return
+
+        stroke.finish()
+        self._log(stroke)
+        with profiler.stage('history.commit'):
+            self.history.commit(self.canvas, action=stroke)
+
+    def _log(self, stroke):
+        if self.db:
+            with profiler.stage('Database.save_action'):
+                action_id = self.db.save_stroke(stroke)
+            # Full-raster keyframes are only worth it for dense canvases
+            if not self.tiled:
+                with profiler.stage('keyframes.capture'):
+                    self.keyframes.capture(action_id, self.canvas)
         
 
 
     def reset_previous_points(self):
+        self.end_stroke()
         self.previous_point_gesture = None
         self.previous_point_erase = None
 
@@ -109,20 +204,28 @@ class Canvas:
     def change_brush_size(self, new_size):
         self.brush_size = new_size
 
-    def save(self, file_path):
-        image = Image.fromarray(self.canvas)
-        image.save(file_path)
-
-        
     def clear(self):
-        self.canvas = np.ones((self.height, self.width, 3), dtype=np.uint8) * 255
-        self.history = []
-        self.redo_stack = []
+        # start_session logs the open stroke, so the closed session's log matches its snapshot
+        self.start_session('clear')
+        self.canvas[:] = 255
+        self._damage_all()
+
+    def start_session(self, reason):
+        """Close the logged session and open a new one that undo and replay stop at.
+
+        The current raster is kept as the closed session's snapshot. After a
+        'save' the new session continues from it; after a 'clear' it starts blank.
+        """
         self.reset_previous_points()
+        self.history.clear()
+        self.keyframes.clear()
+        if self.db:
+            self.db.start_session(self.width, self.height, reason, snapshot=self.canvas,
+                                  continue_from_snapshot=reason != 'clear')
         
     def save(self, file_path):
         try:
-            image = Image.fromarray(self.canvas)
+            image = Image.fromarray(self.to_array())
             image.save(file_path)
             return True
         except Exception as e:
@@ -131,28 +234,85 @@ class Canvas:
         
         
     def undo(self):
+        self.reset_previous_points()
+        entry = self.history.undo(self.canvas)
+        if entry is not None:
+            self._add_damage(self.history.entry_bounds(entry))
+            if self.db:
+                action = self.db.undo_last_action()
+                if action:
+                    self.keyframes.invalidate_from(action['id'])
+            return
+
+        # The delta history was evicted or cleared; rebuild from the action log
         if self.db:
             action = self.db.undo_last_action()
             if action:
+                self.keyframes.invalidate_from(action['id'])
                 self.redraw_from_history()
 
+    def redo(self):
+        self.reset_previous_points()
+        entry = self.history.redo(self.canvas)
+        if entry is not None:
+            self._add_damage(self.history.entry_bounds(entry))
+            self._log(entry.action)
+
     def redraw_from_history(self):
-        self.canvas = np.ones((self.height, self.width, 3), dtype=np.uint8) * 255
+        """Rebuild the raster from the nearest keyframe, or the session's starting
+        raster, plus the session's actions logged after it"""
         self.history.clear()
-        self.redo_stack.clear()
 
-        actions = self.db.get_all_actions()
+        keyframe = self.keyframes.nearest()
+        if keyframe is not None and keyframe[1].shape == (self.height, self.width, 3):
+            keyframe_id, image = keyframe
+            self.canvas[:] = image
+            actions = self.db.get_actions_after(keyframe_id)
+        else:
+            tile_size = self.canvas.tile_size if self.tiled else None
+            base = self.db.get_session_base(self.db.session_id, tile_size)
+            if base is not None and base.shape == (self.height, self.width, 3):
+                if self.tiled:
+                    self.canvas.replace(base)
+                else:
+                    self.canvas[:] = base
+            else:
+                self.canvas[:] = 255
+            actions = self.db.get_session_actions(self.db.session_id)
+        self._damage_all()
+
         for act in actions:
             if act['action_type'] == 'draw' or act['action_type'] == 'erase':
-                pt1, pt2 = act['points']
-                color = tuple(act['color']) if act['color'] else (255, 255, 255)
-                cv2.line(self.canvas,
-                        (int(pt1[0]), int(pt1[1])),
-                        (int(pt2[0]), int(pt2[1])),
-                        color,
-                        self.brush_size if act['action_type'] == 'draw' else self.brush_size + 10)
-                self.history.append(self.canvas.copy())
+                default_width = self.brush_size if act['action_type'] == 'draw' else self.brush_size + 10
+                stroke = Stroke.from_action(act, default_width)
+                if not self.tiled:
+                    stroke.rasterize(self.canvas)
+                    continue
+                replay_strokes(self.canvas, [stroke])
         
 
+    def restore(self, image, last_id):
+        """Show a raster rebuilt in the background (see restore.SessionRestore)
+        that includes the session's actions up to last_id; anything logged
+        since is drawn over it. Tiled canvases take a TileStore."""
+        self.end_stroke()
+        # Keyframes captured before the restore landed hold the unrestored raster
+        self.keyframes.invalidate_from(last_id + 1)
+        self.history.clear()
+        tail = self.db.get_action_arrays(after_id=last_id, session_id=self.db.session_id) if self.db else None
+        if self.tiled:
+            self.canvas.replace(image)
+            if tail is not None:
+                replay_strokes(self.canvas, iter_strokes(tail))
+        else:
+            if tail is not None:
+                rasterize_actions(image, tail)
+            self.canvas[:] = image
+        self._damage_all()
+
     def get_canvas(self):
         return self.canvas
+
+    def to_array(self):
+        """The whole canvas as a dense (height, width, 3) array"""
+        return self.canvas.to_array() if self.tiled else self.canvas
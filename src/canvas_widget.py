@@ -1,6 +1,18 @@
+import time
 from PyQt5.QtWidgets import QWidget
-from PyQt5.QtGui import QPainter, QImage, QMouseEvent
-from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QPainter, QImage, QMouseEvent, QColor, QPen, QFont
+from PyQt5.QtCore import Qt, QRect, QRectF, QPoint, QTimer
+from profiler import profiler
+
+CURSOR_COLOR = QColor(0, 120, 255)
+CURSOR_RING_COLOR = QColor(0, 165, 255)
+CURSOR_PULSE_PERIOD = 4.0
+HUD_RECT = QRect(6, 6, 340, 190)
+HUD_LINE_HEIGHT = 14
+HUD_REFRESH_MS = 250
+ZOOM_STEP = 1.25
+# Mouse samples are queued and rasterized together about once per display frame
+INPUT_FLUSH_MS = 16
 
 class CanvasWidget(QWidget):
     def __init__(self, canvas, parent=None):
@@ -9,7 +21,17 @@ class CanvasWidget(QWidget):
         self.drawing = False
         self.last_pos = None
         self.mouse_mode = "erase"
-        self.current_display_canvas = None
+        self.cursor_pos = None
+        self.cursor_mode = None
+        self._image = None
+        self._image_buffer = None
+        self._pan_from = None
+        self._hud_timer = QTimer(self)
+        self._hud_timer.timeout.connect(lambda: self.update(HUD_RECT))
+        self._input_timer = QTimer(self)
+        self._input_timer.setSingleShot(True)
+        self._input_timer.setInterval(INPUT_FLUSH_MS)
+        self._input_timer.timeout.connect(self.flush_input)
 
     def set_drawing(self, status):
         self.drawing = status
@@ -18,46 +40,199 @@ class CanvasWidget(QWidget):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
         
-        canvas_data = self.current_display_canvas if self.current_display_canvas is not None else self.canvas.get_canvas()
-        
-        canvas_image = QImage(canvas_data.data,
-                              self.canvas.width,
-                              self.canvas.height,
-                              self.canvas.width * 3,
-                              QImage.Format_RGB888)
-        painter.drawImage(0, 0, canvas_image)
+        rect = event.rect()
+        with profiler.stage('paint.canvas'):
+            if self.canvas.viewport is not None:
+                self._paint_tiles(painter, rect)
+            else:
+                painter.drawImage(rect, self._canvas_image(), rect)
+
+        if self.cursor_pos is not None:
+            with profiler.stage('paint.cursor'):
+                self._paint_cursor(painter)
+
+        if profiler.hud and rect.intersects(HUD_RECT):
+            self._paint_hud(painter)
+
+    def _paint_tiles(self, painter, rect):
+        """Composite only the allocated tiles that fall inside the repainted rect"""
+        viewport = self.canvas.viewport
+        store = self.canvas.canvas
+        size = store.tile_size
+        zoom = viewport.zoom
+        painter.fillRect(rect, Qt.white)
+
+        left, top = viewport.to_view(0, 0)
+        painter.setClipRect(QRectF(left, top, self.canvas.width * zoom, self.canvas.height * zoom).intersected(QRectF(rect)))
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, zoom < 1)
+
+        x0 = max(0, int(viewport.x + rect.left() / zoom))
+        y0 = max(0, int(viewport.y + rect.top() / zoom))
+        x1 = min(self.canvas.width - 1, int(viewport.x + (rect.right() + 1) / zoom))
+        y1 = min(self.canvas.height - 1, int(viewport.y + (rect.bottom() + 1) / zoom))
+        for ty in range(y0 // size, y1 // size + 1):
+            for tx in range(x0 // size, x1 // size + 1):
+                tile = store.tiles.get((ty, tx))
+                if tile is None:
+                    continue
+                image = QImage(tile.data, size, size, size * 3, QImage.Format_RGB888)
+                vx, vy = viewport.to_view(tx * size, ty * size)
+                painter.drawImage(QRectF(vx, vy, size * zoom, size * zoom), image)
+        painter.setClipping(False)
+
+    def set_hud(self, visible):
+        """Show or hide the profiler overlay, refreshed a few times per second"""
+        profiler.hud = visible
+        if visible:
+            self._hud_timer.start(HUD_REFRESH_MS)
+        else:
+            self._hud_timer.stop()
+        self.update(HUD_RECT)
+
+    def _paint_hud(self, painter):
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(15, 23, 42, 220))
+        painter.drawRoundedRect(HUD_RECT, 6, 6)
+        painter.setPen(QColor(226, 232, 240))
+        painter.setFont(QFont("Consolas", 8))
+        max_lines = (HUD_RECT.height() - 8) // HUD_LINE_HEIGHT
+        for i, line in enumerate(profiler.hud_lines()[:max_lines]):
+            painter.drawText(HUD_RECT.left() + 8, HUD_RECT.top() + 16 + i * HUD_LINE_HEIGHT, line)
+
+    def _canvas_image(self):
+        """QImage view over the canvas buffer, rebuilt only when the buffer is replaced"""
+        canvas_data = self.canvas.get_canvas()
+        if canvas_data is not self._image_buffer:
+            self._image_buffer = canvas_data
+            self._image = QImage(canvas_data.data,
+                                 self.canvas.width,
+                                 self.canvas.height,
+                                 self.canvas.width * 3,
+                                 QImage.Format_RGB888)
+        return self._image
+
+    def refresh(self):
+        """Repaint only the part of the canvas changed since the last refresh"""
+        damage = self.canvas.take_damage()
+        if damage is not None:
+            x0, y0, x1, y1 = damage
+            viewport = self.canvas.viewport
+            if viewport is not None:
+                (x0, y0), (x1, y1) = viewport.to_view(x0, y0), viewport.to_view(x1 + 1, y1 + 1)
+                x0, y0, x1, y1 = int(x0), int(y0), int(x1) + 1, int(y1) + 1
+            self.update(QRect(x0, y0, x1 - x0 + 1, y1 - y0 + 1))
+
+    def _paint_cursor(self, painter):
+        """Draw the pulsing gesture cursor on top of the canvas image"""
+        x, y = self.cursor_pos
+        center = QPoint(x, y)
+
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(CURSOR_COLOR)
+        painter.drawEllipse(center, 5, 5)
+
+        # Triangle wave between 0 and 10 px, driven by the clock rather than the frame count
+        phase = (time.monotonic() % CURSOR_PULSE_PERIOD) / CURSOR_PULSE_PERIOD
+        pulse = 10 * (1 - abs(2 * phase - 1))
+        outer_radius = 8 + int(pulse)
+        painter.setBrush(Qt.NoBrush)
+        painter.setPen(QPen(CURSOR_RING_COLOR, 2))
+        painter.drawEllipse(center, outer_radius, outer_radius)
+
+        crosshair_size = 8
+        painter.setPen(QPen(CURSOR_RING_COLOR, 1))
+        painter.drawLine(x - crosshair_size, y, x + crosshair_size, y)
+        painter.drawLine(x, y - crosshair_size, x, y + crosshair_size)
+
+        if self.cursor_mode:
+            painter.setPen(CURSOR_COLOR)
+            painter.setFont(QFont("Segoe UI", 10, QFont.Bold))
+            painter.drawText(x + 15, y - 15, self.cursor_mode)
+
+    def _cursor_rect(self):
+        x, y = self.cursor_pos
+        return QRect(x - 20, y - 40, 160, 62)
+
+    def set_cursor(self, pos, mode=None):
+        """Move the overlay cursor to canvas pixel pos, repainting only around it"""
+        if self.cursor_pos is not None:
+            self.update(self._cursor_rect())
+        if self.canvas.viewport is not None:
+            pos = self.canvas.viewport.to_view(*pos)
+        self.cursor_pos = (int(pos[0]), int(pos[1]))
+        self.cursor_mode = mode
+        self.update(self._cursor_rect())
+
+    def hide_cursor(self):
+        if self.cursor_pos is not None:
+            self.update(self._cursor_rect())
+        self.cursor_pos = None
+
+    def resizeEvent(self, event):
+        if self.canvas.viewport is not None:
+            self.canvas.viewport.resize(self.width(), self.height())
+        super().resizeEvent(event)
+
+    def wheelEvent(self, event):
+        """Zoom a tiled canvas around the mouse position"""
+        if self.canvas.viewport is None:
+            return
+        steps = event.angleDelta().y() / 120
+        self.canvas.viewport.zoom_at(ZOOM_STEP ** steps, event.x(), event.y())
+        self.update()
+
+    def fit_view(self):
+        if self.canvas.viewport is not None:
+            self.canvas.viewport.fit()
+            self.update()
 
     def mousePressEvent(self, event: QMouseEvent):
+        if event.button() in (Qt.MiddleButton, Qt.RightButton) and self.canvas.viewport is not None:
+            self._pan_from = event.pos()
+            return
         if event.button() == Qt.LeftButton and self.parent().mode == "mouse":
             self.drawing = True
             self.last_pos = event.pos()
             self.canvas.reset_previous_points()
             self._perform_action(event)
-            self.update()
+            self.flush_input()
 
     def mouseMoveEvent(self, event: QMouseEvent):
+        if self._pan_from is not None:
+            delta = event.pos() - self._pan_from
+            self._pan_from = event.pos()
+            self.canvas.viewport.pan(delta.x(), delta.y())
+            self.update()
+            return
         if self.drawing and self.parent().mode == "mouse":
             current_pos = event.pos()
             self._perform_action(event)
             self.last_pos = current_pos
-            self.update()
+            if not self._input_timer.isActive():
+                self._input_timer.start()
 
     def mouseReleaseEvent(self, event: QMouseEvent):
+        if event.button() in (Qt.MiddleButton, Qt.RightButton):
+            self._pan_from = None
         if event.button() == Qt.LeftButton:
             self.drawing = False
             self.last_pos = None
-            
-    def update_canvas(self, canvas_data):
-        """Update the canvas with the provided canvas data (with cursor)"""
-        self.current_display_canvas = canvas_data
-        self.update()
+            self._input_timer.stop()
+            self.canvas.reset_previous_points()
+            self.refresh()
 
     
     def _perform_action(self, event):
-        norm_x = max(0, min(1, event.x() / self.canvas.width))
-        norm_y = max(0, min(1, event.y() / self.canvas.height))
+        viewport = self.canvas.viewport
+        view_width, view_height = (viewport.view_width, viewport.view_height) if viewport else (self.canvas.width, self.canvas.height)
+        norm_x = max(0, min(1, event.x() / view_width))
+        norm_y = max(0, min(1, event.y() / view_height))
         
-        if self.mouse_mode == "draw":
-            self.canvas.draw((norm_x, norm_y))
-        elif self.mouse_mode == "erase":
-            self.canvas.erase((norm_x, norm_y))
\ No newline at end of file
+        if self.mouse_mode in ("draw", "erase"):
+            self.canvas.queue_point((norm_x, norm_y), self.mouse_mode)
+
+    def flush_input(self):
+        """Rasterize the queued mouse samples and repaint what they changed"""
+        self._input_timer.stop()
+        self.canvas.flush_input()
+        self.refresh()
\ No newline at end of file
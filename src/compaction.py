@@ -0,0 +1,83 @@
+"""Background housekeeping that keeps the action log bounded.
+
+Ended sessions are folded into their raster snapshot: the actions and
+keyframes are deleted and only the snapshot and a little metadata remain.
+Sessions that ended without a snapshot (the app was closed mid-session, or
+the actions predate sessions) are rendered from their log first. Old
+compacted sessions are pruned and the file is vacuumed once enough of it
+is free pages.
+"""
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from stroke import rasterize_actions
+
+
+def render_session(db, session):
+    """Rasterize a session's actions on top of the raster it started from"""
+    image = db.get_session_base(session['id'])
+    if image is None or image.shape != (session['height'], session['width'], 3):
+        image = np.full((session['height'], session['width'], 3), 255, dtype=np.uint8)
+    rasterize_actions(image, db.get_action_arrays(session_id=session['id']))
+    return image
+
+
+class Compactor:
+    def __init__(self, db, keep_sessions=50, vacuum_ratio=0.25, vacuum_interval=24 * 3600):
+        self.db = db
+        self.keep_sessions = keep_sessions
+        self.vacuum_ratio = vacuum_ratio
+        self.vacuum_interval = vacuum_interval
+        self._thread = None
+
+    def run(self):
+        """Compact every ended session, prune old ones and vacuum if due.
+        Returns the number of sessions compacted."""
+        compacted = 0
+        for session_id in self.db.compactable_sessions():
+            session = self.db.get_session(session_id)
+            snapshot = None if session['has_snapshot'] else render_session(self.db, session)
+            count = self.db.compact_session(session_id, snapshot)
+            print(f"[COMPACT] Session {session_id}: {count} actions folded into a snapshot")
+            compacted += 1
+        pruned = self.db.prune_sessions(self.keep_sessions)
+        if pruned:
+            print(f"[COMPACT] Pruned {pruned} old sessions")
+        self.maybe_vacuum()
+        return compacted
+
+    def run_async(self):
+        """Run in a daemon thread unless a run is already in progress"""
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+        self._thread = threading.Thread(target=self._run_safely, name="Compactor", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def _run_safely(self):
+        try:
+            self.run()
+        except Exception as e:
+            print(f"[WARNING] Compaction failed: {e}")
+
+    def maybe_vacuum(self, force=False):
+        """VACUUM when at least vacuum_ratio of the file is free and the last
+        one is older than vacuum_interval; returns True if it ran"""
+        if not force:
+            last = float(self.db.get_setting('last_vacuum') or 0)
+            if time.time() - last < self.vacuum_interval:
+                return False
+            if self.db.free_space_ratio() < self.vacuum_ratio:
+                return False
+        try:
+            self.db.vacuum()
+        except sqlite3.OperationalError as e:
+            # Another connection is busy; the next run tries again
+            print(f"[WARNING] VACUUM skipped: {e}")
+            return False
+        self.db.save_setting('last_vacuum', time.time())
+        print("[COMPACT] Database vacuumed")
+        return True
@@ -1,17 +1,85 @@
 import sqlite3
 import json
+import time
+import zlib
+import numpy as np
 from datetime import datetime
+from journal import ActionJournal
+from tiled_canvas import TileStore
+
+# PRAGMA user_version of the current layout. Version 2 stores stroke points as
+# little-endian int16 (x, y) pairs and colors as 0xRRGGBB integers; files
+# from before that hold JSON text and are converted in place on open.
+# Version 3 groups actions into sessions.
+SCHEMA_VERSION = 3
+
+# Canvas size assumed for actions logged before sessions recorded one
+LEGACY_CANVAS_SIZE = (640, 480)
+
+POINT_DTYPE = np.dtype('<i2')
+
+# Snapshots of tiled canvases start with this, then tile size, tile count and
+# tile keys as int32, then the allocated tiles only, zlib compressed.
+# Dense snapshots are plain zlib streams.
+TILE_SNAPSHOT_MAGIC = b'TILE'
+
+ACTION_COLUMNS = ('id, action_type, points, color, width, timestamp, '
+                  'started_at, ended_at, session_id, drawing_id')
+
+ACTIONS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS drawing_actions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        action_type TEXT NOT NULL,
+        points BLOB NOT NULL,
+        color INTEGER,
+        width INTEGER,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        started_at REAL,
+        ended_at REAL,
+        session_id INTEGER,
+        drawing_id INTEGER
+    )
+'''
+
+
+def encode_points(points):
+    """Pack (x, y) points, or a flat x0, y0, x1, y1... sequence, into an int16 blob"""
+    return np.asarray(points, dtype=np.int16).astype(POINT_DTYPE, copy=False).tobytes()
+
+
+def decode_points(blob):
+    """An (n, 2) int16 array viewing the blob, without copying"""
+    return np.frombuffer(blob, dtype=POINT_DTYPE).reshape(-1, 2)
+
+
+def encode_color(color):
+    if not color:
+        return None
+    r, g, b = (int(c) for c in color[:3])
+    return (r << 16) | (g << 8) | b
+
+
+def decode_color(value):
+    if value is None:
+        return None
+    return ((value >> 16) & 255, (value >> 8) & 255, value & 255)
+
 
 class Database:
-    def __init__(self, db_file='virtual_painter.db'):
+    def __init__(self, db_file='virtual_painter.db', use_journal=True):
         self.db_file = db_file
+        # Stamped on every logged action
+        self.session_id = None
         self.init_db()
+        self.journal = ActionJournal(db_file) if use_journal else None
 
     def init_db(self):
         """Initialize the database with required tables"""
         conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
 
+        cursor.execute('PRAGMA journal_mode=WAL')
+
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS drawings (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -22,6 +90,17 @@ class Database:
             )
         ''')
 
+        # Keyset pagination for the gallery: newest first, id breaks created_at ties
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_drawings_created ON drawings (created_at, id)')
+        # Gallery thumbnails, valid while the file's mtime matches
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS thumbnails (
+                drawing_id INTEGER PRIMARY KEY,
+                mtime REAL NOT NULL,
+                data BLOB NOT NULL
+            )
+        ''')
+
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS settings (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -31,21 +110,342 @@ class Database:
             )
         ''')
 
+        cursor.execute('PRAGMA table_info(drawing_actions)')
+        columns = {row[1] for row in cursor.fetchall()}
+        cursor.execute('PRAGMA user_version')
+        version = cursor.fetchone()[0]
+        if columns and 'session_id' not in columns:
+            self._migrate_actions(conn, columns)
+        else:
+            cursor.execute(ACTIONS_TABLE)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_actions_session ON drawing_actions (session_id, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_actions_drawing ON drawing_actions (drawing_id)')
+
+        # A session runs from one clear or save to the next. Closed sessions
+        # keep a raster snapshot of how they ended; once compacted their
+        # actions are gone and the snapshot is all that is left.
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS drawing_actions (
+            CREATE TABLE IF NOT EXISTS sessions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                action_type TEXT NOT NULL,
-                points TEXT NOT NULL,
-                color TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                base_session INTEGER,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                started_at REAL NOT NULL,
+                ended_at REAL,
+                end_reason TEXT,
+                action_count INTEGER,
+                snapshot BLOB,
+                compacted_at REAL
             )
         ''')
+        if version < 3:
+            self._adopt_legacy_actions(conn)
+        if version < SCHEMA_VERSION:
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS keyframes (
+                action_id INTEGER PRIMARY KEY,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                data BLOB NOT NULL
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cameras (
+                camera_index INTEGER PRIMARY KEY,
+                width INTEGER,
+                height INTEGER,
+                fps REAL,
+                available INTEGER NOT NULL,
+                last_success REAL,
+                checked_at REAL NOT NULL
+            )
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    def _migrate_actions(self, conn, columns, batch_size=1000):
+        """Rewrite a JSON-era drawing_actions table in the binary layout, in place.
+
+        Runs in one transaction, so an interrupted migration leaves the old
+        table untouched. Row ids and the AUTOINCREMENT counter are kept.
+        """
+        legacy = [name if name in columns else 'NULL'
+                  for name in ('id', 'action_type', 'points', 'color', 'width',
+                               'timestamp', 'started_at', 'ended_at')]
+        conn.commit()
+        conn.execute('BEGIN')
+        try:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'drawing_actions'").fetchone()
+            sequence = row[0] if row else 0
+            conn.execute('ALTER TABLE drawing_actions RENAME TO drawing_actions_legacy')
+            conn.execute(ACTIONS_TABLE)
+
+            source = conn.execute(f'SELECT {", ".join(legacy)} FROM drawing_actions_legacy ORDER BY id')
+            count = 0
+            while True:
+                rows = source.fetchmany(batch_size)
+                if not rows:
+                    break
+                conn.executemany('''
+                    INSERT INTO drawing_actions
+                        (id, action_type, points, color, width, timestamp, started_at, ended_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(action_id, action_type, self._legacy_points(points),
+                       encode_color(json.loads(color) if color else None),
+                       width, timestamp, started_at, ended_at)
+                      for action_id, action_type, points, color, width, timestamp, started_at, ended_at in rows])
+                count += len(rows)
+
+            conn.execute('DROP TABLE drawing_actions_legacy')
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'drawing_actions'").fetchone()
+            if row:
+                conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'drawing_actions'",
+                             (max(sequence, row[0]),))
+            elif sequence:
+                conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('drawing_actions', ?)", (sequence,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"[DATABASE] Migrated {count} drawing actions to the binary layout")
+
+    def _adopt_legacy_actions(self, conn):
+        """Put actions logged before sessions existed into one closed session"""
+        if not conn.execute('SELECT 1 FROM drawing_actions WHERE session_id IS NULL LIMIT 1').fetchone():
+            return
+        now = time.time()
+        cursor = conn.execute('''
+            INSERT INTO sessions (width, height, started_at, ended_at, end_reason)
+            VALUES (?, ?, ?, ?, 'legacy')
+        ''', (*LEGACY_CANVAS_SIZE, now, now))
+        conn.execute('UPDATE drawing_actions SET session_id = ? WHERE session_id IS NULL', (cursor.lastrowid,))
+
+    @staticmethod
+    def _legacy_points(text):
+        points = [point[:2] for point in json.loads(text)] if text else []
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        return encode_points(np.clip(np.rint(points), -32768, 32767))
+
+    def open_session(self, width, height):
+        """Resume the newest open session if it has this canvas size, else start one"""
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT id, width, height FROM sessions WHERE ended_at IS NULL ORDER BY id DESC LIMIT 1
+        ''')
+        row = cursor.fetchone()
+        conn.close()
+        if row and (row[1], row[2]) == (width, height):
+            self.session_id = row[0]
+            return self.session_id
+        return self.start_session(width, height, 'resize')
+
+    def start_session(self, width, height, reason, snapshot=None, continue_from_snapshot=False):
+        """End the current session, keeping snapshot as its final raster, and start a new one.
+
+        With ``continue_from_snapshot`` the new session is drawn on top of
+        that snapshot (e.g. after saving); otherwise it starts blank.
+        """
+        self.flush()
+        now = time.time()
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            UPDATE sessions SET ended_at = ?, end_reason = ?, snapshot = ?
+            WHERE ended_at IS NULL
+        ''', (now, reason, self._pack_image(snapshot) if snapshot is not None else None))
+        base = self.session_id if snapshot is not None and continue_from_snapshot else None
+        cursor.execute('''
+            INSERT INTO sessions (base_session, width, height, started_at)
+            VALUES (?, ?, ?, ?)
+        ''', (base, width, height, now))
+        self.session_id = cursor.lastrowid
 
         conn.commit()
         conn.close()
+        return self.session_id
 
-    def save_drawing(self, filename, color, mode):
-        """Save drawing information to database"""
+    def get_session(self, session_id):
+        """Session metadata as a dict, without the snapshot"""
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT id, base_session, width, height, started_at, ended_at, end_reason,
+                   action_count, snapshot IS NOT NULL, compacted_at
+            FROM sessions WHERE id = ?
+        ''', (session_id,))
+        row = cursor.fetchone()
+
+        conn.close()
+        if not row:
+            return None
+        return {
+            'id': row[0],
+            'base_session': row[1],
+            'width': row[2],
+            'height': row[3],
+            'started_at': row[4],
+            'ended_at': row[5],
+            'end_reason': row[6],
+            'action_count': row[7],
+            'has_snapshot': bool(row[8]),
+            'compacted_at': row[9]
+        }
+
+    def get_snapshot(self, session_id, tile_size=None):
+        """The final raster stored for a session, or None. With tile_size it
+        is returned as a TileStore of that tile size."""
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT width, height, snapshot FROM sessions WHERE id = ?', (session_id,))
+        row = cursor.fetchone()
+
+        conn.close()
+        if not row or row[2] is None:
+            return None
+        return self._unpack_image(row[2], row[0], row[1], tile_size)
+
+    def get_session_base(self, session_id, tile_size=None):
+        """The raster a session was started on, or None when it started blank"""
+        session = self.get_session(session_id)
+        if not session or session['base_session'] is None:
+            return None
+        return self.get_snapshot(session['base_session'], tile_size)
+
+    def get_session_actions(self, session_id):
+        """Get the drawing actions of one session"""
+        self.flush()
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+
+        cursor.execute(f'SELECT {ACTION_COLUMNS} FROM drawing_actions WHERE session_id = ? ORDER BY id ASC',
+                       (session_id,))
+        actions = cursor.fetchall()
+
+        conn.close()
+        return self._decode_actions(actions)
+
+    def compactable_sessions(self):
+        """Ids of ended sessions whose actions have not been compacted yet, oldest first"""
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT id FROM sessions WHERE ended_at IS NOT NULL AND compacted_at IS NULL ORDER BY id ASC
+        ''')
+        ids = [row[0] for row in cursor.fetchall()]
+
+        conn.close()
+        return ids
+
+    def compact_session(self, session_id, snapshot=None):
+        """Replace an ended session's actions and keyframes by its snapshot, in one transaction"""
+        self.flush()
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT COUNT(*) FROM drawing_actions WHERE session_id = ?', (session_id,))
+        count = cursor.fetchone()[0]
+        if snapshot is not None:
+            cursor.execute('UPDATE sessions SET snapshot = ? WHERE id = ?', (self._pack_image(snapshot), session_id))
+        cursor.execute('''
+            DELETE FROM keyframes WHERE action_id IN (SELECT id FROM drawing_actions WHERE session_id = ?)
+        ''', (session_id,))
+        cursor.execute('DELETE FROM drawing_actions WHERE session_id = ?', (session_id,))
+        cursor.execute('''
+            UPDATE sessions SET compacted_at = ?, action_count = COALESCE(action_count, 0) + ? WHERE id = ?
+        ''', (time.time(), count, session_id))
+
+        conn.commit()
+        conn.close()
+        return count
+
+    def prune_sessions(self, keep):
+        """Delete compacted sessions beyond the newest ``keep``, except ones still used as a base"""
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            DELETE FROM sessions
+            WHERE compacted_at IS NOT NULL
+              AND id NOT IN (SELECT id FROM sessions ORDER BY id DESC LIMIT ?)
+              AND id NOT IN (SELECT base_session FROM sessions WHERE base_session IS NOT NULL)
+        ''', (keep,))
+        count = cursor.rowcount
+
+        conn.commit()
+        conn.close()
+        return count
+
+    def free_space_ratio(self):
+        """Fraction of the file's pages that are free, i.e. what VACUUM would reclaim"""
+        conn = sqlite3.connect(self.db_file)
+        pages = conn.execute('PRAGMA page_count').fetchone()[0]
+        free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        conn.close()
+        return free / pages if pages else 0.0
+
+    def vacuum(self):
+        """Rebuild the file to return free pages to the filesystem"""
+        self.flush()
+        conn = sqlite3.connect(self.db_file, timeout=10)
+        try:
+            conn.execute('VACUUM')
+            # In WAL mode the rebuilt pages land in the log first
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _pack_image(image):
+        if not isinstance(image, TileStore):
+            return zlib.compress(np.ascontiguousarray(image).tobytes(), 6)
+        # Only allocated tiles are stored, so a mostly blank board packs in no time
+        keys = sorted(image.tiles)
+        header = np.array([image.tile_size, len(keys)] + [k for key in keys for k in key], dtype='<i4')
+        compressor = zlib.compressobj(6)
+        body = [compressor.compress(np.ascontiguousarray(image.tiles[key])) for key in keys]
+        body.append(compressor.flush())
+        return TILE_SNAPSHOT_MAGIC + header.tobytes() + b''.join(body)
+
+    @staticmethod
+    def _unpack_image(data, width, height, tile_size=None):
+        if not data.startswith(TILE_SNAPSHOT_MAGIC):
+            image = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(height, width, 3).copy()
+            if tile_size is None:
+                return image
+            store = TileStore(width, height, tile_size)
+            store[:, :] = image
+            return store
+
+        start = len(TILE_SNAPSHOT_MAGIC)
+        size, count = np.frombuffer(data, dtype='<i4', count=2, offset=start)
+        keys = np.frombuffer(data, dtype='<i4', count=2 * count, offset=start + 8).reshape(-1, 2)
+        tiles = np.frombuffer(zlib.decompress(data[start + 8 + 8 * count:]), dtype=np.uint8)
+        tiles = tiles.reshape(count, size, size, 3).copy()
+        store = TileStore(width, height, int(size))
+        for (ty, tx), tile in zip(keys.tolist(), tiles):
+            store.tiles[(ty, tx)] = tile
+        if tile_size is None:
+            return store.to_array()
+        if tile_size != size:
+            resized = TileStore(width, height, tile_size)
+            resized.replace(store)
+            return resized
+        return store
+
+    def save_drawing(self, filename, color, mode, last_action_id=None, session_id=None):
+        """Save drawing information to database and tag the actions it was drawn with:
+        those of session_id (default the current session), up to last_action_id if given"""
+        self.flush()
         conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
         
@@ -53,21 +453,63 @@ class Database:
             INSERT INTO drawings (filename, color, mode)
             VALUES (?, ?, ?)
         ''', (filename, str(color), mode))
+        drawing_id = cursor.lastrowid
+        query = 'UPDATE drawing_actions SET drawing_id = ? WHERE drawing_id IS NULL'
+        params = [drawing_id]
+        if session_id is None:
+            session_id = self.session_id
+        if session_id is not None:
+            query += ' AND session_id = ?'
+            params.append(session_id)
+        if last_action_id is not None:
+            query += ' AND id <= ?'
+            params.append(last_action_id)
+        cursor.execute(query, params)
         
         conn.commit()
         conn.close()
+        return drawing_id
+
+    def get_drawings(self, limit=None, before=None):
+        """Get drawings newest first.
 
-    def get_drawings(self):
-        """Get all drawings"""
+        With ``limit`` one page is returned; pass the (created_at, id) of the
+        last row as ``before`` to get the next page. The seek uses the
+        created_at index, so deep pages cost the same as the first.
+        """
         conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
         
-        cursor.execute('SELECT * FROM drawings ORDER BY created_at DESC')
+        query = 'SELECT * FROM drawings'
+        params = []
+        if before is not None:
+            query += ' WHERE (created_at, id) < (?, ?)'
+            params.extend(before)
+        query += ' ORDER BY created_at DESC, id DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        cursor.execute(query, params)
         drawings = cursor.fetchall()
         
         conn.close()
         return drawings
 
+    def get_thumbnail(self, drawing_id, mtime):
+        """Stored thumbnail bytes for a drawing whose file still has this mtime, or None"""
+        conn = sqlite3.connect(self.db_file)
+        row = conn.execute('SELECT data FROM thumbnails WHERE drawing_id = ? AND mtime = ?',
+                           (drawing_id, mtime)).fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def save_thumbnail(self, drawing_id, mtime, data):
+        conn = sqlite3.connect(self.db_file)
+        conn.execute('INSERT OR REPLACE INTO thumbnails (drawing_id, mtime, data) VALUES (?, ?, ?)',
+                     (drawing_id, mtime, data))
+        conn.commit()
+        conn.close()
+
     def save_setting(self, name, value):
         """Save a setting"""
         conn = sqlite3.connect(self.db_file)
@@ -92,43 +534,196 @@ class Database:
         conn.close()
         return result[0] if result else None
 
-    def save_action(self, action_type, points, color=None):
-        """Save a drawing action"""
+    def save_camera(self, camera_index, width, height, fps, available, last_success, checked_at):
+        """Store the latest probe result for a camera index"""
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            INSERT OR REPLACE INTO cameras (camera_index, width, height, fps, available, last_success, checked_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (camera_index, width, height, fps, int(available), last_success, checked_at))
+
+        conn.commit()
+        conn.close()
+
+    def get_cameras(self):
+        """Get every cached camera probe result"""
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT * FROM cameras ORDER BY camera_index ASC')
+        cameras = cursor.fetchall()
+
+        conn.close()
+        return [{
+            'camera_index': row[0],
+            'width': row[1],
+            'height': row[2],
+            'fps': row[3],
+            'available': bool(row[4]),
+            'last_success': row[5],
+            'checked_at': row[6]
+        } for row in cameras]
+
+    def flush(self):
+        """Wait until every queued drawing action is on disk; False if some are not"""
+        if self.journal:
+            return self.journal.flush()
+        return True
+
+    def close(self):
+        """Flush queued drawing actions and stop the journal writer"""
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+
+    def save_action(self, action_type, points, color=None, width=None, started_at=None, ended_at=None):
+        """Save a drawing action; points are (x, y) pixels or a flat int16 sequence"""
+        row = (action_type, encode_points(points), encode_color(color), width,
+               started_at, ended_at, self.session_id)
+        if self.journal:
+            return self.journal.append(*row)
+
         conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
         
         cursor.execute('''
-            INSERT INTO drawing_actions (action_type, points, color)
-            VALUES (?, ?, ?)
-        ''', (action_type, json.dumps(points), json.dumps(color) if color else None))
+            INSERT INTO drawing_actions (action_type, points, color, width, started_at, ended_at, session_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', row)
         
         conn.commit()
         conn.close()
         return cursor.lastrowid
 
+    def save_stroke(self, stroke):
+        """Save a finished stroke as a single drawing action"""
+        return self.save_action(stroke.tool, stroke.points, stroke.color,
+                                stroke.width, stroke.started_at, stroke.ended_at)
+
     def get_all_actions(self):
         """Get all drawing actions"""
+        self.flush()
         conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
         
-        cursor.execute('SELECT * FROM drawing_actions ORDER BY id ASC')
+        cursor.execute(f'SELECT {ACTION_COLUMNS} FROM drawing_actions ORDER BY id ASC')
         actions = cursor.fetchall()
         
         conn.close()
+        return self._decode_actions(actions)
+
+    def get_actions_after(self, action_id):
+        """Get the drawing actions of the current session logged after the given action id"""
+        self.flush()
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+
+        if self.session_id is None:
+            cursor.execute(f'SELECT {ACTION_COLUMNS} FROM drawing_actions WHERE id > ? ORDER BY id ASC', (action_id,))
+        else:
+            cursor.execute(f'''
+                SELECT {ACTION_COLUMNS} FROM drawing_actions WHERE session_id = ? AND id > ? ORDER BY id ASC
+            ''', (self.session_id, action_id))
+        actions = cursor.fetchall()
+
+        conn.close()
+        return self._decode_actions(actions)
+
+    def iter_actions(self, batch_size=500, session_id=None):
+        """Yield drawing actions oldest first, optionally of one session, reading batch_size rows at a time"""
+        self.flush()
+        conn = sqlite3.connect(self.db_file)
+        try:
+            cursor = conn.cursor()
+            if session_id is None:
+                cursor.execute(f'SELECT {ACTION_COLUMNS} FROM drawing_actions ORDER BY id ASC')
+            else:
+                cursor.execute(f'SELECT {ACTION_COLUMNS} FROM drawing_actions WHERE session_id = ? ORDER BY id ASC',
+                               (session_id,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from self._decode_actions(rows)
+        finally:
+            conn.close()
+
+    def get_last_action_id(self, session_id=None):
+        """Id of the newest logged action, optionally of one session; 0 if there is none"""
+        self.flush()
+        conn = sqlite3.connect(self.db_file)
+        if session_id is None:
+            row = conn.execute('SELECT MAX(id) FROM drawing_actions').fetchone()
+        else:
+            row = conn.execute('SELECT MAX(id) FROM drawing_actions WHERE session_id = ?', (session_id,)).fetchone()
+        conn.close()
+        return row[0] or 0
+
+    def get_action_arrays(self, after_id=0, session_id=None, until_id=None):
+        """Bulk-read actions as NumPy columns instead of one dict per row.
+
+        Returns a dict with ``id``, ``color`` (0xRRGGBB, -1 for none) and
+        ``width`` (0 for none) arrays, the ``action_type`` list, and every
+        stroke's points concatenated into one (n, 2) int16 ``points`` array;
+        stroke i is ``points[offsets[i]:offsets[i + 1]]``.
+        """
+        self.flush()
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+
+        query = 'SELECT id, action_type, points, color, width FROM drawing_actions WHERE id > ?'
+        params = [after_id]
+        if session_id is not None:
+            query += ' AND session_id = ?'
+            params.append(session_id)
+        if until_id is not None:
+            query += ' AND id <= ?'
+            params.append(until_id)
+        cursor.execute(query + ' ORDER BY id ASC', params)
+        rows = cursor.fetchall()
+        conn.close()
+
+        ids, types, blobs, colors, widths = zip(*rows) if rows else ((), (), (), (), ())
+        lengths = np.fromiter((len(blob) // 4 for blob in blobs), dtype=np.int64, count=len(blobs))
+        offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return {
+            'id': np.array(ids, dtype=np.int64),
+            'action_type': list(types),
+            'color': np.array([-1 if c is None else c for c in colors], dtype=np.int64),
+            'width': np.array([w or 0 for w in widths], dtype=np.int32),
+            'offsets': offsets,
+            'points': decode_points(b''.join(blobs)),
+        }
+
+    def _decode_actions(self, actions):
         return [{
             'id': action[0],
             'action_type': action[1],
-            'points': json.loads(action[2]),
-            'color': json.loads(action[3]) if action[3] else None,
-            'timestamp': action[4]
+            'points': decode_points(action[2]),
+            'color': decode_color(action[3]),
+            'width': action[4],
+            'timestamp': action[5],
+            'started_at': action[6],
+            'ended_at': action[7],
+            'session_id': action[8],
+            'drawing_id': action[9]
         } for action in actions]
 
     def undo_last_action(self):
-        """Remove and return the last action"""
+        """Remove and return the last action of the current session"""
+        self.flush()
         conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
         
-        cursor.execute('SELECT * FROM drawing_actions ORDER BY id DESC LIMIT 1')
+        if self.session_id is None:
+            cursor.execute(f'SELECT {ACTION_COLUMNS} FROM drawing_actions ORDER BY id DESC LIMIT 1')
+        else:
+            cursor.execute(f'''
+                SELECT {ACTION_COLUMNS} FROM drawing_actions WHERE session_id = ? ORDER BY id DESC LIMIT 1
+            ''', (self.session_id,))
         action = cursor.fetchone()
         
         if action:
@@ -136,11 +731,63 @@ class Database:
             conn.commit()
             
             conn.close()
-            return {
-                'action_type': action[1],
-                'points': json.loads(action[2]),
-                'color': json.loads(action[3]) if action[3] else None
-            }
+            return self._decode_actions([action])[0]
         
         conn.close()
-        return None
\ No newline at end of file
+        return None
+
+    def save_keyframe(self, action_id, image):
+        """Store a raster keyframe taken right after the given action"""
+        height, width = image.shape[:2]
+
+        def write(conn):
+            conn.execute('''
+                INSERT OR REPLACE INTO keyframes (action_id, width, height, data)
+                VALUES (?, ?, ?, ?)
+            ''', (action_id, width, height, zlib.compress(image.tobytes(), 1)))
+
+        if self.journal:
+            self.journal.submit(write)
+            return
+
+        conn = sqlite3.connect(self.db_file)
+        write(conn)
+        conn.commit()
+        conn.close()
+
+    def get_keyframe(self, action_id):
+        """Get the newest stored keyframe at or before the given action id in the current session"""
+        self.flush()
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+
+        if self.session_id is None:
+            cursor.execute('''
+                SELECT action_id, width, height, data FROM keyframes
+                WHERE action_id <= ? ORDER BY action_id DESC LIMIT 1
+            ''', (action_id,))
+        else:
+            cursor.execute('''
+                SELECT k.action_id, k.width, k.height, k.data FROM keyframes k
+                JOIN drawing_actions a ON a.id = k.action_id
+                WHERE k.action_id <= ? AND a.session_id = ? ORDER BY k.action_id DESC LIMIT 1
+            ''', (action_id, self.session_id))
+        result = cursor.fetchone()
+
+        conn.close()
+        if not result:
+            return None
+        kf_id, width, height, data = result
+        image = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(height, width, 3)
+        return kf_id, image.copy()
+
+    def delete_keyframes_from(self, action_id):
+        """Drop stored keyframes that include the given action or later ones"""
+        self.flush()
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+
+        cursor.execute('DELETE FROM keyframes WHERE action_id >= ?', (action_id,))
+
+        conn.commit()
+        conn.close()
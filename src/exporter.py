@@ -0,0 +1,180 @@
+"""Saving drawings off the UI thread.
+
+``ExportJob.capture`` runs on the UI thread and only copies what the export
+needs: the raster (one memcpy, or just the allocated tiles of a tiled board)
+and the id of the last logged action. An ``ExportService`` thread then
+encodes it, or rebuilds it from the action log for upscaled raster and
+vector output, and records the drawing in the database once the file is
+written.
+"""
+import os
+import queue
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from stroke import rasterize_actions
+from tiled_canvas import TileStore
+from vector_export import export_vector
+
+# PIL format names by extension; vector formats are rebuilt from the action log
+RASTER_FORMATS = {'.png': 'PNG', '.webp': 'WEBP', '.jpg': 'JPEG', '.jpeg': 'JPEG'}
+VECTOR_FORMATS = ('.svg', '.pdf')
+
+# zlib level for PNG (0-9) and quality for the lossy formats (1-100)
+DEFAULT_PNG_COMPRESSION = 6
+DEFAULT_QUALITY = 90
+
+
+def encode_options(file_format, compression=DEFAULT_PNG_COMPRESSION, quality=DEFAULT_QUALITY):
+    """PIL save() options for a raster format"""
+    if file_format == 'PNG':
+        return {'compress_level': compression}
+    if file_format == 'WEBP':
+        return {'quality': quality, 'method': 4}
+    return {'quality': quality}
+
+
+def render_scaled(db, session_id, width, height, scale, last_action_id=None):
+    """Re-rasterize a session at ``scale`` times the canvas size from its log.
+
+    The raster the session started from can only be resized; the session's
+    own strokes are drawn again at full resolution.
+    """
+    base = db.get_session_base(session_id)
+    if base is not None and base.shape == (height, width, 3):
+        image = cv2.resize(base, (width * scale, height * scale), interpolation=cv2.INTER_LINEAR)
+    else:
+        image = np.full((height * scale, width * scale, 3), 255, dtype=np.uint8)
+    arrays = db.get_action_arrays(session_id=session_id, until_id=last_action_id)
+    return rasterize_actions(image, arrays, scale=scale)
+
+
+class ExportJob:
+    """One export request and, once done, its outcome (``error``, ``drawing_id``)"""
+
+    def __init__(self, path, width, height, image=None, session_id=None, last_action_id=None,
+                 scale=1, compression=DEFAULT_PNG_COMPRESSION, quality=DEFAULT_QUALITY,
+                 default_width=10, color=None, mode=None):
+        self.path = path
+        self.extension = os.path.splitext(path)[1].lower()
+        self.width = width
+        self.height = height
+        self.image = image
+        self.session_id = session_id
+        self.last_action_id = last_action_id
+        self.scale = scale
+        self.compression = compression
+        self.quality = quality
+        self.default_width = default_width
+        self.color = color
+        self.mode = mode
+        self.error = None
+        self.drawing_id = None
+        self.elapsed = None
+
+    @classmethod
+    def capture(cls, canvas, path, mode=None, **options):
+        """Snapshot what exporting canvas to path needs. Call on the UI thread."""
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in RASTER_FORMATS and extension not in VECTOR_FORMATS:
+            raise ValueError(f"Unsupported export format: {extension or path}")
+        db = canvas.db
+        if extension in VECTOR_FORMATS and db is None:
+            raise ValueError("Vector export needs the action log")
+        canvas.end_stroke()
+        scale = options.get('scale', 1)
+        job = cls(path, canvas.width, canvas.height, default_width=canvas.brush_size,
+                  color=canvas.color, mode=mode, **options)
+        if db is not None:
+            job.session_id = db.session_id
+            job.last_action_id = db.get_last_action_id(db.session_id)
+        # Upscaled and vector output come from the log; otherwise the raster is the source
+        if extension in RASTER_FORMATS and (scale == 1 or db is None):
+            job.scale = 1
+            job.image = canvas.canvas.snapshot() if canvas.tiled else canvas.canvas.copy()
+        return job
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class ExportService(QThread):
+    """Runs ExportJobs one at a time in submission order.
+
+    ``exported`` is emitted with each finished job; check ``job.ok``. On
+    success the drawing is recorded with Database.save_drawing first.
+    Jobs read the action log of their session when they run, so sessions
+    must not be compacted while the service is busy (see ``idle``).
+    """
+    exported = pyqtSignal(object)
+
+    def __init__(self, db=None, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self._jobs = queue.Queue()
+
+    def submit(self, job):
+        self._jobs.put(job)
+        if not self.isRunning():
+            self.start()
+        return job
+
+    @property
+    def idle(self):
+        """True when no submitted job is still waiting or running"""
+        return self._jobs.unfinished_tasks == 0
+
+    def stop(self):
+        """Finish the queued jobs and end the thread"""
+        if self.isRunning():
+            self._jobs.put(None)
+            self.wait()
+
+    def run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                self._jobs.task_done()
+                break
+            self.export(job)
+            # Done before the signal, so its slots already see the service idle
+            self._jobs.task_done()
+            self.exported.emit(job)
+
+    def export(self, job):
+        """Write one job's file and record it; errors are kept on the job"""
+        start = time.perf_counter()
+        try:
+            self._write(job)
+            if self.db is not None:
+                job.drawing_id = self.db.save_drawing(job.path, job.color, job.mode,
+                                                      last_action_id=job.last_action_id,
+                                                      session_id=job.session_id)
+        except Exception as e:
+            job.error = str(e)
+            print(f"[ERROR] Export to {job.path} failed: {e}")
+            return job
+        job.elapsed = time.perf_counter() - start
+        print(f"[EXPORT] {job.path} written in {job.elapsed * 1000:.0f} ms")
+        return job
+
+    def _write(self, job):
+        if job.extension in VECTOR_FORMATS:
+            actions = (a for a in self.db.iter_actions(session_id=job.session_id)
+                       if job.last_action_id is None or a['id'] <= job.last_action_id)
+            export_vector(actions, job.path, job.width, job.height, default_width=job.default_width,
+                          image=self.db.get_session_base(job.session_id))
+            return
+        image = job.image
+        if isinstance(image, TileStore):
+            image = image.to_array()
+        elif image is None:
+            image = render_scaled(self.db, job.session_id, job.width, job.height, job.scale, job.last_action_id)
+        file_format = RASTER_FORMATS[job.extension]
+        Image.fromarray(image).save(job.path, format=file_format,
+                                    **encode_options(file_format, job.compression, job.quality))
@@ -0,0 +1,135 @@
+import math
+
+
+class OneEuroFilter:
+    """One Euro filter for a 2D point, with optional look-ahead.
+
+    Jitter is removed with a low-pass filter whose cutoff rises with speed:
+    ``min_cutoff`` (Hz) sets the smoothing when the hand is still and
+    ``beta`` how quickly it opens up during fast motion. The output is
+    extrapolated ``lead`` seconds along the filtered velocity to cancel
+    pipeline latency. Samples more than ``reset_after`` seconds apart start
+    over, so a lost hand does not drag the next stroke.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=10.0, d_cutoff=1.0, lead=0.0, reset_after=0.5):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.lead = lead
+        self.reset_after = reset_after
+        self.reset()
+
+    def reset(self):
+        self._t = None
+        self._x = None
+        self._raw = None
+        self._dx = (0.0, 0.0)
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, x, y, t):
+        if self._t is None or t - self._t > self.reset_after:
+            self._t = t
+            self._x = self._raw = (x, y)
+            self._dx = (0.0, 0.0)
+            return (x, y)
+
+        dt = t - self._t
+        if dt <= 0:
+            return self._x
+        self._t = t
+        px, py = self._x
+        rx, ry = self._raw
+        self._raw = (x, y)
+
+        a_d = self._alpha(self.d_cutoff, dt)
+        dx = a_d * (x - rx) / dt + (1 - a_d) * self._dx[0]
+        dy = a_d * (y - ry) / dt + (1 - a_d) * self._dx[1]
+        self._dx = (dx, dy)
+
+        a_x = self._alpha(self.min_cutoff + self.beta * math.hypot(dx, dy), dt)
+        self._x = (a_x * x + (1 - a_x) * px, a_x * y + (1 - a_x) * py)
+        return (self._x[0] + self.lead * dx, self._x[1] + self.lead * dy)
+
+
+class KalmanTipFilter:
+    """Constant-velocity Kalman filter for a 2D point, with optional look-ahead.
+
+    ``process_noise`` is the acceleration variance the model allows and
+    ``measurement_noise`` the variance of a single landmark reading, both in
+    normalized image units. The axes are independent, so each one keeps its
+    own 2x2 covariance.
+    """
+
+    def __init__(self, process_noise=0.5, measurement_noise=2e-5, lead=0.0, reset_after=0.5):
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.lead = lead
+        self.reset_after = reset_after
+        self.reset()
+
+    def reset(self):
+        self._t = None
+        self._state = None
+
+    def __call__(self, x, y, t):
+        if self._t is None or t - self._t > self.reset_after:
+            # Per axis: position, velocity and the covariance terms p00, p01, p11
+            self._state = [[x, 0.0, self.measurement_noise, 0.0, 1.0],
+                           [y, 0.0, self.measurement_noise, 0.0, 1.0]]
+            self._t = t
+            return (x, y)
+
+        dt = max(t - self._t, 1e-3)
+        self._t = t
+        q = self.process_noise
+        r = self.measurement_noise
+        out = []
+        for axis, z in zip(self._state, (x, y)):
+            pos, vel, p00, p01, p11 = axis
+
+            # Predict
+            pos += vel * dt
+            p00 += dt * (2 * p01 + dt * p11) + q * dt ** 4 / 4
+            p01 += dt * p11 + q * dt ** 3 / 2
+            p11 += q * dt ** 2
+
+            # Update
+            s = p00 + r
+            k0, k1 = p00 / s, p01 / s
+            residual = z - pos
+            pos += k0 * residual
+            vel += k1 * residual
+            p00, p01, p11 = (1 - k0) * p00, (1 - k0) * p01, p11 - k1 * p01
+
+            axis[:] = [pos, vel, p00, p01, p11]
+            out.append(pos + self.lead * vel)
+        return tuple(out)
+
+
+class PassThroughFilter:
+    """No smoothing; returns the raw tip"""
+
+    def reset(self):
+        pass
+
+    def __call__(self, x, y, t):
+        return (x, y)
+
+
+TIP_FILTERS = {
+    'one_euro': OneEuroFilter,
+    'kalman': KalmanTipFilter,
+    'none': PassThroughFilter,
+}
+
+
+def make_tip_filter(config=None):
+    """Build a tip filter from a dict such as {"type": "one_euro", "beta": 0.05}"""
+    config = dict(config or {})
+    kind = config.pop('type', 'one_euro')
+    return TIP_FILTERS[kind](**config)
@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+from PyQt5.QtGui import QImage
+from hand_tracking import landmarks_to_array
+from profiler import profiler
+
+
+class LatestFrameQueue:
+    """Bounded hand-off queue where new items push out the oldest unread ones.
+
+    The producer never blocks: when the consumer falls behind, stale items
+    are dropped and counted so the consumer always works on the newest frame.
+    """
+
+    def __init__(self, maxsize=1):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the oldest unread item, or None on timeout or close"""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._items.clear()
+            self._cond.notify_all()
+
+    def reopen(self):
+        with self._cond:
+            self._closed = False
+            self._items.clear()
+
+
+class FrameResult:
+    """One processed camera frame as delivered to the UI thread"""
+    __slots__ = ('timestamp', 'image', 'landmarks', 'positions', 'gesture', 'tip')
+
+    def __init__(self, timestamp, image, landmarks=None, positions=None, gesture=None, tip=None):
+        self.timestamp = timestamp
+        self.image = image
+        self.landmarks = landmarks
+        self.positions = positions
+        self.gesture = gesture
+        self.tip = tip
+
+
+class CaptureWorker(QThread):
+    """Reads frames from a FrameSource as fast as it delivers them"""
+    capture_failed = pyqtSignal()
+
+    def __init__(self, frames, parent=None):
+        super().__init__(parent)
+        self.frames = frames
+        self.source = None
+        self._running = False
+
+    def run(self):
+        self._running = True
+        failures = 0
+        while self._running:
+            with profiler.stage('capture.read'):
+                ret, timestamp, frame = self.source.read()
+            if not ret:
+                failures += 1
+                if failures == 30:
+                    self.capture_failed.emit()
+                time.sleep(0.01)
+                continue
+            failures = 0
+            if self.source.mirror:
+                with profiler.stage('capture.flip'):
+                    frame = cv2.flip(frame, 1)
+            self.frames.put((timestamp, frame))
+
+    def stop(self):
+        self._running = False
+
+
+class InferenceWorker(QThread):
+    """Runs hand tracking on the newest captured frame and emits the result"""
+    result_ready = pyqtSignal(object)
+
+    def __init__(self, frames, hand_tracker, parent=None):
+        super().__init__(parent)
+        self.frames = frames
+        self.hand_tracker = hand_tracker
+        self._running = False
+
+    def run(self):
+        self._running = True
+        while self._running:
+            item = self.frames.get(timeout=0.1)
+            if item is None:
+                continue
+            timestamp, frame = item
+            frame, result = self.hand_tracker.detect_hands(frame)
+
+            landmarks = positions = gesture = tip = None
+            if result.multi_hand_landmarks:
+                landmarks = result.multi_hand_landmarks[0]
+                with profiler.stage('classify_gestures'):
+                    positions = landmarks_to_array(landmarks)
+                    gesture = str(self.hand_tracker.classify_gestures(positions)[0])
+                with profiler.stage('tip_filter'):
+                    tip = self.hand_tracker.get_smoothed_tip(landmarks.landmark[8], timestamp)
+
+            with profiler.stage('frame.QImage'):
+                height, width, _ = frame.shape
+                image = QImage(frame.data, width, height, 3 * width, QImage.Format_BGR888).copy()
+            self.result_ready.emit(FrameResult(timestamp, image, landmarks, positions, gesture, tip))
+
+    def stop(self):
+        self._running = False
+
+
+class FramePipeline(QObject):
+    """Capture -> inference pipeline running off the UI thread.
+
+    Capture and inference each get their own thread, joined by a
+    latest-frame-wins queue so a slow inference step drops stale frames
+    instead of building up latency. Results arrive on the UI thread through
+    the ``result_ready`` signal.
+    """
+    result_ready = pyqtSignal(object)
+    capture_failed = pyqtSignal()
+
+    def __init__(self, hand_tracker, parent=None):
+        super().__init__(parent)
+        self.frames = LatestFrameQueue()
+        self.capture_worker = CaptureWorker(self.frames)
+        self.inference_worker = InferenceWorker(self.frames, hand_tracker)
+        self.inference_worker.result_ready.connect(self.result_ready)
+        self.capture_worker.capture_failed.connect(self.capture_failed)
+
+    @property
+    def dropped_frames(self):
+        return self.frames.dropped
+
+    def set_hand_tracker(self, hand_tracker):
+        """Use another hand tracker from the next start() on"""
+        self.inference_worker.hand_tracker = hand_tracker
+
+    def is_running(self):
+        return self.capture_worker.isRunning()
+
+    def start(self, source):
+        """Start processing frames from an opened FrameSource"""
+        self.stop()
+        self.frames.reopen()
+        self.capture_worker.source = source
+        self.inference_worker.start()
+        self.capture_worker.start()
+
+    def stop(self):
+        """Stop both workers; the frame source is left open for the caller"""
+        self.capture_worker.stop()
+        self.inference_worker.stop()
+        self.frames.close()
+        self.capture_worker.wait()
+        self.inference_worker.wait()
+        self.capture_worker.source = None
@@ -0,0 +1,267 @@
+"""Frame sources feeding the capture pipeline.
+
+Every source has the same small interface: ``open()``, ``read()`` returning
+``(ok, timestamp, frame)`` with the timestamp in seconds, ``release()``, and
+the native ``resolution`` (width, height) and ``fps``. Live cameras are
+mirrored so the painter behaves like a mirror; recorded sources are not.
+"""
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+def camera_backend(platform=None):
+    """OpenCV capture backend for the current platform"""
+    platform = platform or sys.platform
+    if platform.startswith('win'):
+        return cv2.CAP_DSHOW
+    if platform == 'darwin':
+        return cv2.CAP_AVFOUNDATION
+    if platform.startswith('linux'):
+        return cv2.CAP_V4L2
+    return cv2.CAP_ANY
+
+
+class FrameSource:
+    """Base class for anything that produces BGR frames"""
+    mirror = False
+
+    def __init__(self, fps=30.0, realtime=False):
+        self.fps = fps
+        self.resolution = (0, 0)
+        self.realtime = realtime
+        self._start = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def open(self):
+        """Open the source, returning True on success"""
+        raise NotImplementedError
+
+    def is_opened(self):
+        raise NotImplementedError
+
+    def read(self):
+        """Return (ok, timestamp, frame) for the next frame"""
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+    def _pace(self, timestamp):
+        """With realtime set, sleep until a recorded timestamp is due"""
+        if not self.realtime:
+            return
+        now = time.monotonic()
+        if self._start is None:
+            self._start = now - timestamp
+        delay = self._start + timestamp - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def __repr__(self):
+        width, height = self.resolution
+        return f"{type(self).__name__}({width}x{height} @ {self.fps:g} fps)"
+
+
+class CameraSource(FrameSource):
+    """Live camera opened with the platform's native backend"""
+    mirror = True
+
+    def __init__(self, index=0, backend=None):
+        super().__init__()
+        self.index = index
+        self.backend = camera_backend() if backend is None else backend
+        self.capture = None
+
+    def open(self):
+        self.capture = cv2.VideoCapture(self.index, self.backend)
+        if not self.capture.isOpened():
+            # Fall back to whatever OpenCV picks when the native backend is unavailable
+            self.capture.release()
+            self.capture = cv2.VideoCapture(self.index)
+        if not self.capture.isOpened():
+            self.capture = None
+            return False
+        self.resolution = (int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                           int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        return True
+
+    def is_opened(self):
+        return self.capture is not None and self.capture.isOpened()
+
+    def read(self):
+        if self.capture is None:
+            return False, time.monotonic(), None
+        ret, frame = self.capture.read()
+        return ret, time.monotonic(), frame
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+class VideoFileSource(FrameSource):
+    """Frames from a video file, timestamped by their position in the media"""
+
+    def __init__(self, path, realtime=False, loop=False):
+        super().__init__(realtime=realtime)
+        self.path = path
+        self.loop = loop
+        self.capture = None
+        self._offset = 0.0
+        self._last = 0.0
+
+    def open(self):
+        self.capture = cv2.VideoCapture(self.path)
+        if not self.capture.isOpened():
+            self.capture = None
+            return False
+        self.resolution = (int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                           int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        return True
+
+    def is_opened(self):
+        return self.capture is not None
+
+    def read(self):
+        if self.capture is None:
+            return False, self._last, None
+        ret, frame = self.capture.read()
+        if not ret and self.loop:
+            # Keep timestamps increasing across loops so filters see forward time
+            self._offset = self._last + 1 / self.fps
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read()
+        if not ret:
+            return False, self._last, None
+        self._last = self._offset + self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        self._pace(self._last)
+        return True, self._last, frame
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+class ImageSequenceSource(FrameSource):
+    """Frames from a directory or glob of still images, read in name order"""
+
+    def __init__(self, pattern, fps=30.0, realtime=False, loop=False):
+        super().__init__(fps, realtime)
+        self.pattern = pattern
+        self.loop = loop
+        self.files = []
+        self.position = 0
+
+    def open(self):
+        if os.path.isdir(self.pattern):
+            files = [os.path.join(self.pattern, name) for name in os.listdir(self.pattern)]
+        else:
+            files = glob.glob(self.pattern)
+        self.files = sorted(f for f in files if f.lower().endswith(IMAGE_EXTENSIONS))
+        self.position = 0
+        if not self.files:
+            return False
+        first = cv2.imread(self.files[0])
+        if first is None:
+            self.files = []
+            return False
+        self.resolution = (first.shape[1], first.shape[0])
+        return True
+
+    def is_opened(self):
+        return bool(self.files)
+
+    def read(self):
+        if not self.files or (self.position >= len(self.files) and not self.loop):
+            return False, self.position / self.fps, None
+        timestamp = self.position / self.fps
+        frame = cv2.imread(self.files[self.position % len(self.files)])
+        self.position += 1
+        self._pace(timestamp)
+        return frame is not None, timestamp, frame
+
+    def release(self):
+        self.files = []
+
+
+class SyntheticSource(FrameSource):
+    """Generated frames of a skin-toned disc moving in a circle.
+
+    Needs no hardware or files, so pipeline tests and benchmarks run
+    anywhere. ``frame_count`` of None produces frames forever.
+    """
+
+    def __init__(self, width=640, height=480, fps=30.0, frame_count=None, realtime=False):
+        super().__init__(fps, realtime)
+        self.resolution = (width, height)
+        self.frame_count = frame_count
+        self.position = 0
+        self._background = None
+
+    def open(self):
+        width, height = self.resolution
+        yy, xx = np.mgrid[0:height, 0:width]
+        self._background = np.dstack([(xx * 255 // max(width - 1, 1)),
+                                      (yy * 255 // max(height - 1, 1)),
+                                      np.full_like(xx, 96)]).astype(np.uint8)
+        self.position = 0
+        return True
+
+    def is_opened(self):
+        return self._background is not None
+
+    def read(self):
+        timestamp = self.position / self.fps
+        if self._background is None or (self.frame_count is not None and self.position >= self.frame_count):
+            return False, timestamp, None
+        width, height = self.resolution
+        angle = 2 * np.pi * timestamp / 4.0
+        center = (int(width / 2 + width / 4 * np.cos(angle)), int(height / 2 + height / 4 * np.sin(angle)))
+        frame = self._background.copy()
+        cv2.circle(frame, center, max(4, min(width, height) // 10), (140, 180, 230), -1)
+        self.position += 1
+        self._pace(timestamp)
+        return True, timestamp, frame
+
+    def release(self):
+        self._background = None
+
+
+def open_checked(source):
+    """Open a source and read one frame from it; returns the source, or None after releasing it"""
+    if source.open():
+        ret, _, _ = source.read()
+        if ret:
+            return source
+    source.release()
+    return None
+
+
+def open_source(spec, realtime=True):
+    """Build a source from a string: a camera index, 'synthetic', an image
+    directory or glob, or a video file path. The source is not opened yet."""
+    spec = str(spec)
+    if spec.isdigit():
+        return CameraSource(int(spec))
+    if spec == 'synthetic':
+        return SyntheticSource(realtime=realtime)
+    if os.path.isdir(spec) or any(c in spec for c in '*?['):
+        return ImageSequenceSource(spec, realtime=realtime)
+    return VideoFileSource(spec, realtime=realtime)
@@ -0,0 +1,194 @@
+"""Browsing saved drawings.
+
+The gallery pages through the drawings table newest first with a keyset
+cursor, so it opens with one small query however many drawings there are.
+Thumbnails are made on a worker thread, stored in the database keyed by
+drawing id and file mtime, and the most recently used are kept in memory.
+"""
+import io
+import os
+import queue
+from collections import OrderedDict
+
+from PIL import Image
+from PyQt5.QtCore import Qt, QSize, QThread, QUrl, pyqtSignal
+from PyQt5.QtGui import QDesktopServices, QIcon, QPixmap
+from PyQt5.QtWidgets import QListView, QListWidget, QListWidgetItem, QVBoxLayout, QWidget
+
+THUMBNAIL_SIZE = (160, 120)
+# Drawings fetched per query as the gallery scrolls
+PAGE_SIZE = 60
+
+
+def make_thumbnail(path, size=THUMBNAIL_SIZE):
+    """PNG bytes of a thumbnail fitting in size, or None if PIL cannot read the file"""
+    try:
+        with Image.open(path) as image:
+            # Lets JPEG decode straight at a reduced scale
+            image.draft('RGB', size)
+            image = image.convert('RGB')
+    except (OSError, ValueError):
+        return None
+    image.thumbnail(size)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class ThumbnailCache(QThread):
+    """Thumbnails by drawing id: memory, then the database, then the file.
+
+    ``get`` answers from the in-memory LRU or returns None and queues the
+    drawing; ``ready`` later delivers (drawing id, PNG bytes or None). The
+    most recent requests are served first, so the rows in view load before
+    ones scrolled past.
+    """
+    ready = pyqtSignal(int, object)
+
+    def __init__(self, db, capacity=256, size=THUMBNAIL_SIZE, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.capacity = capacity
+        self.size = size
+        self._memory = OrderedDict()
+        self._pending = set()
+        self._requests = queue.LifoQueue()
+        # Connected first, so the LRU is filled before other slots see the result
+        self.ready.connect(self._remember)
+
+    def get(self, drawing_id, path):
+        data = self._memory.get(drawing_id)
+        if data is not None:
+            self._memory.move_to_end(drawing_id)
+            return data
+        if drawing_id not in self._pending:
+            self._pending.add(drawing_id)
+            self._requests.put((drawing_id, path))
+            if not self.isRunning():
+                self.start()
+        return None
+
+    def stop(self):
+        if self.isRunning():
+            self._requests.put(None)
+            self.wait()
+
+    def run(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                break
+            try:
+                data = self.load(*request)
+            except Exception as e:
+                print(f"[WARNING] Thumbnail for {request[1]} failed: {e}")
+                data = None
+            self.ready.emit(request[0], data)
+
+    def load(self, drawing_id, path):
+        """Stored thumbnail if the file is unchanged, else a fresh one (which is stored)"""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        data = self.db.get_thumbnail(drawing_id, mtime)
+        if data is None:
+            data = make_thumbnail(path, self.size)
+            if data is not None:
+                self.db.save_thumbnail(drawing_id, mtime, data)
+        return data
+
+    def _remember(self, drawing_id, data):
+        self._pending.discard(drawing_id)
+        if data is None:
+            return
+        self._memory[drawing_id] = data
+        self._memory.move_to_end(drawing_id)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+
+class GalleryWindow(QWidget):
+    """Saved drawings as a grid of thumbnails; more are fetched near the bottom"""
+
+    def __init__(self, db, page_size=PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.page_size = page_size
+        self.cursor = None
+        self.exhausted = False
+        self.items = {}
+        self.thumbnails = ThumbnailCache(db)
+        self.thumbnails.ready.connect(self.on_thumbnail)
+
+        self.setWindowTitle("DrawWave - Gallery")
+        self.resize(900, 600)
+        self.list = QListWidget()
+        self.list.setViewMode(QListView.IconMode)
+        self.list.setIconSize(QSize(*THUMBNAIL_SIZE))
+        # Fixed cells, so the grid does not reflow as thumbnails arrive
+        self.list.setGridSize(QSize(THUMBNAIL_SIZE[0] + 24, THUMBNAIL_SIZE[1] + 36))
+        self.list.setResizeMode(QListView.Adjust)
+        self.list.setMovement(QListView.Static)
+        self.list.setUniformItemSizes(True)
+        self.list.itemActivated.connect(self.open_item)
+        scroll_bar = self.list.verticalScrollBar()
+        scroll_bar.valueChanged.connect(self.on_scroll)
+        scroll_bar.rangeChanged.connect(self.on_range_changed)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.list)
+        self.setLayout(layout)
+        self.load_page()
+
+    def load_page(self):
+        """Append the next page of drawings; returns how many were added"""
+        if self.exhausted:
+            return 0
+        rows = self.db.get_drawings(limit=self.page_size, before=self.cursor)
+        self.exhausted = len(rows) < self.page_size
+        for drawing_id, filename, created_at, color, mode in rows:
+            item = QListWidgetItem(os.path.basename(filename))
+            item.setToolTip(f"{filename}\n{created_at}")
+            item.setData(Qt.UserRole, filename)
+            item.setTextAlignment(Qt.AlignHCenter)
+            self.list.addItem(item)
+            self.items[drawing_id] = item
+            data = self.thumbnails.get(drawing_id, filename)
+            if data is not None:
+                self.on_thumbnail(drawing_id, data)
+        if rows:
+            self.cursor = (rows[-1][2], rows[-1][0])
+        return len(rows)
+
+    def reload(self):
+        """Start again from the newest drawing, e.g. to show ones saved since opening"""
+        self.list.clear()
+        self.items.clear()
+        self.cursor = None
+        self.exhausted = False
+        self.load_page()
+
+    def on_scroll(self, value):
+        if value >= self.list.verticalScrollBar().maximum() - self.list.iconSize().height():
+            self.load_page()
+
+    def on_range_changed(self, low, high):
+        # Keep loading until the view can scroll or nothing is left
+        if high == 0:
+            self.load_page()
+
+    def on_thumbnail(self, drawing_id, data):
+        item = self.items.get(drawing_id)
+        if item is None or data is None:
+            return
+        pixmap = QPixmap()
+        pixmap.loadFromData(data, 'PNG')
+        item.setIcon(QIcon(pixmap))
+
+    def open_item(self, item):
+        QDesktopServices.openUrl(QUrl.fromLocalFile(item.data(Qt.UserRole)))
+
+    def closeEvent(self, event):
+        self.thumbnails.stop()
+        super().closeEvent(event)
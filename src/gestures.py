@@ -0,0 +1,72 @@
+import time
+
+INDEX_TIP = 8
+MIDDLE_TIP = 12
+
+
+class GestureController:
+    """Turns recognized gestures into Canvas operations.
+
+    Works on plain (21, 3) landmark arrays and has no Qt dependency, so the
+    live painter and the headless replay driver share the same code path.
+    ``on_clear`` is called when the thumbs-up gesture has been held long
+    enough; it defaults to clearing the canvas directly. A draw or erase
+    stroke is ended when tracking is lost (``lost_tracking``) or when more
+    than ``max_gap`` seconds pass between its points, so a hand that
+    reappears elsewhere does not join the two places with a line.
+    """
+
+    def __init__(self, canvas, on_clear=None, clear_hold_frames=30, clear_cooldown=3.0, erase_width=32,
+                 max_gap=0.25):
+        self.canvas = canvas
+        self.max_gap = max_gap
+        self._last_point_time = None
+        # Two-finger erasing covers more than the mouse eraser
+        self.erase_width = erase_width
+        self.on_clear = on_clear if on_clear is not None else canvas.clear
+        self.clear_hold_frames = clear_hold_frames
+        self.clear_cooldown = clear_cooldown
+        self._clear_frames = 0
+        self._last_clear_time = 0
+
+    def handle(self, gesture, positions, tip=None, now=None):
+        """Apply one frame's gesture; tip is the smoothed index tip if available"""
+        current_time = time.time() if now is None else now
+        if gesture in ("erase", "drawing"):
+            if self._last_point_time is not None and current_time - self._last_point_time > self.max_gap:
+                self.canvas.reset_previous_points()
+            self._last_point_time = current_time
+
+        if gesture == "clear":
+            self._clear_frames += 1
+            time_since_last = current_time - self._last_clear_time
+
+            if self._clear_frames >= self.clear_hold_frames and time_since_last > self.clear_cooldown:
+                self._clear_frames = 0
+                self._last_clear_time = current_time
+                print("[GESTURE] Canvas cleared with thumbs up gesture 👍")
+                self.on_clear()
+            return
+        else:
+            self._clear_frames = 0
+
+        if gesture == "erase":
+            index_tip, middle_tip = positions[INDEX_TIP], positions[MIDDLE_TIP]
+            midpoint = (
+                (index_tip[0] + middle_tip[0]) / 2,
+                (index_tip[1] + middle_tip[1]) / 2
+            )
+            self.canvas.erase(midpoint, self.erase_width)
+
+        elif gesture == "drawing":
+            if tip is None:
+                tip = positions[INDEX_TIP][:2]
+            self.canvas.draw((float(tip[0]), float(tip[1])))
+
+        elif gesture == "idle":
+            self.canvas.reset_previous_points()
+
+    def lost_tracking(self):
+        """End any open stroke; call for frames where no hand was found"""
+        self._last_point_time = None
+        self.canvas.reset_previous_points()
@@ -1,9 +1,21 @@
 import mediapipe as mp
 import cv2
-from collections import deque
+import time
+import numpy as np
+from collections import OrderedDict
+from filters import OneEuroFilter
+from profiler import profiler
+
+GESTURES = np.array(["idle", "drawing", "erase", "clear"])
+FINGER_TIPS = [8, 12, 16, 20]
+FINGER_PIPS = [6, 10, 14, 18]
 
 class HandTracker:
-    def __init__(self):
+    def __init__(self, roi_tracking=False, roi_padding=0.5, roi_scale=1.0, roi_min_size=0.3,
+                 gesture_tolerance=1e-3, gesture_cache_size=64, tip_filter=None):
+        """With roi_tracking enabled, frames after a detection are searched only in a
+        padded box around the previous hand, downscaled by roi_scale, before falling
+        back to the full frame when the hand is lost."""
         self.mp_hands = mp.solutions.hands
         self.hands = self.mp_hands.Hands(
             static_image_mode=False,
@@ -13,50 +25,137 @@ class HandTracker:
             min_tracking_confidence=0.5
         )
         self.mp_drawing = mp.solutions.drawing_utils
-        self.tip_history = deque(maxlen=3)  
-        self._cached_landmarks = None
-        self._last_gesture = None
+        self.tip_filter = tip_filter if tip_filter is not None else OneEuroFilter()
+        self.gesture_tolerance = gesture_tolerance
+        self.gesture_cache_size = gesture_cache_size
+        self._gesture_cache = OrderedDict()
+        self.roi_tracking = roi_tracking
+        self.roi_padding = roi_padding
+        self.roi_scale = roi_scale
+        self.roi_min_size = roi_min_size
+        self._hand_box = None
         
         
-    def get_smoothed_tip(self, tip):
-        self.tip_history.append((tip.x, tip.y))
-        avg_x = sum(p[0] for p in self.tip_history) / len(self.tip_history)
-        avg_y = sum(p[1] for p in self.tip_history) / len(self.tip_history)
-        return (avg_x, avg_y)
+    def get_smoothed_tip(self, tip, timestamp=None):
+        """Filter the index tip using the capture timestamp (seconds) of its frame"""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        return self.tip_filter(tip.x, tip.y, timestamp)
+
+    def set_tip_filter(self, tip_filter):
+        self.tip_filter = tip_filter
         
 
     def detect_hands(self, image):
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        result = self.hands.process(image_rgb)
+        result = None
+        if self.roi_tracking and self._hand_box is not None:
+            result = self._process_roi(image)
+        if result is None:
+            with profiler.stage('cvtColor'):
+                image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            with profiler.stage('hands.process'):
+                result = self.hands.process(image_rgb)
+
+        self._hand_box = self._landmark_box(result)
         if result.multi_hand_landmarks:
-            for landmarks in result.multi_hand_landmarks:
-                self.mp_drawing.draw_landmarks(image, landmarks, self.mp_hands.HAND_CONNECTIONS)
+            with profiler.stage('draw_landmarks'):
+                for landmarks in result.multi_hand_landmarks:
+                    self.mp_drawing.draw_landmarks(image, landmarks, self.mp_hands.HAND_CONNECTIONS)
         return image, result
 
+    def _roi_bounds(self, width, height):
+        """Pixel crop box around the previous hand, padded and clamped to the frame"""
+        x0, y0, x1, y1 = self._hand_box
+        side = max((x1 - x0) * width, (y1 - y0) * height) * (1 + 2 * self.roi_padding)
+        side = max(side, self.roi_min_size * min(width, height))
+        cx, cy = (x0 + x1) / 2 * width, (y0 + y1) / 2 * height
+        left = int(max(0, min(width - side, cx - side / 2)))
+        top = int(max(0, min(height - side, cy - side / 2)))
+        return left, top, min(width, int(left + side)), min(height, int(top + side))
+
+    def _process_roi(self, image):
+        """Run the model on the region of interest; None if the hand was not found"""
+        height, width = image.shape[:2]
+        left, top, right, bottom = self._roi_bounds(width, height)
+        crop = image[top:bottom, left:right]
+        if self.roi_scale != 1.0:
+            crop = cv2.resize(crop, None, fx=self.roi_scale, fy=self.roi_scale, interpolation=cv2.INTER_AREA)
+
+        with profiler.stage('cvtColor'):
+            crop = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+        with profiler.stage('hands.process[roi]'):
+            result = self.hands.process(crop)
+        if not result.multi_hand_landmarks:
+            return None
+
+        # Normalized crop coordinates do not depend on the downscale, only on the crop box
+        crop_w, crop_h = right - left, bottom - top
+        for landmarks in result.multi_hand_landmarks:
+            for lm in landmarks.landmark:
+                lm.x = (left + lm.x * crop_w) / width
+                lm.y = (top + lm.y * crop_h) / height
+                lm.z = lm.z * crop_w / width
+        return result
+
+    def _landmark_box(self, result):
+        if not result.multi_hand_landmarks:
+            return None
+        landmarks = result.multi_hand_landmarks[0].landmark
+        xs = [lm.x for lm in landmarks]
+        ys = [lm.y for lm in landmarks]
+        return min(xs), min(ys), max(xs), max(ys)
+
     def recognize_gesture(self, landmarks):
-      
-        if landmarks == self._cached_landmarks and self._last_gesture:
-            return self._last_gesture
+        return str(self.classify_gestures(landmarks_to_array(landmarks))[0])
 
-        import numpy as np
-        
-        positions = np.array([[lm.x, lm.y] for lm in landmarks.landmark])
-        
-        thumb_up = (positions[1][1] - positions[4][1]) > 0.1
-        
-        tips = positions[[8, 12, 16, 20]]
-        pips = positions[[6, 10, 14, 18]]
-        fingers_up = tips[:, 1] < pips[:, 1]
-        
-        if thumb_up and not np.any(fingers_up):
-            gesture = "clear"
-        elif fingers_up[0] and fingers_up[1] and not fingers_up[2] and not fingers_up[3]:
-            gesture = "erase"
-        elif fingers_up[0] and not np.any(fingers_up[1:]):
-            gesture = "drawing"
+    def classify_gestures(self, positions):
+        """Classify an (N, 21, 2|3) landmark array, memoized by value.
+
+        Arrays that agree to within ``gesture_tolerance`` after rounding share
+        a cache entry; a tolerance of None only reuses exact matches.
+        """
+        positions = np.asarray(positions, dtype=np.float32)
+        if positions.ndim == 2:
+            positions = positions[np.newaxis]
+
+        xy = positions[..., :2]
+        if self.gesture_tolerance:
+            key = np.round(xy / self.gesture_tolerance).astype(np.int32).tobytes()
+        else:
+            key = xy.tobytes()
+        key = (xy.shape[0], key)
+
+        gestures = self._gesture_cache.get(key)
+        if gestures is None:
+            gestures = classify_gestures(positions)
+            self._gesture_cache[key] = gestures
+            if len(self._gesture_cache) > self.gesture_cache_size:
+                self._gesture_cache.popitem(last=False)
         else:
-            gesture = "idle"
-            
-        self._cached_landmarks = landmarks
-        self._last_gesture = gesture
-        return gesture
+            self._gesture_cache.move_to_end(key)
+        return gestures
+
+
+def landmarks_to_array(landmarks):
+    """Convert a MediaPipe landmark list into a (21, 3) float32 array"""
+    return np.array([(lm.x, lm.y, getattr(lm, 'z', 0.0)) for lm in landmarks.landmark], dtype=np.float32)
+
+
+def classify_gestures(positions):
+    """Vectorized gesture classification over an (N, 21, 2|3) landmark array.
+
+    Returns an array of N gesture names ("clear", "erase", "drawing" or "idle").
+    """
+    positions = np.asarray(positions)
+    if positions.ndim == 2:
+        positions = positions[np.newaxis]
+    y = positions[..., 1]
+
+    thumb_up = (y[:, 1] - y[:, 4]) > 0.1
+    fingers_up = y[:, FINGER_TIPS] < y[:, FINGER_PIPS]
+    others_down = ~fingers_up[:, 1:].any(axis=1)
+
+    clear = thumb_up & ~fingers_up.any(axis=1)
+    erase = fingers_up[:, 0] & fingers_up[:, 1] & ~fingers_up[:, 2] & ~fingers_up[:, 3]
+    drawing = fingers_up[:, 0] & others_down
+    return GESTURES[np.select([clear, erase, drawing], [3, 2, 1], 0)]
@@ -0,0 +1,126 @@
+from collections import deque
+
+
+class HistoryEntry:
+    """Tiles touched by one canvas operation, before and after it ran"""
+    __slots__ = ('tiles', 'nbytes', 'action')
+
+    def __init__(self, tiles, action=None):
+        self.tiles = tiles
+        self.nbytes = sum(before.nbytes + after.nbytes for _, _, before, after in tiles)
+        self.action = action
+
+
+class TileHistory:
+    """Delta undo history that stores only the canvas tiles an operation touched.
+
+    An operation is recorded in three steps: ``begin`` opens it, ``touch``
+    snapshots every tile inside a bounding box the first time the operation
+    reaches it, and ``commit`` captures the same tiles after rasterization.
+    The total size of the undo and redo stacks is kept under
+    ``memory_budget`` bytes by evicting the oldest undo entries first.
+    """
+
+    def __init__(self, tile_size=64, memory_budget=32 * 1024 * 1024):
+        self.tile_size = tile_size
+        self.memory_budget = memory_budget
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.nbytes = 0
+        self._pending = None
+
+    def __len__(self):
+        return len(self.undo_stack)
+
+    def begin(self):
+        if self._pending is None:
+            self._pending = {}
+
+    def touch(self, image, x0, y0, x1, y1):
+        """Snapshot the tiles covering the inclusive box (x0, y0)-(x1, y1)"""
+        if self._pending is None:
+            self.begin()
+
+        height, width = image.shape[:2]
+        x0, x1 = max(0, x0), min(width - 1, x1)
+        y0, y1 = max(0, y0), min(height - 1, y1)
+        if x0 > x1 or y0 > y1:
+            return
+
+        size = self.tile_size
+        for ty in range(y0 // size, y1 // size + 1):
+            for tx in range(x0 // size, x1 // size + 1):
+                if (ty, tx) not in self._pending:
+                    self._pending[(ty, tx)] = image[ty * size:(ty + 1) * size,
+                                                    tx * size:(tx + 1) * size].copy()
+
+    def commit(self, image, action=None):
+        """Close the pending operation and push it onto the undo stack"""
+        pending, self._pending = self._pending, None
+        if not pending:
+            return None
+
+        size = self.tile_size
+        tiles = [(ty, tx, before, image[ty * size:(ty + 1) * size,
+                                        tx * size:(tx + 1) * size].copy())
+                 for (ty, tx), before in pending.items()]
+        entry = HistoryEntry(tiles, action)
+
+        self._drop_redo()
+        self.undo_stack.append(entry)
+        self.nbytes += entry.nbytes
+        self._evict()
+        return entry
+
+    def discard(self):
+        """Drop the pending operation without recording it"""
+        self._pending = None
+
+    def undo(self, image):
+        """Restore the tiles of the last operation, returning its entry"""
+        if not self.undo_stack:
+            return None
+        entry = self.undo_stack.pop()
+        self._apply(image, entry, before=True)
+        self.redo_stack.append(entry)
+        return entry
+
+    def redo(self, image):
+        """Re-apply the last undone operation, returning its entry"""
+        if not self.redo_stack:
+            return None
+        entry = self.redo_stack.pop()
+        self._apply(image, entry, before=False)
+        self.undo_stack.append(entry)
+        return entry
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.nbytes = 0
+        self._pending = None
+
+    def entry_bounds(self, entry):
+        """Inclusive pixel box (x0, y0, x1, y1) covering every tile of an entry"""
+        size = self.tile_size
+        x0 = min(tx for _, tx, _, _ in entry.tiles) * size
+        y0 = min(ty for ty, _, _, _ in entry.tiles) * size
+        x1 = max(tx * size + tile.shape[1] for _, tx, tile, _ in entry.tiles) - 1
+        y1 = max(ty * size + tile.shape[0] for ty, _, tile, _ in entry.tiles) - 1
+        return x0, y0, x1, y1
+
+    def _apply(self, image, entry, before):
+        size = self.tile_size
+        for ty, tx, old, new in entry.tiles:
+            tile = old if before else new
+            image[ty * size:ty * size + tile.shape[0],
+                  tx * size:tx * size + tile.shape[1]] = tile
+
+    def _drop_redo(self):
+        for entry in self.redo_stack:
+            self.nbytes -= entry.nbytes
+        self.redo_stack.clear()
+
+    def _evict(self):
+        while self.nbytes > self.memory_budget and self.undo_stack:
+            self.nbytes -= self.undo_stack.popleft().nbytes
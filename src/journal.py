@@ -0,0 +1,215 @@
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+
+# Seconds the writer waits on a lock held by another connection (e.g. VACUUM)
+BUSY_TIMEOUT = 30.0
+# Rows that could not be written are retried this often...
+RETRY_INTERVAL = 1.0
+# ...and dropped after this many failed attempts in a row
+MAX_RETRIES = 60
+# Ids claimed from the database at a time
+ID_BLOCK = 1024
+# How often a waiting flush() checks that the writer thread is still alive
+FLUSH_POLL = 0.5
+
+
+class ActionJournal:
+    """Write-behind journal for drawing actions.
+
+    Actions are queued from the UI thread and written by a background thread
+    that owns a single WAL-mode connection. Rows are group-committed once
+    ``batch_size`` rows are pending or ``flush_interval`` seconds have passed
+    since the first pending row. Row ids are assigned at enqueue time so
+    callers still get the id back immediately; they come from blocks claimed
+    in the database's own sequence, so several journals on one file never
+    hand out the same id. A batch that fails because the database is locked
+    or busy is kept and retried up to ``max_retries`` times. Any other
+    failure is narrowed down to the rows that caused it; those are dropped,
+    reported and counted in ``dropped``.
+    """
+
+    def __init__(self, db_file, batch_size=64, flush_interval=0.25, busy_timeout=BUSY_TIMEOUT,
+                 retry_interval=RETRY_INTERVAL, max_retries=MAX_RETRIES, id_block=ID_BLOCK):
+        self.db_file = db_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.busy_timeout = busy_timeout
+        self.retry_interval = retry_interval
+        self.max_retries = max_retries
+        self.id_block = id_block
+        self.dropped = 0
+        self.last_error = None
+        self._queue = queue.Queue()
+        self._id_lock = threading.Lock()
+        self._next_id, self._end_id = self._reserve_ids()
+        # The writer claims the next block in a batch's transaction, before this one runs out
+        self._spare = None
+        self._held = []
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="ActionJournal", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _reserve_ids(self):
+        """Claim a block of ids on a connection of its own; returns (first, end)"""
+        conn = sqlite3.connect(self.db_file, timeout=self.busy_timeout)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            block = self._claim_ids(conn)
+            conn.commit()
+        finally:
+            conn.close()
+        return block
+
+    def _claim_ids(self, conn):
+        """Advance sqlite_sequence past id_block more ids inside conn's transaction"""
+        conn.execute('''
+            INSERT INTO sqlite_sequence (name, seq) SELECT 'drawing_actions', 0
+            WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'drawing_actions')
+        ''')
+        conn.execute('''
+            UPDATE sqlite_sequence
+            SET seq = MAX(seq, (SELECT COALESCE(MAX(id), 0) FROM drawing_actions)) + ?
+            WHERE name = 'drawing_actions'
+        ''', (self.id_block,))
+        end = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'drawing_actions'").fetchone()[0]
+        return end - self.id_block + 1, end + 1
+
+    def append(self, action_type, points, color=None, width=None, started_at=None, ended_at=None,
+               session_id=None):
+        """Queue an already encoded action and return the id it will be stored under"""
+        if self._closed:
+            raise RuntimeError("Journal is closed")
+        with self._id_lock:
+            if self._next_id >= self._end_id:
+                block, self._spare = self._spare, None
+                self._next_id, self._end_id = block or self._reserve_ids()
+            action_id = self._next_id
+            self._next_id += 1
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+        self._queue.put(('row', (action_id, action_type, points, color, timestamp,
+                                 width, started_at, ended_at, session_id)))
+        return action_id
+
+    def submit(self, callback):
+        """Run callback(conn) on the writer thread, ordered after queued actions"""
+        if self._closed:
+            raise RuntimeError("Journal is closed")
+        self._queue.put(('call', callback))
+
+    def flush(self):
+        """Block until every queued action has been handled. Returns False if
+        some are still waiting for a retry or the writer thread has died."""
+        if self._closed or not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        while not done.wait(FLUSH_POLL):
+            if not self._thread.is_alive():
+                print("[ERROR] The journal writer stopped; queued drawing actions were not written")
+                return False
+        return not self._held
+
+    def close(self):
+        """Flush pending actions and stop the writer thread"""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(('stop', None))
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_file, timeout=self.busy_timeout)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+
+        held = []
+        attempts = 0
+        running = True
+        while running:
+            try:
+                kind, payload = self._queue.get(timeout=self.retry_interval if held else None)
+            except queue.Empty:
+                kind, payload = 'retry', None
+            rows, waiters = list(held), []
+            deadline = time.monotonic() + self.flush_interval
+
+            while True:
+                if kind in ('row', 'call'):
+                    rows.append(payload)
+                elif kind == 'flush':
+                    waiters.append(payload)
+                elif kind == 'stop':
+                    running = False
+
+                if not running or waiters or kind == 'retry' or len(rows) >= self.batch_size:
+                    break
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    kind, payload = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+
+            held = self._write(conn, rows) if rows else []
+            attempts = attempts + 1 if held else 0
+            if held and (attempts > self.max_retries or not running):
+                self._drop(held, f"still failing after {attempts} attempts")
+                held, attempts = [], 0
+            self._held = held
+            for done in waiters:
+                done.set()
+        conn.close()
+
+    def _drop(self, rows, reason):
+        self.dropped += len(rows)
+        print(f"[ERROR] Dropped {len(rows)} drawing actions: {reason}")
+
+    def _write(self, conn, rows):
+        """Commit rows in one transaction and return the ones to try again"""
+        try:
+            pending = []
+            for row in rows:
+                if callable(row):
+                    self._insert(conn, pending)
+                    pending = []
+                    row(conn)
+                else:
+                    pending.append(row)
+            self._insert(conn, pending)
+            spare = None
+            if self._spare is None and self._end_id - self._next_id < self.id_block // 2:
+                spare = self._claim_ids(conn)
+            conn.commit()
+            if spare is not None:
+                with self._id_lock:
+                    self._spare = spare
+        except sqlite3.OperationalError as e:
+            conn.rollback()
+            self.last_error = e
+            print(f"[WARNING] Could not write {len(rows)} drawing actions, retrying: {e}")
+            return rows
+        except Exception as e:
+            conn.rollback()
+            self.last_error = e
+            if len(rows) == 1:
+                self._drop(rows, e)
+                return []
+            # Write them one by one so only the rows that fail are lost
+            return [row for single in rows for row in self._write(conn, [single])]
+        return []
+
+    def _insert(self, conn, rows):
+        if rows:
+            conn.executemany('''
+                INSERT INTO drawing_actions
+                    (id, action_type, points, color, timestamp, width, started_at, ended_at, session_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
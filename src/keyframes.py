@@ -0,0 +1,70 @@
+from bisect import bisect_right, insort
+
+MAX_ACTION_ID = 2 ** 63 - 1
+
+
+class KeyframeIndex:
+    """Periodic raster keyframes indexed by the id of the last action they include.
+
+    A keyframe is taken every ``interval`` logged strokes. Only the newest
+    ``max_keyframes`` are held in memory; with ``persist`` enabled every
+    keyframe is also written to the database so an undo after a restart can
+    still start from a nearby raster instead of an empty canvas.
+    """
+
+    def __init__(self, db=None, interval=20, max_keyframes=8, persist=True):
+        self.db = db
+        self.interval = interval
+        self.max_keyframes = max_keyframes
+        self.persist = persist
+        self._ids = []
+        self._frames = {}
+        self._since_last = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def capture(self, action_id, image):
+        """Count a logged action and take a keyframe if one is due"""
+        self._since_last += 1
+        if self._since_last < self.interval:
+            return False
+        self._since_last = 0
+
+        frame = image.copy()
+        insort(self._ids, action_id)
+        self._frames[action_id] = frame
+        while len(self._ids) > self.max_keyframes:
+            del self._frames[self._ids.pop(0)]
+
+        if self.persist and self.db:
+            self.db.save_keyframe(action_id, frame)
+        return True
+
+    def nearest(self, action_id=None):
+        """Return (keyframe_id, image) for the newest keyframe at or before action_id"""
+        if action_id is None:
+            action_id = MAX_ACTION_ID
+        pos = bisect_right(self._ids, action_id)
+        if pos:
+            kf_id = self._ids[pos - 1]
+            return kf_id, self._frames[kf_id].copy()
+        if self.persist and self.db:
+            return self.db.get_keyframe(action_id)
+        return None
+
+    def invalidate_from(self, action_id):
+        """Drop keyframes that include the given action or any later one"""
+        pos = bisect_right(self._ids, action_id - 1)
+        for kf_id in self._ids[pos:]:
+            del self._frames[kf_id]
+        del self._ids[pos:]
+        self._since_last = 0
+
+        if self.persist and self.db:
+            self.db.delete_keyframes_from(action_id)
+
+    def clear(self):
+        self._ids.clear()
+        self._frames.clear()
+        self._since_last = 0
@@ -0,0 +1,139 @@
+"""Per-stage timing for the capture -> tracking -> canvas -> paint pipeline.
+
+Wrap a stage in ``with profiler.stage('name'):``. While the profiler is
+disabled (the default) that is one attribute check returning a shared no-op
+context manager; enabled, every stage keeps its latest durations in a ring
+buffer so percentiles always describe the recent past:
+
+    profiler.enable()
+    ...
+    profiler.summary()            # {'stages': {...}, 'fps': ..., 'dropped_frames': ...}
+    profiler.export_csv('profile.csv')
+"""
+import csv
+import json
+import time
+from contextlib import nullcontext
+
+import numpy as np
+
+_NO_STAGE = nullcontext()
+
+
+class StageTimes:
+    """Ring buffer of the most recent durations of one stage, in seconds"""
+    __slots__ = ('samples', 'count')
+
+    def __init__(self, capacity):
+        self.samples = np.zeros(capacity)
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples[self.count % len(self.samples)] = seconds
+        self.count += 1
+
+    def recent(self):
+        return self.samples[:min(self.count, len(self.samples))].copy()
+
+
+class _Stage:
+    """Reusable timing context for one stage name; stages with the same name do not nest"""
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+
+
+class Profiler:
+    def __init__(self, enabled=False, capacity=512):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.hud = False
+        self.dropped_frames = 0
+        self._stages = {}
+        self._contexts = {}
+        self._frames = StageTimes(capacity)
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def reset(self):
+        self._stages = {}
+        self._frames = StageTimes(self.capacity)
+        self.dropped_frames = 0
+
+    def stage(self, name):
+        """Context manager timing one stage; free when the profiler is off"""
+        if not self.enabled:
+            return _NO_STAGE
+        context = self._contexts.get(name)
+        if context is None:
+            context = self._contexts[name] = _Stage(self, name)
+        return context
+
+    def record(self, name, seconds):
+        times = self._stages.get(name)
+        if times is None:
+            times = self._stages[name] = StageTimes(self.capacity)
+        times.add(seconds)
+
+    def frame(self):
+        """Mark one displayed frame, for the effective FPS"""
+        if self.enabled:
+            self._frames.add(time.perf_counter())
+
+    def fps(self):
+        stamps = np.sort(self._frames.recent())
+        if len(stamps) < 2 or stamps[-1] == stamps[0]:
+            return 0.0
+        return (len(stamps) - 1) / (stamps[-1] - stamps[0])
+
+    def summary(self):
+        stages = {}
+        for name, times in list(self._stages.items()):
+            millis = times.recent() * 1e3
+            p50, p95, p99 = np.percentile(millis, [50, 95, 99])
+            stages[name] = {
+                'count': times.count,
+                'p50_ms': float(p50),
+                'p95_ms': float(p95),
+                'p99_ms': float(p99),
+                'max_ms': float(millis.max()),
+            }
+        return {'stages': stages, 'fps': self.fps(), 'dropped_frames': self.dropped_frames}
+
+    def hud_lines(self):
+        """Short text lines for the on-screen overlay"""
+        summary = self.summary()
+        lines = [f"{summary['fps']:5.1f} fps   dropped {summary['dropped_frames']}",
+                 f"{'stage':22} {'p50':>6} {'p95':>6} {'p99':>6}"]
+        for name, s in sorted(summary['stages'].items(), key=lambda item: -item[1]['p95_ms']):
+            lines.append(f"{name:22} {s['p50_ms']:6.2f} {s['p95_ms']:6.2f} {s['p99_ms']:6.2f} ms")
+        return lines
+
+    def export_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def export_csv(self, path):
+        summary = self.summary()
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['stage', 'count', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'])
+            for name, s in summary['stages'].items():
+                writer.writerow([name, s['count'], f"{s['p50_ms']:.4f}", f"{s['p95_ms']:.4f}",
+                                 f"{s['p99_ms']:.4f}", f"{s['max_ms']:.4f}"])
+            writer.writerow(['fps', f"{summary['fps']:.2f}", '', '', '', ''])
+            writer.writerow(['dropped_frames', summary['dropped_frames'], '', '', '', ''])
+
+
+profiler = Profiler()
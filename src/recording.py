@@ -0,0 +1,159 @@
+"""Landmark session recordings and a camera-free replay driver.
+
+A recording is a 16-byte header followed by fixed-size little-endian
+records, one per processed frame, so it can be memory-mapped straight into
+a NumPy structured array:
+
+    header  magic b'DWREC\\0' | version u2 | frame count u4 | reserved u4
+    record  timestamp f8 | gesture u1 | has_hand u1 | pad 6 | landmarks f4[21][3]
+
+Replay from the command line:
+
+    python src/recording.py session.dwrec --realtime --out replay.png
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+MAGIC = b'DWREC\x00'
+VERSION = 1
+HEADER = struct.Struct('<6sHII')
+
+GESTURE_CODES = ["idle", "drawing", "erase", "clear"]
+NO_GESTURE = 255
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('gesture', 'u1'),
+    ('has_hand', 'u1'),
+    ('pad', 'u1', (6,)),
+    ('landmarks', '<f4', (21, 3)),
+])
+
+
+class SessionRecorder:
+    """Appends one record per processed frame to a recording file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.frame_count = 0
+        self._record = np.zeros(1, dtype=RECORD_DTYPE)
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+
+    def record(self, timestamp, positions=None, gesture=None):
+        """Write one frame; positions is a (21, 3) landmark array or None without a hand"""
+        rec = self._record[0]
+        rec['timestamp'] = timestamp
+        rec['gesture'] = GESTURE_CODES.index(gesture) if gesture in GESTURE_CODES else NO_GESTURE
+        rec['has_hand'] = positions is not None
+        rec['landmarks'] = positions if positions is not None else 0
+        self._file.write(self._record.tobytes())
+        self.frame_count += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, self.frame_count, 0))
+        self._file.close()
+
+
+def load_recording(path):
+    """Memory-map a recording as a structured array of RECORD_DTYPE"""
+    with open(path, 'rb') as f:
+        magic, version, frame_count, _ = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a DrawWave recording")
+    if version != VERSION:
+        raise ValueError(f"Unsupported recording version {version}")
+
+    # A recorder that never closed (e.g. a crash) leaves the count at zero
+    available = (os.path.getsize(path) - HEADER.size) // RECORD_DTYPE.itemsize
+    if frame_count == 0 or frame_count > available:
+        frame_count = available
+    if frame_count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER.size, shape=(frame_count,))
+
+
+def replay_frame(record, controller, tip_filter=None):
+    """Feed a single recorded frame to a GestureController"""
+    if not record['has_hand']:
+        controller.lost_tracking()
+        return
+    if record['gesture'] == NO_GESTURE:
+        return
+    timestamp = float(record['timestamp'])
+    positions = record['landmarks']
+    tip = None
+    if tip_filter is not None:
+        tip = tip_filter(float(positions[8, 0]), float(positions[8, 1]), timestamp)
+    controller.handle(GESTURE_CODES[record['gesture']], positions, tip, now=timestamp)
+
+
+def replay(records, controller, realtime=False, tip_filter=None, on_frame=None):
+    """Stream recorded frames through a GestureController.
+
+    With ``realtime`` the original frame spacing is kept; otherwise frames
+    are fed as fast as possible. ``tip_filter`` re-runs tip smoothing on
+    the recorded timestamps, and ``on_frame(index, record)`` is called after
+    each frame. Returns the number of frames replayed.
+    """
+    if len(records) == 0:
+        return 0
+    start_wall = time.monotonic()
+    start_rec = float(records[0]['timestamp'])
+
+    for i, rec in enumerate(records):
+        timestamp = float(rec['timestamp'])
+        if realtime:
+            delay = (timestamp - start_rec) - (time.monotonic() - start_wall)
+            if delay > 0:
+                time.sleep(delay)
+
+        replay_frame(rec, controller, tip_filter)
+        if on_frame is not None:
+            on_frame(i, rec)
+    controller.canvas.reset_previous_points()
+    return len(records)
+
+
+def main(argv=None):
+    from canvas import Canvas
+    from database import Database
+    from filters import make_tip_filter
+    from gestures import GestureController
+
+    parser = argparse.ArgumentParser(description="Replay a DrawWave landmark recording headlessly")
+    parser.add_argument('recording')
+    parser.add_argument('--realtime', action='store_true', help='keep the recorded frame timing')
+    parser.add_argument('--raw-tip', action='store_true', help='draw from the raw index tip without smoothing')
+    parser.add_argument('--db', help='log the replayed strokes to this database')
+    parser.add_argument('--out', help='save the final canvas to this image file')
+    args = parser.parse_args(argv)
+
+    records = load_recording(args.recording)
+    db = Database(args.db) if args.db else None
+    canvas = Canvas(db=db)
+    controller = GestureController(canvas)
+
+    start = time.perf_counter()
+    frames = replay(records, controller, args.realtime, None if args.raw_tip else make_tip_filter())
+    elapsed = time.perf_counter() - start
+
+    if db:
+        db.close()
+    if args.out:
+        canvas.save(args.out)
+    per_frame = elapsed / frames * 1e3 if frames else 0
+    print(f"[REPLAY] {frames} frames in {elapsed:.3f}s ({per_frame:.3f} ms/frame)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Rebuild the live session's raster from the database at startup.
+
+The newest stored keyframe of the session (or, failing that, the snapshot
+the session was started on) is the starting point; only actions logged
+after it are replayed. Actions are read in one bulk query as NumPy columns
+and drawn with ``rasterize_actions``, so tens of thousands of segments
+replay in a fraction of a second. Tiled boards keep no keyframes; their
+whole session is replayed into a TileStore. ``SessionRestore`` does either
+off the UI thread.
+"""
+import time
+
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from keyframes import MAX_ACTION_ID
+from stroke import iter_strokes, rasterize_actions
+from tiled_canvas import TileStore, replay_strokes
+
+# Strokes replayed onto a tiled board between progress reports
+TILED_PROGRESS_CHUNK = 256
+
+
+def starting_image(db, width, height):
+    """(id of the last action it includes, image) to replay the current session from"""
+    keyframe = db.get_keyframe(MAX_ACTION_ID)
+    if keyframe is not None and keyframe[1].shape == (height, width, 3):
+        return keyframe
+    base = db.get_session_base(db.session_id)
+    if base is not None and base.shape == (height, width, 3):
+        return 0, base
+    return 0, np.full((height, width, 3), 255, dtype=np.uint8)
+
+
+def restore_session(db, width, height, progress=None):
+    """Return (image, last action id) for the current session as logged so far"""
+    session_id = db.session_id
+    after_id, image = starting_image(db, width, height)
+    arrays = db.get_action_arrays(after_id=after_id, session_id=session_id)
+    rasterize_actions(image, arrays, progress)
+    last_id = int(arrays['id'][-1]) if len(arrays['id']) else after_id
+    return image, last_id
+
+
+def restore_tiles(db, width, height, tile_size, progress=None):
+    """Like restore_session for a tiled canvas, returning a TileStore.
+
+    Tiled canvases keep no keyframes, so the whole session is replayed onto
+    the raster it started from, a chunk of points at a time.
+    """
+    session_id = db.session_id
+    store = db.get_session_base(session_id, tile_size)
+    if store is None or store.shape != (height, width, 3):
+        store = TileStore(width, height, tile_size)
+    arrays = db.get_action_arrays(session_id=session_id)
+    strokes = list(iter_strokes(arrays))
+    for start in range(0, len(strokes), TILED_PROGRESS_CHUNK):
+        replay_strokes(store, strokes[start:start + TILED_PROGRESS_CHUNK])
+        if progress is not None:
+            progress(min(start + TILED_PROGRESS_CHUNK, len(strokes)), len(strokes))
+    last_id = int(arrays['id'][-1]) if len(arrays['id']) else 0
+    return store, last_id
+
+
+class SessionRestore(QThread):
+    """Restores the current session in the background.
+
+    ``progress`` reports (actions drawn, total); ``restored`` delivers the
+    image and the id of the last action it includes, for Canvas.restore.
+    With ``tile_size`` the image is a TileStore for a tiled canvas.
+    """
+    progress = pyqtSignal(int, int)
+    restored = pyqtSignal(object, int)
+
+    def __init__(self, db, width, height, tile_size=None, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.session_id = db.session_id
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.elapsed = None
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            if self.tile_size is None:
+                image, last_id = restore_session(self.db, self.width, self.height, self.progress.emit)
+            else:
+                image, last_id = restore_tiles(self.db, self.width, self.height, self.tile_size,
+                                               self.progress.emit)
+        except Exception as e:
+            print(f"[WARNING] Could not restore session {self.session_id}: {e}")
+            return
+        self.elapsed = time.perf_counter() - start
+        print(f"[RESTORE] Session {self.session_id} restored in {self.elapsed * 1000:.0f} ms")
+        self.restored.emit(image, last_id)
@@ -4,8 +4,7 @@ from PyQt5.QtGui import QFont, QLinearGradient, QPalette, QColor, QBrush, QIcon
 import sys
 import os
 from resource_path import resource_path
-
-from virtual_painter_gui import VirtualPainterGUI
+from startup import Warmup, startup_timer
 
 class StartScreen(QWidget):
     def __init__(self):
@@ -69,11 +68,28 @@ class StartScreen(QWidget):
 
         self.setLayout(layout)
 
+        # Load the painter, hand model and camera while the start screen is up
+        self.warmup = Warmup(resource_path('virtual_painter.db'))
+        self.warmup.start()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        startup_timer.mark('start_screen_shown')
+
     def start_button_click(self):
+        # Imported here so cv2 and mediapipe load on the warm-up thread, not before the window shows
+        from virtual_painter_gui import VirtualPainterGUI
+        warmup, self.warmup = self.warmup, None
         self.close()
-        self.painter_gui = VirtualPainterGUI()
+        self.painter_gui = VirtualPainterGUI(warmup)
         self.painter_gui.show()
 
+    def closeEvent(self, event):
+        if self.warmup is not None:
+            self.warmup.discard()
+            self.warmup = None
+        super().closeEvent(event)
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = StartScreen()
@@ -0,0 +1,164 @@
+"""Staged startup: timing marks and a background warm-up of the heavy parts.
+
+The start screen starts a ``Warmup`` thread that opens the database, imports
+the painter module (cv2, numpy, mediapipe), builds and primes the hand model
+and opens the frame source while the user is still looking at the start
+screen. The painter window takes the results over when they are ready.
+"""
+import threading
+import time
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+PROCESS_START = time.perf_counter()
+
+
+class StartupTimer:
+    """Records how long each startup stage took to finish, once per process"""
+
+    def __init__(self, start=PROCESS_START):
+        self.start = start
+        self.marks = {}
+
+    def mark(self, name):
+        """Record a stage as finished now, in seconds since startup began"""
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.start
+            print(f"[STARTUP] {name}: {self.marks[name] * 1000:.0f} ms")
+        return self.marks[name]
+
+    def summary(self):
+        return {name: round(seconds, 4) for name, seconds in self.marks.items()}
+
+
+startup_timer = StartupTimer()
+
+
+class Warmup(QThread):
+    """Prepares the database, hand tracker and frame source off the UI thread.
+
+    ``ready`` is emitted once everything that could be prepared is; check
+    ``hand_tracker`` and ``source`` for what actually succeeded. The painter
+    takes ownership of the database and source with ``take()``.
+    """
+    ready = pyqtSignal()
+
+    def __init__(self, db_file, max_camera_index=4, parent=None):
+        super().__init__(parent)
+        self.db_file = db_file
+        self.max_camera_index = max_camera_index
+        self.db = None
+        self.hand_tracker = None
+        self.source = None
+        self.camera_index = 0
+        self.cameras = None
+        self.done = False
+        self._db_ready = threading.Event()
+
+    def run(self):
+        try:
+            from database import Database
+            self.db = Database(self.db_file)
+            startup_timer.mark('database_ready')
+        except Exception as e:
+            print(f"[ERROR] Could not open the database: {e}")
+        finally:
+            self._db_ready.set()
+
+        # The camera opens while the hand model loads; both take hundreds of ms
+        camera = threading.Thread(target=self._open_source, daemon=True)
+        camera.start()
+        try:
+            import virtual_painter_gui  # noqa: F401  pulls in cv2, numpy and mediapipe
+            startup_timer.mark('modules_imported')
+            self._load_hand_tracker()
+        except Exception as e:
+            print(f"[ERROR] Hand tracker warm-up failed: {e}")
+        camera.join()
+        self.done = True
+        self.ready.emit()
+
+    def wait_for_db(self, timeout=None):
+        """Block until the database is open and return it"""
+        self._db_ready.wait(timeout)
+        return self.db
+
+    def take(self):
+        """Hand the database, hand tracker, source, camera index and camera registry to the caller"""
+        self.wait()
+        taken = self.db, self.hand_tracker, self.source, self.camera_index, self.cameras
+        self.db = self.hand_tracker = self.source = self.cameras = None
+        return taken
+
+    def discard(self):
+        """Release whatever was prepared but never taken"""
+        self.wait()
+        if self.source is not None:
+            self.source.release()
+        if self.db is not None:
+            self.db.close()
+        self.db = self.hand_tracker = self.source = self.cameras = None
+
+    def _load_hand_tracker(self):
+        import numpy as np
+        from hand_tracking import HandTracker
+
+        roi_tracking = self.db is not None and self.db.get_setting('roi_tracking') == '1'
+        tracker = HandTracker(roi_tracking=roi_tracking)
+        # The first inference loads the model weights; do it here instead of on the first frame
+        tracker.detect_hands(np.zeros((480, 640, 3), dtype=np.uint8))
+        self.hand_tracker = tracker
+        startup_timer.mark('hand_model_ready')
+
+    def _open_source(self):
+        from camera_registry import CameraRegistry
+        from frame_source import open_source
+
+        self._db_ready.wait()
+        self.cameras = CameraRegistry(self.db, self.max_camera_index)
+        spec = saved = None
+        if self.db is not None:
+            spec = self.db.get_setting('frame_source')
+            saved = self.db.get_setting('camera_index')
+        if spec:
+            self._try_open(open_source(spec), 0)
+            return
+
+        # The saved camera first, then whatever worked last time, then a full concurrent probe
+        tried = set()
+        if self._open_camera(int(saved) if saved and saved.isdigit() else 0, tried):
+            return
+        for index in self.cameras.available():
+            if self._open_camera(index, tried):
+                return
+        for index in self.cameras.probe(skip=tried):
+            if self._open_camera(index, tried):
+                return
+        print("[WARNING] No cameras found")
+
+    def _open_camera(self, index, tried):
+        from frame_source import CameraSource
+
+        if index in tried:
+            return False
+        tried.add(index)
+        if not self._try_open(CameraSource(index), index):
+            self.cameras.mark_failure(index)
+            return False
+        self.cameras.mark_success(index, *self.source.resolution, self.source.fps)
+        self.cameras.revalidate_async(skip={index})
+        return True
+
+    def _try_open(self, source, index):
+        from frame_source import open_checked
+
+        try:
+            source = open_checked(source)
+        except Exception as e:
+            print(f"[WARNING] Error opening camera {index}: {e}")
+            return False
+        if source is None:
+            return False
+        self.source, self.camera_index = source, index
+        startup_timer.mark('camera_open')
+        return True
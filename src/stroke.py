@@ -0,0 +1,156 @@
+import time
+from array import array
+
+import cv2
+import numpy as np
+
+from database import decode_color
+
+ERASE_COLOR = (255, 255, 255)
+
+# Widths the canvas used for actions logged before strokes stored their width
+DEFAULT_DRAW_WIDTH = 10
+DEFAULT_ERASE_WIDTH = 20
+
+# Actions rasterize_actions draws between progress reports
+RASTERIZE_CHUNK = 2048
+
+
+class Stroke:
+    """Points collected from pen-down to pen-up with the style they were drawn in.
+
+    Points are canvas pixel coordinates held interleaved (x0, y0, x1, y1, ...)
+    in a growable int16 array, so a stroke of a few hundred points costs a
+    few hundred bytes rather than a list of tuples.
+    """
+    __slots__ = ('tool', 'color', 'width', 'points', 'started_at', 'ended_at')
+
+    def __init__(self, tool, color, width, points=None, started_at=None, ended_at=None):
+        self.tool = tool
+        self.color = tuple(color)
+        self.width = int(width)
+        self.points = array('h', points or ())
+        self.started_at = time.time() if started_at is None else started_at
+        self.ended_at = ended_at
+
+    @classmethod
+    def from_action(cls, action, default_width):
+        """Build a stroke from a decoded drawing_actions row"""
+        color = action['color'] if action['color'] else ERASE_COLOR
+        width = action.get('width') or default_width
+        stroke = cls(action['action_type'], color, width, None,
+                     action.get('started_at'), action.get('ended_at'))
+        points = np.asarray(action['points'], dtype=np.int16)
+        if points.size:
+            stroke.points.frombytes(np.ascontiguousarray(points[:, :2]).tobytes())
+        return stroke
+
+    @classmethod
+    def from_arrays(cls, arrays, i):
+        """Build action i of bulk-read actions (see Database.get_action_arrays)"""
+        color, width = action_style(arrays, i)
+        stroke = cls(arrays['action_type'][i], color, width)
+        stroke.points.frombytes(arrays['points'][arrays['offsets'][i]:arrays['offsets'][i + 1]].tobytes())
+        return stroke
+
+    def __len__(self):
+        return len(self.points) // 2
+
+    def add_point(self, point):
+        self.points.append(point[0])
+        self.points.append(point[1])
+
+    def last_point(self):
+        if not self.points:
+            return None
+        return (self.points[-2], self.points[-1])
+
+    def point_list(self):
+        pts = self.points
+        return [(pts[i], pts[i + 1]) for i in range(0, len(pts), 2)]
+
+    def finish(self):
+        self.ended_at = time.time()
+
+    def bounds(self, start=0, end=None):
+        """Inclusive pixel box covered by the points from index start up to end, padded by the width"""
+        stop = None if end is None else 2 * end
+        xs = self.points[max(0, start - 1) * 2:stop:2]
+        ys = self.points[max(0, start - 1) * 2 + 1:stop:2]
+        pad = self.width // 2 + 2
+        return min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad
+
+    def rasterize(self, image, start=0, origin=(0, 0), end=None):
+        """Draw the stroke onto image from the point at index start up to end.
+
+        ``origin`` is the canvas pixel at image[0, 0], for drawing into a region.
+        """
+        count = len(self)
+        stop = count if end is None else min(end, count)
+        first = max(start, 1) - 1
+        if stop - first < 1:
+            return
+        # One polyline call draws the same round-capped segments as a cv2.line per pair
+        pts = np.frombuffer(self.points, dtype=np.int16).reshape(-1, 2)[first:stop] - np.int32(origin)
+        if start == 0 and self.tool == 'erase':
+            cv2.circle(image, (int(pts[0, 0]), int(pts[0, 1])), max(1, self.width // 2), self.color, -1)
+        if len(pts) >= 2:
+            cv2.polylines(image, [pts.reshape(-1, 1, 2)], False, self.color, self.width)
+
+
+def rasterize_actions(image, arrays, progress=None, chunk=RASTERIZE_CHUNK, scale=1):
+    """Draw bulk-read actions (see Database.get_action_arrays) onto image.
+
+    Gives the same pixels as Stroke.rasterize per action, but consecutive
+    strokes of one style share a single ``cv2.polylines`` call. With an
+    integer ``scale`` points and widths are scaled up, for an image that
+    many times the canvas size. ``progress(done, total)`` is called every
+    ``chunk`` actions and at the end.
+    """
+    types, offsets = arrays['action_type'], arrays['offsets']
+    points = arrays['points'].astype(np.int32) * scale
+    total = len(types)
+    run, style = [], None
+    for i in range(total):
+        if progress is not None and i and i % chunk == 0:
+            _draw_run(image, run, style)
+            run = []
+            progress(i, total)
+        tool = types[i]
+        pts = points[offsets[i]:offsets[i + 1]]
+        if tool not in ('draw', 'erase') or not len(pts):
+            continue
+        color, width = action_style(arrays, i)
+        width *= scale
+        if (color, width) != style or tool == 'erase':
+            _draw_run(image, run, style)
+            run, style = [], (color, width)
+        if tool == 'erase':
+            cv2.circle(image, (int(pts[0, 0]), int(pts[0, 1])), max(1, width // 2), color, -1)
+        if len(pts) >= 2:
+            run.append(pts.reshape(-1, 1, 2))
+    _draw_run(image, run, style)
+    if progress is not None:
+        progress(total, total)
+    return image
+
+
+def iter_strokes(arrays):
+    """Yield the draw and erase actions of bulk-read actions as Strokes"""
+    offsets = arrays['offsets']
+    for i, tool in enumerate(arrays['action_type']):
+        if tool in ('draw', 'erase') and offsets[i + 1] > offsets[i]:
+            yield Stroke.from_arrays(arrays, i)
+
+
+def action_style(arrays, i):
+    """(color, width) a bulk-read action is drawn with, filling in the defaults"""
+    color = arrays['color'][i]
+    color = decode_color(int(color)) if color >= 0 else ERASE_COLOR
+    default_width = DEFAULT_DRAW_WIDTH if arrays['action_type'][i] == 'draw' else DEFAULT_ERASE_WIDTH
+    return color, int(arrays['width'][i]) or default_width
+
+
+def _draw_run(image, run, style):
+    if run:
+        cv2.polylines(image, run, False, style[0], style[1])
@@ -0,0 +1,226 @@
+"""Sparse tiled backing store and viewport for large canvases.
+
+A ``TileStore`` behaves like a (height, width, 3) uint8 array for the
+operations the canvas needs (2-D slice reads and writes, ``shape``, clearing
+with ``store[:] = 255``) but only allocates a tile once ink lands in it, and
+frees it again when erasing leaves it blank. With ``path`` set, tiles live
+in a memory-mapped file laid out tile by tile, so untouched tiles never
+reach the disk on filesystems with sparse files.
+"""
+import numpy as np
+
+# Strokes replayed onto tiles are rasterized this many points at a time,
+# so the dense scratch region stays small even for strokes spanning the board
+REPLAY_CHUNK = 64
+
+
+class TileStore:
+    def __init__(self, width, height, tile_size=256, background=255, path=None):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.background = background
+        self.tiles_x = -(-width // tile_size)
+        self.tiles_y = -(-height // tile_size)
+        self.tiles = {}
+        self._file = None
+        if path is not None:
+            self._file = np.memmap(path, dtype=np.uint8, mode='w+',
+                                   shape=(self.tiles_y, self.tiles_x, tile_size, tile_size, 3))
+
+    @property
+    def shape(self):
+        return (self.height, self.width, 3)
+
+    @property
+    def nbytes(self):
+        """Bytes held by allocated tiles"""
+        return len(self.tiles) * self.tile_size * self.tile_size * 3
+
+    def __len__(self):
+        return self.height
+
+    def _allocate(self, key):
+        if self._file is not None:
+            tile = self._file[key]
+        else:
+            tile = np.empty((self.tile_size, self.tile_size, 3), dtype=np.uint8)
+        tile[:] = self.background
+        self.tiles[key] = tile
+        return tile
+
+    def _box(self, key):
+        """Convert a 2-D slice key into clamped (x0, y0, x1, y1), end exclusive"""
+        if not isinstance(key, tuple):
+            key = (key,)
+        rows, cols = (tuple(key) + (slice(None),))[:2]
+        if not isinstance(rows, slice) or not isinstance(cols, slice) or rows.step or cols.step:
+            raise IndexError("TileStore supports only 2-D slices without a step")
+        y0, y1, _ = rows.indices(self.height)
+        x0, x1, _ = cols.indices(self.width)
+        return x0, y0, max(x0, x1), max(y0, y1)
+
+    def _overlapping(self, x0, y0, x1, y1):
+        """Yield (key, tile slice, region slice) for every tile cell inside the box"""
+        size = self.tile_size
+        for ty in range(y0 // size, (y1 - 1) // size + 1):
+            for tx in range(x0 // size, (x1 - 1) // size + 1):
+                ty0, tx0 = ty * size, tx * size
+                sy0, sy1 = max(y0, ty0), min(y1, ty0 + size)
+                sx0, sx1 = max(x0, tx0), min(x1, tx0 + size)
+                yield ((ty, tx),
+                       (slice(sy0 - ty0, sy1 - ty0), slice(sx0 - tx0, sx1 - tx0)),
+                       (slice(sy0 - y0, sy1 - y0), slice(sx0 - x0, sx1 - x0)))
+
+    def __getitem__(self, key):
+        """Dense copy of a region; unallocated tiles read as background"""
+        x0, y0, x1, y1 = self._box(key)
+        region = np.full((y1 - y0, x1 - x0, 3), self.background, dtype=np.uint8)
+        if x1 > x0 and y1 > y0:
+            for tile_key, tile_slice, region_slice in self._overlapping(x0, y0, x1, y1):
+                tile = self.tiles.get(tile_key)
+                if tile is not None:
+                    region[region_slice] = tile[tile_slice]
+        return region
+
+    def __setitem__(self, key, value):
+        x0, y0, x1, y1 = self._box(key)
+        if x1 <= x0 or y1 <= y0:
+            return
+        if np.isscalar(value) and value == self.background and (x0, y0, x1, y1) == (0, 0, self.width, self.height):
+            self.tiles.clear()
+            return
+
+        value = np.broadcast_to(np.asarray(value, dtype=np.uint8), (y1 - y0, x1 - x0, 3))
+        for tile_key, tile_slice, region_slice in self._overlapping(x0, y0, x1, y1):
+            part = value[region_slice]
+            tile = self.tiles.get(tile_key)
+            if (part != self.background).any():
+                if tile is None:
+                    tile = self._allocate(tile_key)
+                tile[tile_slice] = part
+            elif tile is not None:
+                tile[tile_slice] = part
+                if not (tile != self.background).any():
+                    del self.tiles[tile_key]
+
+    def replace(self, other):
+        """Take over the pixels of another store of the same size"""
+        self.tiles.clear()
+        size = other.tile_size
+        for (ty, tx), tile in other.tiles.items():
+            y0, x0 = ty * size, tx * size
+            y1, x1 = min(y0 + size, self.height), min(x0 + size, self.width)
+            self[y0:y1, x0:x1] = tile[:y1 - y0, :x1 - x0]
+
+    def snapshot(self):
+        """In-memory copy of just the allocated tiles"""
+        store = TileStore(self.width, self.height, self.tile_size, self.background)
+        store.tiles = {key: tile.copy() for key, tile in self.tiles.items()}
+        return store
+
+    def copy(self):
+        """Dense copy of the whole canvas"""
+        return self.to_array()
+
+    def to_array(self):
+        return self[:, :]
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+
+def rasterize_stroke(store, stroke, start=0, end=None):
+    """Draw a stroke's points from index start up to end onto a TileStore,
+    through a dense scratch region covering just those points"""
+    x0, y0, x1, y1 = stroke.bounds(start, end)
+    x0, y0 = max(0, x0), max(0, y0)
+    x1, y1 = min(store.width - 1, x1), min(store.height - 1, y1)
+    if x0 > x1 or y0 > y1:
+        return
+    region = store[y0:y1 + 1, x0:x1 + 1]
+    stroke.rasterize(region, start, origin=(x0, y0), end=end)
+    store[y0:y1 + 1, x0:x1 + 1] = region
+
+
+def replay_strokes(store, strokes, chunk=REPLAY_CHUNK):
+    """Rasterize whole strokes onto a TileStore, ``chunk`` points at a time"""
+    for stroke in strokes:
+        for start in range(0, len(stroke), chunk):
+            rasterize_stroke(store, stroke, start, start + chunk)
+
+
+class Viewport:
+    """The part of a large canvas shown in a widget, with pan and zoom.
+
+    ``x``/``y`` is the canvas pixel at the widget's top-left corner and
+    ``zoom`` is widget pixels per canvas pixel. Normalized hand or mouse
+    coordinates (0..1 across the widget) map into the visible region.
+    """
+
+    def __init__(self, canvas_width, canvas_height, view_width=640, view_height=480,
+                 zoom=1.0, max_zoom=8.0):
+        self.canvas_width = canvas_width
+        self.canvas_height = canvas_height
+        self.view_width = view_width
+        self.view_height = view_height
+        self.max_zoom = max_zoom
+        self.x = 0.0
+        self.y = 0.0
+        self.zoom = zoom
+        self._clamp()
+
+    def resize(self, view_width, view_height):
+        self.view_width, self.view_height = view_width, view_height
+        self._clamp()
+
+    def fit_zoom(self):
+        """Zoom at which the whole canvas fits the view"""
+        return min(self.view_width / self.canvas_width, self.view_height / self.canvas_height)
+
+    def visible_rect(self):
+        """Visible canvas area as (x0, y0, x1, y1) in canvas pixels, end exclusive"""
+        x1 = min(self.canvas_width, self.x + self.view_width / self.zoom)
+        y1 = min(self.canvas_height, self.y + self.view_height / self.zoom)
+        return int(self.x), int(self.y), int(np.ceil(x1)), int(np.ceil(y1))
+
+    def to_canvas(self, nx, ny):
+        """Normalized widget coordinates to integer canvas pixels"""
+        cx = self.x + nx * self.view_width / self.zoom
+        cy = self.y + ny * self.view_height / self.zoom
+        return (int(min(max(cx, 0), self.canvas_width - 1)),
+                int(min(max(cy, 0), self.canvas_height - 1)))
+
+    def to_view(self, cx, cy):
+        """Canvas pixels to widget pixels"""
+        return (cx - self.x) * self.zoom, (cy - self.y) * self.zoom
+
+    def pan(self, dx, dy):
+        """Move the view by a widget-pixel offset"""
+        self.x -= dx / self.zoom
+        self.y -= dy / self.zoom
+        self._clamp()
+
+    def zoom_at(self, factor, vx, vy):
+        """Zoom by factor keeping the canvas point under widget pixel (vx, vy) fixed"""
+        cx, cy = self.x + vx / self.zoom, self.y + vy / self.zoom
+        self.zoom = self._limit(self.zoom * factor)
+        self.x, self.y = cx - vx / self.zoom, cy - vy / self.zoom
+        self._clamp()
+
+    def fit(self):
+        """Zoom out to show the whole canvas"""
+        self.zoom = self.fit_zoom()
+        self.x = self.y = 0.0
+        self._clamp()
+
+    def _limit(self, zoom):
+        # Zooming out stops once the whole canvas is visible
+        return min(self.max_zoom, max(min(self.fit_zoom(), self.max_zoom), zoom))
+
+    def _clamp(self):
+        # Panning stops at the canvas edges
+        self.zoom = self._limit(self.zoom)
+        self.x = min(max(0.0, self.x), max(0.0, self.canvas_width - self.view_width / self.zoom))
+        self.y = min(max(0.0, self.y), max(0.0, self.canvas_height - self.view_height / self.zoom))
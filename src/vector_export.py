@@ -0,0 +1,220 @@
+"""SVG and PDF export straight from the drawing action log.
+
+Actions are read from the database in batches and written out as they
+arrive, so memory stays flat however long the session was. Consecutive
+segments with the same tool, color and width that join end to start are
+merged into one polyline; erasing is drawn as background-colored strokes
+on top, the same way the raster canvas does it. Round caps and joins match
+the thick lines OpenCV draws.
+
+    python src/vector_export.py virtual_painter.db drawing.svg --size 640x480
+"""
+import argparse
+import base64
+import io
+import os
+import sys
+import zlib
+
+import numpy as np
+from PIL import Image
+
+from stroke import ERASE_COLOR, DEFAULT_DRAW_WIDTH, DEFAULT_ERASE_WIDTH
+
+# Long merged runs are split so a single polyline never grows without bound
+MAX_POLYLINE_POINTS = 4096
+
+
+def _continues(a, b, c):
+    """True when c extends the straight run a -> b, making b redundant"""
+    abx, aby, bcx, bcy = b[0] - a[0], b[1] - a[1], c[0] - b[0], c[1] - b[1]
+    return abx * bcy == aby * bcx and abx * bcx + aby * bcy > 0
+
+
+def iter_polylines(actions, default_width=DEFAULT_DRAW_WIDTH):
+    """Merge draw/erase actions into (points, color, width) polylines.
+
+    ``points`` is a list of (x, y) canvas pixels. An action continues the
+    previous polyline when its style matches and its first point is where
+    the previous one ended; points in the middle of a straight run are dropped.
+    """
+    points, style = [], None
+    for action in actions:
+        tool = action['action_type']
+        if tool not in ('draw', 'erase'):
+            continue
+        new_points = np.asarray(action['points'])
+        if not new_points.size:
+            continue
+        new_points = list(map(tuple, new_points[:, :2].tolist()))
+        if tool == 'erase':
+            color = ERASE_COLOR
+            width = action.get('width') or DEFAULT_ERASE_WIDTH
+        else:
+            color = tuple(action['color'][:3]) if action['color'] else ERASE_COLOR
+            width = action.get('width') or default_width
+        new_style = (tool, color, int(width))
+
+        if style == new_style and points and points[-1] == new_points[0]:
+            new_points = new_points[1:]
+        elif points:
+            yield points, style[1], style[2]
+            points = []
+        style = new_style
+
+        for point in new_points:
+            if len(points) >= 2 and _continues(points[-2], points[-1], point):
+                points[-1] = point
+                continue
+            if len(points) >= MAX_POLYLINE_POINTS:
+                yield points, style[1], style[2]
+                points = [points[-1]]
+            points.append(point)
+    if points:
+        yield points, style[1], style[2]
+
+
+class SvgWriter:
+    def __init__(self, path, width, height, background=(255, 255, 255), image=None):
+        self._file = open(path, 'w', encoding='ascii')
+        self._file.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}">\n'
+            f'<rect width="{width}" height="{height}" fill="{self._rgb(background)}"/>\n')
+        if image is not None:
+            png = io.BytesIO()
+            Image.fromarray(image).save(png, format='PNG')
+            self._file.write(f'<image width="{width}" height="{height}" '
+                             f'href="data:image/png;base64,{base64.b64encode(png.getvalue()).decode()}"/>\n')
+        self._file.write('<g fill="none" stroke-linecap="round" stroke-linejoin="round">\n')
+
+    @staticmethod
+    def _rgb(color):
+        return '#%02x%02x%02x' % tuple(int(c) for c in color[:3])
+
+    def polyline(self, points, color, width):
+        # Relative moves keep the numbers short: most steps are a few pixels
+        (x, y), steps = points[0], []
+        for px, py in points[1:]:
+            steps.append(f'{px - x},{py - y}')
+            x, y = px, py
+        d = f'M{points[0][0]},{points[0][1]}l' + (' '.join(steps) or '0,0')
+        self._file.write(f'<path stroke="{self._rgb(color)}" stroke-width="{width}" d="{d}"/>\n')
+
+    def close(self):
+        self._file.write('</g>\n</svg>\n')
+        self._file.close()
+
+
+class PdfWriter:
+    """Single-page PDF whose content stream is deflated while it is written.
+
+    The stream length is an indirect object written after the stream, so
+    nothing has to be buffered to know it up front.
+    """
+
+    def __init__(self, path, width, height, background=(255, 255, 255), image=None):
+        self._file = open(path, 'wb')
+        self._offsets = []
+        self._length = 0
+        self._deflate = zlib.compressobj(6)
+        self._file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._object(b'<< /Type /Catalog /Pages 2 0 R >>')
+        self._object(b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>')
+        contents = 4 if image is None else 5
+        resources = b'' if image is None else b' /Resources << /XObject << /Im0 4 0 R >> >>'
+        self._object(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R%s >>'
+                     % (width, height, contents, resources))
+        if image is not None:
+            data = zlib.compress(np.ascontiguousarray(image).tobytes(), 6)
+            self._object(b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB '
+                         b'/BitsPerComponent 8 /Filter /FlateDecode /Length %d >>\nstream\n%s\nendstream'
+                         % (image.shape[1], image.shape[0], len(data), data))
+        self._offsets.append(self._file.tell())
+        self._file.write(b'%d 0 obj\n<< /Length %d 0 R /Filter /FlateDecode >>\nstream\n'
+                         % (contents, contents + 1))
+        # Flip to top-left origin so canvas pixels can be written as they are
+        self._write(f'1 0 0 -1 0 {height} cm 1 J 1 j\n'
+                    f'{self._rgb(background)} rg 0 0 {width} {height} re f\n')
+        if image is not None:
+            self._write(f'q {width} 0 0 -{height} 0 {height} cm /Im0 Do Q\n')
+
+    @staticmethod
+    def _rgb(color):
+        return ' '.join(f'{int(c) / 255:.3g}' for c in color[:3])
+
+    def _object(self, body):
+        self._offsets.append(self._file.tell())
+        self._file.write(b'%d 0 obj\n%s\nendobj\n' % (len(self._offsets), body))
+
+    def _write(self, text):
+        data = self._deflate.compress(text.encode('ascii'))
+        self._file.write(data)
+        self._length += len(data)
+
+    def polyline(self, points, color, width):
+        (x, y), rest = points[0], points[1:] or points
+        path = ' '.join(f'{px} {py} l' for px, py in rest)
+        self._write(f'{self._rgb(color)} RG {width} w {x} {y} m {path} S\n')
+
+    def close(self):
+        data = self._deflate.flush()
+        self._file.write(data)
+        self._length += len(data)
+        self._file.write(b'\nendstream\nendobj\n')
+        self._object(b'%d' % self._length)
+
+        xref = self._file.tell()
+        self._file.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(self._offsets) + 1))
+        for offset in self._offsets:
+            self._file.write(b'%010d 00000 n \n' % offset)
+        self._file.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                         % (len(self._offsets) + 1, xref))
+        self._file.close()
+
+
+WRITERS = {'.svg': SvgWriter, '.pdf': PdfWriter}
+
+
+def export_vector(actions, path, width, height, default_width=DEFAULT_DRAW_WIDTH, image=None):
+    """Write actions (any iterable, e.g. ``db.iter_actions()``) to an SVG or PDF file.
+
+    The format follows the file extension. ``image`` is an optional raster
+    placed underneath, such as the snapshot a session was started on.
+    Returns the number of polylines written.
+    """
+    writer_class = WRITERS.get(os.path.splitext(path)[1].lower())
+    if writer_class is None:
+        raise ValueError(f"Unsupported vector format: {path}")
+    writer = writer_class(path, width, height, image=image)
+    count = 0
+    try:
+        for points, color, stroke_width in iter_polylines(actions, default_width):
+            writer.polyline(points, color, stroke_width)
+            count += 1
+    finally:
+        writer.close()
+    return count
+
+
+def main(argv=None):
+    from database import Database
+
+    parser = argparse.ArgumentParser(description="Export the drawing action log as SVG or PDF")
+    parser.add_argument('database', help="virtual_painter.db file")
+    parser.add_argument('out', help="output .svg or .pdf file")
+    parser.add_argument('--size', default='640x480', help="canvas size as WIDTHxHEIGHT")
+    parser.add_argument('--session', type=int, help="export one session, drawn over the raster it started from")
+    args = parser.parse_args(argv)
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    db = Database(args.database, use_journal=False)
+    image = db.get_session_base(args.session) if args.session is not None else None
+    count = export_vector(db.iter_actions(session_id=args.session), args.out, width, height, image=image)
+    print(f"[EXPORT] {count} polylines written to {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,22 +1,38 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSpacerItem, QSizePolicy, QFileDialog, QColorDialog, QShortcut, QToolButton
-from PyQt5.QtGui import QImage, QPixmap, QFont, QKeySequence, QIcon, QColor
-from PyQt5.QtCore import QTimer, Qt
-import cv2
+from PyQt5.QtGui import QPixmap, QFont, QKeySequence, QIcon, QColor
+from PyQt5.QtCore import Qt, QTimer
 import time
 import os
+import json
 from resource_path import resource_path
 from canvas import Canvas
 from canvas_widget import CanvasWidget
-from hand_tracking import HandTracker
-from database import Database
+from hand_tracking import landmarks_to_array
+from gestures import GestureController
+from recording import SessionRecorder
+from frame_pipeline import FramePipeline
+from frame_source import CameraSource, open_checked, open_source
+from startup import Warmup, startup_timer
+from profiler import profiler
+from filters import make_tip_filter
+from exporter import ExportJob, ExportService, RASTER_FORMATS, VECTOR_FORMATS
+from compaction import Compactor
+from restore import SessionRestore
+from gallery import GalleryWindow
+
+COMPACT_DELAY_MS = 5000
 
 class VirtualPainterGUI(QWidget):
-    def __init__(self):
+    def __init__(self, warmup=None):
+        """``warmup`` is a started Warmup, normally handed over by the start screen.
+        The window shows immediately; gesture mode switches on once it is ready."""
         super().__init__()
         
-        
-        db_path = resource_path('virtual_painter.db')
-        self.db = Database(db_path)
+        if warmup is None:
+            warmup = Warmup(resource_path('virtual_painter.db'))
+            warmup.start()
+        self.warmup = warmup
+        self.db = warmup.wait_for_db()
         
         self.setWindowTitle("DrawWave")
         self.setGeometry(100, 100, 1280, 720)
@@ -31,31 +47,12 @@ class VirtualPainterGUI(QWidget):
         icon_path = resource_path('virtual_painter.png')
         self.setWindowIcon(QIcon(icon_path))
         
-        self.available_cameras = self.find_available_cameras(max_index=4)
-        
-        if self.available_cameras:
-            saved_camera_index = self.db.get_setting('camera_index')
-            
-            if saved_camera_index and int(saved_camera_index) in self.available_cameras:
-                self.camera_index = int(saved_camera_index)
-            else:
-                self.camera_index = self.available_cameras[0]
-                
-            try:
-                self.capture = cv2.VideoCapture(self.camera_index, cv2.CAP_DSHOW)
-                time.sleep(0.5)  
-                if self.capture.isOpened():
-                    print(f"[CAMERA] Using camera index {self.camera_index}")
-                else:
-                    print("[WARNING] Camera failed to initialize")
-                    self.capture = None
-            except Exception as e:
-                print(f"[ERROR] Camera initialization error: {e}")
-                self.capture = None
-        else:
-            self.capture = None
-            self.camera_index = 0
-            print("[WARNING] No cameras found")
+        # A stored frame_source (video file, image folder or 'synthetic') replaces the camera
+        self.source_spec = self.db.get_setting('frame_source')
+        # The hand tracker and camera come from the warm-up in on_warmup_ready
+        self.source = None
+        self.camera_index = 0
+        self.cameras = None
         
         self.color_preview = QLabel()
         self.color_preview.setFixedSize(32, 32)
@@ -68,8 +65,16 @@ class VirtualPainterGUI(QWidget):
         """)    
  
         # Initialize components
-        self.hand_tracker = HandTracker()
-        self.canvas = Canvas(db=self.db)
+        self.hand_tracker = None
+        self.canvas = self.create_canvas()
+        self.gestures = GestureController(self.canvas, on_clear=self.clear_canvas)
+        # Fold sessions closed in earlier runs into snapshots once startup has settled
+        self.compactor = Compactor(self.db)
+        self.exporter = ExportService(self.db)
+        self.exporter.exported.connect(self.on_exported)
+        self.compact_after_export = False
+        QTimer.singleShot(COMPACT_DELAY_MS, self.compact)
+        self.recorder = None
         self.mode = "gesture"
         
         # Main layout
@@ -104,6 +109,9 @@ class VirtualPainterGUI(QWidget):
             }
         """)
         top_section.addWidget(self.canvas_widget)
+        self.restorer = None
+        self.gallery = None
+        self.start_restore()
         
         main_layout.addLayout(top_section)
         
@@ -120,6 +128,7 @@ class VirtualPainterGUI(QWidget):
         
         self.clear_btn = QPushButton("Clear")
         self.save_btn = QPushButton("Save")
+        self.gallery_btn = QPushButton("Gallery")
         self.color_btn = QPushButton(" Change Color")
         
         # Camera switch button 
@@ -148,7 +157,7 @@ class VirtualPainterGUI(QWidget):
         
         # Style for normal buttons
         for btn in [self.mouse_btn, self.mouse_erase_btn, self.gesture_btn, self.back_btn, 
-                   self.clear_btn, self.save_btn, self.color_btn]:
+                   self.clear_btn, self.save_btn, self.gallery_btn, self.color_btn]:
             btn.setStyleSheet(button_style)
             btn.setFont(QFont("Segoe UI", 12, QFont.Bold))
             btn.setCursor(Qt.PointingHandCursor)
@@ -179,9 +188,10 @@ class VirtualPainterGUI(QWidget):
         control_panel.addWidget(self.color_btn)
         control_panel.addWidget(self.color_preview)
         control_panel.addWidget(self.save_btn)
+        control_panel.addWidget(self.gallery_btn)
         
-        if self.available_cameras:
-            control_panel.addWidget(self.switch_camera_btn)
+        control_panel.addWidget(self.switch_camera_btn)
+        self.switch_camera_btn.setVisible(False)
         control_panel.addWidget(self.back_btn)
         control_panel.addStretch()
         
@@ -196,6 +206,7 @@ class VirtualPainterGUI(QWidget):
         self.gesture_btn.clicked.connect(self.enable_gesture_mode)
         self.clear_btn.clicked.connect(self.clear_canvas)
         self.save_btn.clicked.connect(self.save_canvas)
+        self.gallery_btn.clicked.connect(self.open_gallery)
         self.color_btn.clicked.connect(self.pick_color)
         self.back_btn.clicked.connect(self.back_button_click)
         self.switch_camera_btn.clicked.connect(self.switch_camera)
@@ -216,19 +227,44 @@ class VirtualPainterGUI(QWidget):
             """)
         
         
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_camera_feed)
-        self.timer.start(33)  # ~30 FPS
+        # Capture and hand tracking run on worker threads; results come back as signals
+        self.pipeline = FramePipeline(self.hand_tracker, self)
+        self.pipeline.result_ready.connect(self.update_camera_feed)
+        self.pipeline.capture_failed.connect(lambda: print("❌ Could not access the webcam."))
+        self.warmup.ready.connect(self.on_warmup_ready)
+        if self.warmup.done:
+            self.on_warmup_ready()
         
         
         
         undo_shortcut = QShortcut(QKeySequence("Ctrl+Z"), self)
         undo_shortcut.setContext(Qt.ApplicationShortcut)  
         undo_shortcut.activated.connect(self.perform_undo)
+
+        redo_shortcut = QShortcut(QKeySequence("Ctrl+Y"), self)
+        redo_shortcut.setContext(Qt.ApplicationShortcut)
+        redo_shortcut.activated.connect(self.perform_redo)
+
+        record_shortcut = QShortcut(QKeySequence("Ctrl+R"), self)
+        record_shortcut.activated.connect(self.toggle_recording)
+
+        # Stage timings: F3 shows the HUD, Ctrl+Shift+P writes CSV and JSON reports
+        profiler.enable(self.db.get_setting('profiling') == '1')
+        fit_shortcut = QShortcut(QKeySequence("Ctrl+0"), self)
+        fit_shortcut.activated.connect(self.canvas_widget.fit_view)
+        hud_shortcut = QShortcut(QKeySequence("F3"), self)
+        hud_shortcut.activated.connect(self.toggle_hud)
+        export_shortcut = QShortcut(QKeySequence("Ctrl+Shift+P"), self)
+        export_shortcut.activated.connect(self.export_profile)
+        startup_timer.mark('painter_ready')
                 
     def perform_undo(self):
         self.canvas.undo()            
-        self.canvas_widget.update()
+        self.canvas_widget.refresh()
+
+    def perform_redo(self):
+        self.canvas.redo()
+        self.canvas_widget.refresh()
         
         
         
@@ -237,56 +273,144 @@ class VirtualPainterGUI(QWidget):
         self.canvas_widget.mouse_mode = "erase"
         
         
-        if self.capture is not None:
-            self.capture.release()
-            self.capture = None
+        self.release_camera()
         
         
-        self.canvas_widget.current_display_canvas = None
+        self.canvas_widget.hide_cursor()
         self.canvas_widget.update()
         
         print("[MODE] Mouse Erase Enabled")
     
         
     
-    def update_camera_feed(self):
-        if self.mode != "gesture":
+    def create_canvas(self):
+        """Dense 640x480 canvas by default; a larger canvas_size setting such as
+        '7680x4320' gets a sparse tiled board with pan and zoom"""
+        size = self.db.get_setting('canvas_size')
+        try:
+            width, height = (int(v) for v in size.lower().split('x')) if size else (640, 480)
+        except ValueError:
+            print(f"[WARNING] Invalid canvas size {size!r}; using 640x480")
+            width, height = 640, 480
+        smoothing = self.db.get_setting('stroke_smoothing') == '1'
+        if width <= 640 and height <= 480:
+            return Canvas(width, height, db=self.db, smoothing=smoothing)
+        tile_file = resource_path('canvas_tiles.bin') if self.db.get_setting('canvas_backing') == 'disk' else None
+        print(f"[CANVAS] Tiled {width}x{height} canvas")
+        return Canvas(width, height, db=self.db, tiled=True, tile_file=tile_file, smoothing=smoothing)
+
+    def start_restore(self):
+        """Redraw the session left open by the last run without blocking the window"""
+        tile_size = self.canvas.canvas.tile_size if self.canvas.tiled else None
+        self.restorer = SessionRestore(self.db, self.canvas.width, self.canvas.height, tile_size)
+        self.restorer.progress.connect(self.on_restore_progress)
+        self.restorer.restored.connect(self.on_restored)
+        self.restorer.finished.connect(lambda: self.setWindowTitle("DrawWave"))
+        self.restorer.start()
+
+    def on_restore_progress(self, done, total):
+        self.setWindowTitle(f"DrawWave - restoring {100 * done // max(total, 1)}%")
+
+    def on_restored(self, image, last_id):
+        # A clear or save during the restore started a new session
+        if self.db.session_id != self.restorer.session_id:
             return
+        self.canvas.restore(image, last_id)
+        self.canvas_widget.refresh()
+        startup_timer.mark('session_restored')
 
-        ret, frame = self.capture.read()
-        if not ret:
-            print("❌ Could not access the webcam.")
+    def on_warmup_ready(self):
+        """Take over the warmed-up hand tracker and camera and switch gesture mode on"""
+        if self.warmup is None:
             return
+        warmup, self.warmup = self.warmup, None
+        _, self.hand_tracker, source, camera_index, self.cameras = warmup.take()
+        self.pipeline.set_hand_tracker(self.hand_tracker)
+        self.switch_camera_btn.setVisible(source is not None)
 
-     
+        if self.mode != "gesture" or self.hand_tracker is None:
+            if source is not None:
+                source.release()
+            if self.hand_tracker is None:
+                print("[ERROR] Hand tracking is unavailable")
+                self.enable_mouse_mode()
+            return
+        if source is None:
+            print("[ERROR] No working cameras found")
+            self.enable_mouse_mode()
+            return
+
+        self.source, self.camera_index = source, camera_index
+        self.start_pipeline()
+        print(f"[MODE] Gesture Drawing Enabled ({self.source}, camera {self.camera_index})")
+
+    def release_camera(self):
+        """Stop the frame pipeline and close the current frame source"""
+        self.pipeline.stop()
+        if self.source is not None:
+            self.source.release()
+            self.source = None
+
+    def open_frame_source(self, camera_index):
+        """Open a frame source and read one frame from it, returning None on failure"""
+        if self.source_spec:
+            source = open_source(self.source_spec)
+        else:
+            source = CameraSource(camera_index)
+        try:
+            opened = open_checked(source)
+        except Exception as e:
+            print(f"[WARNING] Error opening {source}: {e}")
+            source.release()
+            opened = None
+        if not self.source_spec:
+            if opened is not None:
+                self.cameras.mark_success(camera_index, *opened.resolution, opened.fps)
+            else:
+                self.cameras.mark_failure(camera_index)
+        return opened
+
+    def start_pipeline(self):
+        """Start the frame pipeline on the open source with its camera's tip filter settings"""
+        # Stored per camera as JSON, e.g. {"type": "kalman", "lead": 0.03}
+        config = self.db.get_setting(f'tip_filter_{self.camera_index}')
+        try:
+            tip_filter = make_tip_filter(json.loads(config) if config else None)
+        except (ValueError, TypeError, KeyError) as e:
+            print(f"[WARNING] Invalid tip filter settings for camera {self.camera_index}: {e}")
+            tip_filter = make_tip_filter()
+        self.hand_tracker.set_tip_filter(tip_filter)
+        self.pipeline.start(self.source)
+
+    def update_camera_feed(self, result):
+        """Apply a processed frame from the pipeline; runs on the UI thread"""
+        if self.mode != "gesture":
+            return
+
+        if 'first_frame' not in startup_timer.marks:
+            startup_timer.mark('first_frame')
+            self.db.save_setting('startup_timings', json.dumps(startup_timer.summary()))
+
+        profiler.frame()
+        profiler.dropped_frames = self.pipeline.dropped_frames
+
+        if self.recorder is not None:
+            with profiler.stage('recorder.record'):
+                self.recorder.record(result.timestamp, result.positions, result.gesture)
+
+        if result.landmarks is not None:
+            self.canvas.set_cursor_position(*result.tip)
             
-        if ret:
-            frame = cv2.flip(frame, 1)
-            frame, result = self.hand_tracker.detect_hands(frame)
-
-            if result.multi_hand_landmarks:
-               
-                landmarks = result.multi_hand_landmarks[0]
-                gesture = self.hand_tracker.recognize_gesture(landmarks)
-                
-               
-                index_tip = landmarks.landmark[8]
-                self.canvas.set_cursor_position(index_tip.x, index_tip.y)
-                
-                self.handle_gesture(gesture, landmarks)
-                
-            if not hasattr(self, "_frame_counter"):
-                self._frame_counter = 0
-            self._frame_counter += 1
-            if self._frame_counter % 3 == 0:  
-                canvas_with_cursor = self.canvas.draw_cursor()
-                self.canvas_widget.update_canvas(canvas_with_cursor)    
-
-            height, width, channel = frame.shape
-            bytes_per_line = 3 * width
-            q_img = QImage(frame.data, width, height, bytes_per_line, QImage.Format_BGR888)
-            pixmap = QPixmap.fromImage(q_img)
-            self.camera_feed_label.setPixmap(pixmap)
+            with profiler.stage('gestures.handle'):
+                self.gestures.handle(result.gesture, result.positions, result.tip)
+            self.canvas_widget.refresh()
+            self.canvas_widget.set_cursor(self.canvas.cursor_position,
+                                          result.gesture if result.gesture != "idle" else None)
+        else:
+            self.gestures.lost_tracking()
+
+        with profiler.stage('QPixmap.fromImage'):
+            self.camera_feed_label.setPixmap(QPixmap.fromImage(result.image))
             
             
             
@@ -294,80 +418,74 @@ class VirtualPainterGUI(QWidget):
             
             
     def handle_gesture(self, gesture, landmarks, smoothed_tip=None):
-        index_tip = landmarks.landmark[8]
-        middle_tip = landmarks.landmark[12]
-        ring_tip = landmarks.landmark[16]
-        pinky_tip = landmarks.landmark[20]
-        
-        if not hasattr(self, "_clear_frames"):
-            self._clear_frames = 0
-            self._last_clear_time = 0
-        
-        if not hasattr(self, "_color_pick_active"):
-            self._color_pick_active = False
-            self._color_pick_frames = 0  
-            self._last_color_pick_time = 0  
-
-        if gesture == "clear":
-            self._clear_frames += 1
-            current_time = time.time()
-            time_since_last = current_time - self._last_clear_time
-                
-            if self._clear_frames >= 30 and time_since_last > 3.0:
-                self._clear_frames = 0
-                self._last_clear_time = current_time
-                print("[GESTURE] Canvas cleared with thumbs up gesture 👍")
-                self.clear_canvas()  # Clear the canvas
-            return
-        else:
-            self._clear_frames = 0
-        
-        if gesture == "erase":
-            midpoint = (
-                (index_tip.x + middle_tip.x) / 2,
-                (index_tip.y + middle_tip.y) / 2
-            )
-            offsets = [
-                (0, 0),
-                (0.01, 0), (-0.01, 0),
-                (0, 0.01), (0, -0.01)
-            ]
-            for dx, dy in offsets:
-                erase_point = (midpoint[0] + dx, midpoint[1] + dy)
-                self.canvas.erase(erase_point)
-            self.canvas.reset_previous_points()
+        self.gestures.handle(gesture, landmarks_to_array(landmarks), smoothed_tip)
+
+    def toggle_recording(self):
+        """Start or stop recording tracked landmarks for later replay"""
+        if self.recorder is not None:
+            self.recorder.close()
+            print(f"[RECORD] Saved {self.recorder.frame_count} frames to {self.recorder.path}")
+            self.recorder = None
             return
 
-        elif gesture == "drawing":
-            self.canvas.draw((index_tip.x, index_tip.y))
-        
-        elif gesture == "idle":
-            self.canvas.reset_previous_points()
+        folder = resource_path('recordings')
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, time.strftime('session-%Y%m%d-%H%M%S.dwrec'))
+        self.recorder = SessionRecorder(path)
+        print(f"[RECORD] Recording landmarks to {path}")
 
-            
-            
+    def toggle_hud(self):
+        """Show or hide the stage timing overlay, turning profiling on with it"""
+        if not profiler.hud:
+            profiler.enable()
+        self.canvas_widget.set_hud(not profiler.hud)
+
+    def export_profile(self):
+        """Write the current stage timings as CSV and JSON"""
+        if not profiler.enabled:
+            print("[PROFILE] Profiling is off; press F3 to start it")
+            return
+        folder = resource_path('profiles')
+        os.makedirs(folder, exist_ok=True)
+        base = os.path.join(folder, time.strftime('profile-%Y%m%d-%H%M%S'))
+        profiler.export_csv(base + '.csv')
+        profiler.export_json(base + '.json')
+        print(f"[PROFILE] Stage timings written to {base}.csv and {base}.json")
 
-        
     def back_button_click(self):
-        if self.capture is not None:
-            self.capture.release()  # Release the camera
-        if hasattr(self, 'timer'):
-            self.timer.stop()  # Stop the timer
+        self.release_camera()  # Stop the workers and release the camera
         self.close()  # Close the current screen
         from start_screen import StartScreen
         self.start_screen = StartScreen()  
         self.start_screen.show()
 
 
+    def closeEvent(self, event):
+        if self.warmup is not None:
+            source = self.warmup.take()[2]
+            self.warmup = None
+            if source is not None:
+                source.release()
+        self.release_camera()
+        if self.restorer is not None:
+            self.restorer.wait()
+        # Queued exports still finish and are recorded, without touching the closing window
+        self.exporter.exported.disconnect(self.on_exported)
+        self.exporter.stop()
+        if self.gallery is not None:
+            self.gallery.close()
+        if self.recorder is not None:
+            self.toggle_recording()
+        self.db.close()
+        super().closeEvent(event)
+
     def enable_mouse_mode(self):
         self.mode = "mouse"
         self.canvas_widget.mouse_mode = "draw"
         
-        if self.capture is not None:
-            self.capture.release()
-            self.capture = None
+        self.release_camera()
         
-        self.canvas_widget.current_display_canvas = None
+        self.canvas_widget.hide_cursor()
         self.canvas_widget.update()
         
         print("[MODE] Mouse Drawing Enabled")
@@ -376,127 +494,130 @@ class VirtualPainterGUI(QWidget):
         """Enable gesture mode with improved camera handling"""
         self.mode = "gesture"
         
-        if self.capture is not None:
-            self.capture.release()
-            self.capture = None
+        if self.warmup is not None:
+            print("[MODE] Gesture Drawing will start once the hand tracker is ready")
+            return
+        
+        self.release_camera()
         
         try:
-            self.capture = cv2.VideoCapture(self.camera_index, cv2.CAP_DSHOW)
-            
-            if not self.capture.isOpened():
+            self.source = self.open_frame_source(self.camera_index)
+            if self.source is None:
                 raise Exception("Failed to open camera")
                 
-            ret, _ = self.capture.read()
-            if not ret:
-                raise Exception("Failed to read from camera")
-                
             self.canvas.reset_previous_points()
+            self.start_pipeline()
             print(f"[MODE] Gesture Drawing Enabled (Camera {self.camera_index})")
             
         except Exception as e:
             print(f"[ERROR] Failed to initialize camera: {e}")
-            available_cameras = self.find_available_cameras()
-            if available_cameras and self.camera_index in available_cameras:
-                next_index = (available_cameras.index(self.camera_index) + 1) % len(available_cameras)
-                self.camera_index = available_cameras[next_index]
+            next_index = None if self.source_spec else self.cameras.next_camera(self.camera_index)
+            if next_index is not None:
+                self.camera_index = next_index
                 print(f"[CAMERA] Switching to camera index {self.camera_index}")
                 self.enable_gesture_mode()  # Try again with new camera
             else:
                 print("[ERROR] No working cameras found")
+                if not self.source_spec:
+                    self.cameras.revalidate_async(force=True)
                 self.mode = "mouse"  # Fall back to mouse mode
                 self.canvas_widget.mouse_mode = "draw"
         
-    def find_available_cameras(self, max_index=2):
-        """Find all available camera indices with better error handling"""
-        available_indices = []
-        for idx in range(max_index + 1):
-            try:
-                cap = cv2.VideoCapture(idx, cv2.CAP_DSHOW)
-                if cap.isOpened():
-                    ret, _ = cap.read()
-                    if ret:
-                        available_indices.append(idx)
-                cap.release()
-            except Exception as e:
-                print(f"[WARNING] Error checking camera {idx}: {e}")
-                continue
-        return available_indices
-        
     def switch_camera(self):
-        """Switch to the next available camera within a fixed range (0-2)"""
-        if self.mode != "gesture":
+        """Switch to the next camera that worked when last checked"""
+        if self.mode != "gesture" or self.warmup is not None:
             self.enable_gesture_mode()
             return
-            
-        max_camera_index = 2
-        next_index = (self.camera_index + 1) % (max_camera_index + 1)
-        
-        if self.capture is not None:
-            self.capture.release()
-            self.capture = None
-            
-        try:
-            self.capture = cv2.VideoCapture(next_index, cv2.CAP_DSHOW)
-            
-            if self.capture.isOpened():
-                ret, _ = self.capture.read()
-                if ret:
-                    self.camera_index = next_index
-                    print(f"[CAMERA] Switched to camera index {self.camera_index}")
-                    self.db.save_setting('camera_index', str(self.camera_index))
-                    return
-                    
-            raise Exception("Failed to initialize camera")
-            
-        except Exception as e:
-            print(f"[ERROR] Failed to switch to camera {next_index}: {e}")
-            self.camera_index = next_index
-            self.capture = None
-            
-            remaining_attempts = max_camera_index
-            while remaining_attempts > 0:
-                try:
-                    next_index = (next_index + 1) % (max_camera_index + 1)
-                    self.capture = cv2.VideoCapture(next_index, cv2.CAP_DSHOW)
-                    if self.capture.isOpened():
-                        ret, _ = self.capture.read()
-                        if ret:
-                            self.camera_index = next_index
-                            print(f"[CAMERA] Switched to camera index {self.camera_index}")
-                            self.db.save_setting('camera_index', str(self.camera_index))
-                            return
-                    self.capture = None
-                except Exception as e:
-                    print(f"[ERROR] Failed to switch to camera {next_index}: {e}")
-                remaining_attempts -= 1
-                
-            print("[ERROR] No working cameras found")
-            self.mode = "mouse"
-            self.canvas_widget.mouse_mode = "draw"
+
+        next_index = None if self.source_spec else self.cameras.next_camera(self.camera_index)
+        if next_index is None:
+            print("[CAMERA] No other cameras available")
+            if not self.source_spec:
+                self.cameras.revalidate_async(skip={self.camera_index}, force=True)
+            return
+
+        self.release_camera()
+        while next_index is not None:
+            self.source = self.open_frame_source(next_index)
+            if self.source is not None:
+                self.camera_index = next_index
+                self.start_pipeline()
+                print(f"[CAMERA] Switched to camera index {self.camera_index}")
+                self.db.save_setting('camera_index', str(self.camera_index))
+                return
+            print(f"[ERROR] Failed to switch to camera {next_index}")
+            next_index = self.cameras.next_camera(self.camera_index)
+
+        # None of the other cameras work any more; go back to the current one
+        self.enable_gesture_mode()
 
     def clear_canvas(self):
         self.canvas.clear()
-        self.canvas_widget.update()
+        self.canvas_widget.refresh()
+        self.compact()
 
     def save_canvas(self):
         options = QFileDialog.Options()
-        fileName, _ = QFileDialog.getSaveFileName(
+        fileName, selected = QFileDialog.getSaveFileName(
             self, 
             "Save Drawing", 
             "", 
-            "PNG Files (*.png)", 
+            "PNG Files (*.png);;WebP Files (*.webp);;JPEG Files (*.jpg *.jpeg);;SVG Files (*.svg);;PDF Files (*.pdf)", 
             options=options
         )
         if fileName:
-            if not fileName.endswith('.png'):
-                fileName += '.png'
-            self.canvas.save(fileName)
-            # Save to database
-            self.db.save_drawing(
-                filename=fileName,
-                color=self.canvas.color,
-                mode=self.mode
-            )
+            extension = os.path.splitext(fileName)[1].lower()
+            if extension not in RASTER_FORMATS and extension not in VECTOR_FORMATS:
+                extension = '.' + selected.split('*.')[1].split()[0].rstrip(')') if selected else '.png'
+                fileName += extension
+            # The snapshot is cheap; encoding runs on the export thread
+            try:
+                job = ExportJob.capture(self.canvas, fileName, mode=self.mode, **self.export_options())
+            except ValueError as e:
+                print(f"Error saving image: {e}")
+                return
+            # Saving closes the session here, so strokes drawn while the file is
+            # written land in the next session and stay undoable
+            self.canvas.start_session('save')
+            self.exporter.submit(job)
+
+    def export_options(self):
+        """Encoder settings: png_compression (0-9), export_quality (1-100) and
+        export_scale, an integer upscale re-rasterized from the action log"""
+        options = {}
+        for name, key, low, high in (('png_compression', 'compression', 0, 9),
+                                     ('export_quality', 'quality', 1, 100),
+                                     ('export_scale', 'scale', 1, 8)):
+            value = self.db.get_setting(name)
+            if value is None:
+                continue
+            try:
+                options[key] = min(max(int(value), low), high)
+            except ValueError:
+                print(f"[WARNING] Invalid {name} {value!r}; using the default")
+        return options
+
+    def on_exported(self, job):
+        if job.ok:
+            self.compact_after_export = True
+        if self.compact_after_export and self.exporter.idle:
+            self.compact_after_export = False
+            self.compactor.run_async()
+
+    def open_gallery(self):
+        if self.gallery is None:
+            self.gallery = GalleryWindow(self.db)
+        elif not self.gallery.isVisible():
+            self.gallery.reload()
+        self.gallery.show()
+        self.gallery.raise_()
+
+    def compact(self):
+        """Compact ended sessions in the background once no queued export still reads their log"""
+        if self.exporter.idle:
+            self.compactor.run_async()
+        else:
+            self.compact_after_export = True
 
     def pick_color(self):
         """Handle color selection with preview"""
@@ -0,0 +1,28 @@
+"""Fixtures shared by the tests that draw on a logged canvas"""
+import unittest
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from database import Database
+
+
+def draw_line(canvas, y, x0=0.1, x1=0.9, steps=10, tool='draw'):
+    """One horizontal stroke at normalized height y"""
+    apply = canvas.erase if tool == 'erase' else canvas.draw
+    for i in range(steps + 1):
+        apply((x0 + (x1 - x0) * i / steps, y))
+    canvas.reset_previous_points()
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Gives each test a fresh Database in a temporary directory"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmpdir.name, 'test.db')
+        self.db = Database(self.db_file)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
@@ -0,0 +1,40 @@
+import unittest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+import bench_pipeline
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_quick_run_reports_every_operation(self):
+        results = bench_pipeline.run_suite(segments=300, hands=300, frames=5)
+        names = {r['name'] for r in results}
+        for name in ('recognize_gesture', 'Canvas.draw', 'Canvas.erase', 'Canvas.undo',
+                     'Database.save_action', 'SyntheticSource.read', 'detect_hands'):
+            self.assertIn(name, names)
+        for r in results:
+            self.assertLessEqual(r['p50_us'], r['p99_us'])
+            self.assertGreater(r['peak_rss_kb'], 0)
+
+    def test_peak_rss_without_resource_module(self):
+        saved = bench_pipeline.resource, bench_pipeline.psutil
+        bench_pipeline.resource = bench_pipeline.psutil = None
+        try:
+            data = [bytearray(1 << 20)]
+            self.assertGreaterEqual(bench_pipeline.peak_rss_kb(), 0)
+            data.append(bytearray(1 << 20))
+            self.assertGreaterEqual(bench_pipeline.peak_rss_kb(), 1024)
+        finally:
+            bench_pipeline.resource, bench_pipeline.psutil = saved
+            bench_pipeline.tracemalloc.stop()
+
+    def test_compare_flags_regressions(self):
+        baseline = [{'name': 'op', 'p95_us': 10.0, 'p99_us': 20.0, 'peak_rss_kb': 1000}]
+        faster = [{'name': 'op', 'p95_us': 11.0, 'p99_us': 20.0, 'peak_rss_kb': 1000}]
+        slower = [{'name': 'op', 'p95_us': 20.0, 'p99_us': 20.0, 'peak_rss_kb': 1000}]
+        self.assertEqual(bench_pipeline.compare(faster, baseline, 0.25), [])
+        self.assertEqual(bench_pipeline.compare(slower, baseline, 0.25)[0][:2], ('op', 'p95_us'))
+
+
+if __name__ == '__main__':
+    unittest.main()
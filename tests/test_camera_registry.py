@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from camera_registry import CameraRegistry
+from database import Database
+
+
+class FakeDevices:
+    """Probe stand-in: each present device answers after a delay, missing ones fail"""
+
+    def __init__(self, present, delay=0.2, hung=()):
+        self.present = present
+        self.delay = delay
+        self.hung = hung
+        self.calls = []
+
+    def __call__(self, index):
+        self.calls.append(index)
+        time.sleep(5 if index in self.hung else self.delay)
+        return (640, 480, 30.0) if index in self.present else None
+
+
+class TestCameraRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.tmpdir.name, 'test.db'), use_journal=False)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_probes_concurrently_with_timeout(self):
+        registry = CameraRegistry(self.db, max_index=4, timeout=1.0, probe=FakeDevices({0, 2}, hung={3}))
+        start = time.monotonic()
+        self.assertEqual(registry.probe(), [0, 2])
+        elapsed = time.monotonic() - start
+        self.assertLess(elapsed, 1.5)
+        self.assertFalse(registry.get(3).available)
+        self.assertEqual((registry.get(2).width, registry.get(2).fps), (640, 30.0))
+
+    def test_results_are_cached_in_database(self):
+        registry = CameraRegistry(self.db, max_index=2, probe=FakeDevices({1}, delay=0))
+        registry.probe()
+
+        devices = FakeDevices(set())
+        cached = CameraRegistry(self.db, max_index=2, probe=devices)
+        self.assertEqual(cached.available(), [1])
+        self.assertIsNotNone(cached.get(1).last_success)
+        self.assertFalse(cached.is_stale())
+        self.assertIsNone(cached.revalidate_async())
+        self.assertEqual(devices.calls, [])
+
+    def test_next_camera_wraps_and_skips_failures(self):
+        registry = CameraRegistry(probe=FakeDevices({0, 1, 3}, delay=0), max_index=3)
+        registry.probe()
+        self.assertEqual(registry.next_camera(1), 3)
+        self.assertEqual(registry.next_camera(3), 0)
+        registry.mark_failure(3)
+        self.assertEqual(registry.next_camera(1), 0)
+        registry.mark_failure(0)
+        self.assertIsNone(registry.next_camera(1))
+
+    def test_background_revalidation_skips_open_camera(self):
+        devices = FakeDevices({0, 1}, delay=0)
+        registry = CameraRegistry(self.db, max_index=2, probe=devices)
+        self.assertTrue(registry.is_stale())
+        registry.revalidate_async(skip={0}).join(5)
+        self.assertEqual(sorted(devices.calls), [1, 2])
+        self.assertEqual(registry.available(), [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+import sys
+import os
+import numpy as np
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QColor, QMouseEvent
+from PyQt5.QtCore import Qt, QEvent, QPoint
+from canvas import Canvas
+from canvas_widget import CanvasWidget
+
+
+class TestCursorOverlay(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.canvas = Canvas()
+        self.widget = CanvasWidget(self.canvas)
+        self.widget.setFixedSize(self.canvas.width, self.canvas.height)
+
+    def test_cursor_is_painted_over_untouched_buffer(self):
+        buffer = self.canvas.get_canvas()
+        self.widget.set_cursor((100, 120), "drawing")
+
+        image = self.widget.grab().toImage()
+        self.assertEqual(QColor(image.pixel(102, 122)), QColor(0, 120, 255))
+        self.assertIs(self.canvas.get_canvas(), buffer)
+        self.assertTrue((buffer == 255).all())
+
+    def test_hide_cursor(self):
+        self.widget.set_cursor((100, 120))
+        self.widget.hide_cursor()
+        image = self.widget.grab().toImage()
+        self.assertEqual(QColor(image.pixel(100, 120)), QColor(255, 255, 255))
+
+
+class TestDamageTracking(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def test_draw_reports_bounding_box(self):
+        canvas = Canvas()
+        canvas.draw((0.1, 0.1))
+        canvas.draw((0.2, 0.15))
+        x0, y0, x1, y1 = canvas.take_damage()
+        self.assertLessEqual(x0, 64 - canvas.brush_size // 2)
+        self.assertGreaterEqual(x1, 128 + canvas.brush_size // 2 - 1)
+        self.assertLess(x1 - x0, 100)
+        self.assertLess(y1 - y0, 60)
+        self.assertIsNone(canvas.take_damage())
+
+    def test_undo_and_clear_report_damage(self):
+        canvas = Canvas()
+        canvas.draw((0.1, 0.1))
+        canvas.draw((0.2, 0.1))
+        canvas.reset_previous_points()
+        canvas.take_damage()
+
+        canvas.undo()
+        x0, y0, x1, y1 = canvas.take_damage()
+        self.assertLess(x1 - x0, canvas.width - 1)
+
+        canvas.clear()
+        self.assertEqual(canvas.take_damage(), (0, 0, canvas.width - 1, canvas.height - 1))
+
+    def test_image_view_is_reused(self):
+        canvas = Canvas()
+        widget = CanvasWidget(canvas)
+        image = widget._canvas_image()
+        canvas.draw((0.1, 0.1))
+        canvas.draw((0.2, 0.2))
+        canvas.clear()
+        self.assertIs(widget._canvas_image(), image)
+
+
+class TestInputBatching(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def test_queued_points_draw_once_per_flush(self):
+        canvas = Canvas()
+        reference = Canvas()
+        touches = []
+        touch = canvas.history.touch
+        canvas.history.touch = lambda *args: (touches.append(args[1:]), touch(*args))
+        for i in range(40):
+            point = (0.1 + i * 0.01, 0.3 + 0.1 * (i % 3))
+            canvas.queue_point(point)
+            reference.draw(point)
+        self.assertTrue((canvas.canvas == 255).all())
+        self.assertIsNone(canvas.take_damage())
+
+        canvas.flush_input()
+        canvas.end_stroke()
+        reference.end_stroke()
+        self.assertEqual(len(touches), 1)
+        np.testing.assert_array_equal(canvas.canvas, reference.canvas)
+        self.assertEqual(len(canvas.history), 1)
+
+    def test_mouse_moves_are_flushed_by_the_widget(self):
+        canvas = Canvas()
+        widget = CanvasWidget(canvas)
+        widget.parent = lambda: type('Parent', (), {'mode': 'mouse'})
+        widget.mouse_mode = "draw"
+        press = QMouseEvent(QEvent.MouseButtonPress, QPoint(100, 100), Qt.LeftButton, Qt.LeftButton, Qt.NoModifier)
+        widget.mousePressEvent(press)
+        for x in range(110, 200, 10):
+            widget.mouseMoveEvent(QMouseEvent(QEvent.MouseMove, QPoint(x, 100), Qt.NoButton,
+                                              Qt.LeftButton, Qt.NoModifier))
+        self.assertTrue(widget._input_timer.isActive())
+        self.assertTrue((canvas.canvas[100, 150] == 255).all())
+
+        widget.mouseReleaseEvent(QMouseEvent(QEvent.MouseButtonRelease, QPoint(190, 100), Qt.LeftButton,
+                                             Qt.NoButton, Qt.NoModifier))
+        self.assertFalse(widget._input_timer.isActive())
+        self.assertTrue((canvas.canvas[100, 110:190] == 0).all())
+        self.assertEqual(len(canvas.history), 1)
+
+    def test_smoothing_interpolates_through_input_points(self):
+        canvas = Canvas(smoothing=True)
+        inputs = [(0.1, 0.5), (0.3, 0.2), (0.5, 0.5), (0.7, 0.8), (0.9, 0.5)]
+        for point in inputs:
+            canvas.queue_point(point)
+        canvas.flush_input()
+        stroke = canvas.stroke
+        canvas.end_stroke()
+
+        points = stroke.point_list()
+        pixels = [canvas.to_pixel(p) for p in inputs]
+        self.assertGreater(len(points), 4 * len(inputs))
+        self.assertEqual(points[0], pixels[0])
+        self.assertEqual(points[-1], pixels[-1])
+        for pixel in pixels:
+            self.assertIn(pixel, points)
+        self.assertTrue((canvas.canvas[pixels[2][1], pixels[2][0]] == 0).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+import unittest
+import sys
+import os
+import sqlite3
+import tempfile
+import time
+import json
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from database import Database, SCHEMA_VERSION, encode_color, decode_color
+from helpers import DatabaseTestCase
+from journal import ActionJournal
+
+
+class TestActionJournal(DatabaseTestCase):
+    def count_rows(self):
+        conn = sqlite3.connect(self.db_file)
+        count = conn.execute('SELECT COUNT(*) FROM drawing_actions').fetchone()[0]
+        conn.close()
+        return count
+
+    def test_save_action_returns_sequential_ids(self):
+        first = self.db.save_action("draw", [(0, 0), (1, 1)], (0, 0, 0))
+        second = self.db.save_action("draw", [(1, 1), (2, 2)], (0, 0, 0))
+        self.assertEqual(second, first + 1)
+
+    def test_flush_commits_queued_actions(self):
+        for i in range(100):
+            self.db.save_action("draw", [(i, i), (i + 1, i + 1)], (0, 0, 0))
+        self.db.flush()
+        self.assertEqual(self.count_rows(), 100)
+
+    def test_locked_database_keeps_queued_actions(self):
+        self.db.journal.close()
+        self.db.journal = ActionJournal(self.db_file, busy_timeout=0.05, retry_interval=0.05)
+        blocker = sqlite3.connect(self.db_file)
+        blocker.execute('BEGIN EXCLUSIVE')
+        for i in range(10):
+            self.db.save_action("draw", [(i, i), (i + 1, i + 1)], (0, 0, 0))
+        self.assertFalse(self.db.journal.flush())
+        blocker.rollback()
+        blocker.close()
+        self.assertTrue(self.db.journal.flush())
+        self.assertEqual(self.count_rows(), 10)
+
+    def test_persistent_lock_drops_after_retries(self):
+        self.db.journal.close()
+        self.db.journal = ActionJournal(self.db_file, busy_timeout=0.01, retry_interval=0.01, max_retries=3)
+        self.db.save_action("draw", [(0, 0), (1, 1)])
+        self.db.flush()
+        blocker = sqlite3.connect(self.db_file)
+        blocker.execute('BEGIN EXCLUSIVE')
+        self.db.save_action("draw", [(1, 1), (2, 2)])
+        deadline = time.monotonic() + 5
+        while self.db.journal.dropped == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        blocker.rollback()
+        blocker.close()
+        self.assertEqual(self.db.journal.dropped, 1)
+        self.assertTrue(self.db.journal.flush())
+        self.assertEqual(self.count_rows(), 1)
+
+    def test_two_databases_on_one_file_get_distinct_ids(self):
+        other = Database(self.db_file)
+        ids = []
+        for i in range(5):
+            ids.append(self.db.save_action("draw", [(i, i), (i + 1, i + 1)]))
+            ids.append(other.save_action("erase", [(i, i), (i + 1, i + 1)]))
+        other.close()
+        self.db.flush()
+        self.assertEqual(len(set(ids)), 10)
+        self.assertEqual(self.count_rows(), 10)
+        self.assertEqual(self.db.journal.dropped, 0)
+
+    def test_id_blocks_are_claimed_as_they_run_out(self):
+        self.db.journal.close()
+        journals = [ActionJournal(self.db_file, flush_interval=0.01, id_block=4) for _ in range(2)]
+        self.db.journal = journals[0]
+        ids = []
+        for i in range(40):
+            ids.append(journals[i % 2].append('draw', b'\x00\x00\x01\x00'))
+            if i % 7 == 0:
+                journals[i % 2].flush()
+        journals[1].close()
+        self.db.flush()
+        self.assertEqual(len(set(ids)), 40)
+        self.assertEqual(self.count_rows(), 40)
+
+    def test_failing_callback_loses_only_itself(self):
+        def broken(conn):
+            raise ValueError("broken callback")
+        self.db.save_action("draw", [(0, 0), (1, 1)])
+        self.db.journal.submit(broken)
+        self.db.save_action("draw", [(1, 1), (2, 2)])
+        self.assertTrue(self.db.journal.flush())
+        self.assertEqual(self.count_rows(), 2)
+        self.assertEqual(self.db.journal.dropped, 1)
+        self.assertIsInstance(self.db.journal.last_error, ValueError)
+
+    def test_readers_see_queued_actions(self):
+        self.db.save_action("erase", [(5, 5), (6, 6)], (255, 255, 255))
+        actions = self.db.get_all_actions()
+        self.assertEqual(len(actions), 1)
+        self.assertEqual(actions[0]['points'].tolist(), [[5, 5], [6, 6]])
+
+        undone = self.db.undo_last_action()
+        self.assertEqual(undone['action_type'], "erase")
+        self.assertEqual(self.count_rows(), 0)
+
+    def test_ids_are_not_reused_after_reopen(self):
+        last = self.db.save_action("draw", [(0, 0), (1, 1)])
+        self.db.undo_last_action()
+        self.db.close()
+
+        self.db = Database(self.db_file)
+        self.assertGreater(self.db.save_action("draw", [(0, 0), (1, 1)]), last)
+
+    def test_close_falls_back_to_direct_writes(self):
+        self.db.close()
+        self.db.save_action("draw", [(0, 0), (1, 1)])
+        self.assertEqual(self.count_rows(), 1)
+
+
+class TestSchema(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmpdir.name, 'legacy.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def make_legacy_file(self, with_stroke_columns=True):
+        conn = sqlite3.connect(self.db_file)
+        extra = 'width INTEGER, started_at REAL, ended_at REAL' if with_stroke_columns else None
+        conn.execute('''
+            CREATE TABLE drawing_actions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                action_type TEXT NOT NULL,
+                points TEXT NOT NULL,
+                color TEXT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP%s
+            )
+        ''' % (', ' + extra if extra else ''))
+        for i in range(1, 6):
+            conn.execute('INSERT INTO drawing_actions (id, action_type, points, color) VALUES (?, ?, ?, ?)',
+                         (i, 'draw' if i % 2 else 'erase', json.dumps([[i, i * 2], [i + 10, i * 2 + 1.6]]),
+                          json.dumps([10 * i, 20, 30]) if i % 2 else None))
+        conn.execute("UPDATE sqlite_sequence SET seq = 9 WHERE name = 'drawing_actions'")
+        conn.commit()
+        conn.close()
+
+    def test_legacy_file_is_migrated_in_place(self):
+        self.make_legacy_file()
+        db = Database(self.db_file, use_journal=False)
+
+        conn = sqlite3.connect(self.db_file)
+        self.assertEqual(conn.execute('PRAGMA user_version').fetchone()[0], SCHEMA_VERSION)
+        self.assertEqual(conn.execute('SELECT typeof(points) FROM drawing_actions LIMIT 1').fetchone()[0], 'blob')
+        indexes = {row[1] for row in conn.execute('PRAGMA index_list(drawing_actions)')}
+        conn.close()
+        self.assertTrue({'idx_actions_session', 'idx_actions_drawing'} <= indexes)
+
+        actions = db.get_all_actions()
+        self.assertEqual([a['id'] for a in actions], [1, 2, 3, 4, 5])
+        self.assertEqual(actions[2]['points'].tolist(), [[3, 6], [13, 8]])
+        self.assertEqual(actions[2]['points'].dtype, np.int16)
+        self.assertEqual(actions[2]['color'], (30, 20, 30))
+        self.assertIsNone(actions[1]['color'])
+        self.assertGreater(db.save_action('draw', [(0, 0), (1, 1)]), 9)
+
+        # Reopening does not migrate again
+        self.assertEqual(len(Database(self.db_file, use_journal=False).get_all_actions()), 6)
+
+    def test_files_without_stroke_columns_migrate(self):
+        self.make_legacy_file(with_stroke_columns=False)
+        actions = Database(self.db_file, use_journal=False).get_all_actions()
+        self.assertEqual(len(actions), 5)
+        self.assertIsNone(actions[0]['width'])
+
+    def test_bulk_reader_returns_arrays(self):
+        db = Database(self.db_file)
+        db.session_id = 7
+        db.save_action('draw', [(1, 2), (3, 4), (5, 6)], (1, 2, 3), 10)
+        db.session_id = 8
+        db.save_action('erase', [(7, 8)], None, 20)
+        arrays = db.get_action_arrays()
+        db.close()
+
+        self.assertEqual(arrays['action_type'], ['draw', 'erase'])
+        self.assertEqual(arrays['offsets'].tolist(), [0, 3, 4])
+        self.assertEqual(arrays['points'].tolist(), [[1, 2], [3, 4], [5, 6], [7, 8]])
+        self.assertEqual(arrays['color'].tolist(), [encode_color((1, 2, 3)), -1])
+        self.assertEqual(arrays['width'].tolist(), [10, 20])
+        self.assertEqual(db.get_action_arrays(session_id=8)['id'].tolist(), [arrays['id'][1]])
+        self.assertEqual(len(db.get_action_arrays(after_id=int(arrays['id'][1]))['id']), 0)
+
+    def test_color_packing(self):
+        self.assertEqual(encode_color((255, 128, 1)), 0xFF8001)
+        self.assertEqual(decode_color(0xFF8001), (255, 128, 1))
+        self.assertEqual(decode_color(encode_color((0, 0, 0))), (0, 0, 0))
+        self.assertIsNone(encode_color(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import sys
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from PIL import Image
+from PyQt5.QtCore import QCoreApplication
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from canvas import Canvas
+from exporter import ExportJob, ExportService
+from helpers import DatabaseTestCase, draw_line
+
+
+class TestExporter(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.canvas = Canvas(db=self.db)
+        self.service = ExportService(self.db)
+        for i, y in enumerate(np.linspace(0.2, 0.8, 6)):
+            self.canvas.change_color((40 * i, 100, 200 - 30 * i))
+            draw_line(self.canvas, y, steps=8 + i)
+
+    def tearDown(self):
+        self.service.stop()
+        super().tearDown()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def export(self, name, **options):
+        return self.service.export(ExportJob.capture(self.canvas, self.path(name), mode='mouse', **options))
+
+    def drawings(self):
+        conn = sqlite3.connect(self.db_file)
+        rows = conn.execute('SELECT filename FROM drawings').fetchall()
+        conn.close()
+        return [row[0] for row in rows]
+
+    def test_png_compression_level(self):
+        fast = self.export('fast.png', compression=0)
+        small = self.export('small.png', compression=9)
+        self.assertTrue(fast.ok and small.ok)
+        self.assertLess(os.path.getsize(small.path), os.path.getsize(fast.path))
+        for job in (fast, small):
+            np.testing.assert_array_equal(np.asarray(Image.open(job.path)), self.canvas.canvas)
+
+    def test_lossy_formats(self):
+        for name in ('out.webp', 'out.jpg'):
+            job = self.export(name, quality=95)
+            self.assertTrue(job.ok)
+            image = np.asarray(Image.open(job.path).convert('RGB')).astype(int)
+            self.assertEqual(image.shape, (480, 640, 3))
+            self.assertLess(np.abs(image - self.canvas.canvas).mean(), 3)
+
+    def test_tiled_capture_copies_only_allocated_tiles(self):
+        board = Canvas(3000, 2000, tiled=True, tile_size=256)
+        draw_line(board, 0.5, x0=0.1, x1=0.3)
+        job = ExportJob.capture(board, self.path('board.png'))
+        self.assertEqual(set(job.image.tiles), set(board.canvas.tiles))
+        expected = board.to_array()
+        draw_line(board, 0.7)
+
+        self.assertTrue(self.service.export(job).ok)
+        np.testing.assert_array_equal(np.asarray(Image.open(job.path)), expected)
+
+    def test_upscaled_export_is_rasterized_from_log(self):
+        self.canvas.start_session('save')
+        draw_line(self.canvas, 0.5, x0=0.2, x1=0.6)
+        job = self.export('big.png', scale=2)
+        self.assertIsNone(job.image)
+        self.assertTrue(job.ok)
+
+        big = np.asarray(Image.open(job.path))
+        self.assertEqual(big.shape, (960, 1280, 3))
+        # Downsampled back it matches the canvas apart from antialiasing at stroke edges
+        small = big[::2, ::2].astype(int)
+        self.assertGreater((np.abs(small - self.canvas.canvas).max(axis=2) < 64).mean(), 0.98)
+
+    def test_snapshot_ignores_later_strokes(self):
+        job = ExportJob.capture(self.canvas, self.path('out.png'), scale=2)
+        expected = job.last_action_id
+        draw_line(self.canvas, 0.9)
+        self.service.export(job)
+
+        conn = sqlite3.connect(self.db_file)
+        tagged = conn.execute('SELECT MAX(id) FROM drawing_actions WHERE drawing_id = ?',
+                              (job.drawing_id,)).fetchone()[0]
+        untagged = conn.execute('SELECT COUNT(*) FROM drawing_actions WHERE drawing_id IS NULL').fetchone()[0]
+        conn.close()
+        self.assertEqual(tagged, expected)
+        self.assertEqual(untagged, 1)
+
+    def test_failed_export_is_not_recorded(self):
+        job = self.service.export(ExportJob.capture(self.canvas, self.path('missing/out.png')))
+        self.assertFalse(job.ok)
+        self.assertIsNone(job.drawing_id)
+        self.assertEqual(self.drawings(), [])
+        with self.assertRaises(ValueError):
+            ExportJob.capture(self.canvas, self.path('out.bmp'))
+
+    def test_service_reports_completion(self):
+        app = QCoreApplication.instance() or QCoreApplication([])
+        done = []
+        self.service.exported.connect(done.append)
+        for name in ('a.png', 'b.svg', 'c.pdf'):
+            self.service.submit(ExportJob.capture(self.canvas, self.path(name)))
+
+        deadline = time.time() + 10
+        while len(done) < 3 and time.time() < deadline:
+            app.processEvents()
+            time.sleep(0.01)
+        self.assertEqual([os.path.basename(job.path) for job in done], ['a.png', 'b.svg', 'c.pdf'])
+        self.assertTrue(all(job.ok for job in done))
+        self.assertEqual(len(self.drawings()), 3)
+        self.assertTrue(self.service.idle)
+
+    def test_service_is_busy_until_queue_drains(self):
+        release = threading.Event()
+        export = self.service.export
+        self.service.export = lambda job: (release.wait(10), export(job))
+        job = self.service.submit(ExportJob.capture(self.canvas, self.path('a.svg')))
+        self.service.submit(ExportJob.capture(self.canvas, self.path('b.pdf')))
+        self.assertFalse(self.service.idle)
+        release.set()
+        self.service.stop()
+        self.assertTrue(self.service.idle)
+        self.assertTrue(job.ok)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import sys
+import os
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from filters import OneEuroFilter, KalmanTipFilter, PassThroughFilter, make_tip_filter
+
+
+def run(tip_filter, points, dt=1 / 30):
+    return np.array([tip_filter(x, y, i * dt) for i, (x, y) in enumerate(points)])
+
+
+class TestTipFilters(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.noise = rng.normal(0, 0.004, size=(120, 2))
+
+    def test_still_hand_jitter_is_reduced(self):
+        points = 0.5 + self.noise
+        for tip_filter in (OneEuroFilter(), KalmanTipFilter()):
+            out = run(tip_filter, points)
+            self.assertLess(out[30:].std(axis=0).max(), points[30:].std(axis=0).max() * 0.75)
+
+    def test_lead_predicts_ahead_on_constant_motion(self):
+        lead = 0.05
+        t = np.arange(120) / 30
+        truth = np.stack([0.1 + 0.2 * t, np.full_like(t, 0.5)], axis=1)
+        ahead = 0.1 + 0.2 * (t[-1] + lead)
+        for make in (OneEuroFilter, KalmanTipFilter):
+            lagging = run(make(lead=0.0), truth)[-1, 0]
+            leading = run(make(lead=lead), truth)[-1, 0]
+            self.assertAlmostEqual(leading - lagging, 0.2 * lead, delta=1e-4)
+            self.assertLess(abs(leading - ahead), abs(lagging - ahead))
+
+    def test_gap_resets_filter(self):
+        tip_filter = OneEuroFilter(reset_after=0.5)
+        tip_filter(0.1, 0.1, 0.0)
+        tip_filter(0.1, 0.1, 0.03)
+        self.assertEqual(tip_filter(0.9, 0.9, 2.0), (0.9, 0.9))
+
+    def test_make_tip_filter(self):
+        self.assertIsInstance(make_tip_filter(), OneEuroFilter)
+        tip_filter = make_tip_filter({"type": "kalman", "lead": 0.05})
+        self.assertIsInstance(tip_filter, KalmanTipFilter)
+        self.assertEqual(tip_filter.lead, 0.05)
+        self.assertIsInstance(make_tip_filter({"type": "none"}), PassThroughFilter)
+
+
+if __name__ == '__main__':
+    unittest.main()
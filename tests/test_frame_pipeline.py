@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+import time
+import threading
+import numpy as np
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from PyQt5.QtCore import QCoreApplication
+from frame_pipeline import LatestFrameQueue, FramePipeline
+
+
+class FakeSource:
+    mirror = True
+
+    def __init__(self):
+        self.reads = 0
+
+    def read(self):
+        self.reads += 1
+        time.sleep(0.005)
+        return True, time.monotonic(), np.full((48, 64, 3), self.reads % 256, dtype=np.uint8)
+
+
+class FakeResult:
+    multi_hand_landmarks = None
+
+
+class SlowTracker:
+    def __init__(self):
+        self.thread = None
+
+    def detect_hands(self, frame):
+        self.thread = threading.current_thread()
+        time.sleep(0.03)
+        return frame, FakeResult()
+
+
+class TestLatestFrameQueue(unittest.TestCase):
+    def test_newest_item_wins(self):
+        frames = LatestFrameQueue()
+        frames.put(1)
+        frames.put(2)
+        frames.put(3)
+        self.assertEqual(frames.get(timeout=0), 3)
+        self.assertEqual(frames.dropped, 2)
+        self.assertIsNone(frames.get(timeout=0))
+
+    def test_close_wakes_consumer(self):
+        frames = LatestFrameQueue()
+        threading.Timer(0.05, frames.close).start()
+        self.assertIsNone(frames.get(timeout=5))
+
+
+class TestFramePipeline(unittest.TestCase):
+    def test_results_arrive_on_ui_thread_and_stale_frames_drop(self):
+        app = QCoreApplication.instance() or QCoreApplication([])
+        tracker = SlowTracker()
+        pipeline = FramePipeline(tracker)
+        results = []
+        pipeline.result_ready.connect(lambda result: results.append((threading.current_thread(), result)))
+
+        pipeline.start(FakeSource())
+        deadline = time.monotonic() + 5
+        while len(results) < 3 and time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.01)
+        pipeline.stop()
+
+        self.assertGreaterEqual(len(results), 3)
+        self.assertIs(results[0][0], threading.main_thread())
+        self.assertIsNot(tracker.thread, threading.main_thread())
+        self.assertGreater(pipeline.dropped_frames, 0)
+        self.assertFalse(pipeline.is_running())
+
+
+if __name__ == '__main__':
+    unittest.main()
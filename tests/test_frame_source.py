@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from PyQt5.QtCore import QCoreApplication
+from frame_source import (camera_backend, CameraSource, VideoFileSource, ImageSequenceSource,
+                          SyntheticSource, open_source)
+from frame_pipeline import FramePipeline
+
+
+class FakeResult:
+    multi_hand_landmarks = None
+
+
+class PassTracker:
+    def detect_hands(self, frame):
+        return frame, FakeResult()
+
+
+class TestFrameSources(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_camera_backend_per_platform(self):
+        self.assertEqual(camera_backend('win32'), cv2.CAP_DSHOW)
+        self.assertEqual(camera_backend('darwin'), cv2.CAP_AVFOUNDATION)
+        self.assertEqual(camera_backend('linux'), cv2.CAP_V4L2)
+        self.assertTrue(CameraSource.mirror)
+        self.assertFalse(SyntheticSource.mirror)
+
+    def test_synthetic_source(self):
+        with SyntheticSource(160, 120, fps=20, frame_count=3) as source:
+            reads = [source.read() for _ in range(4)]
+        self.assertEqual(source.resolution, (160, 120))
+        self.assertEqual([r[0] for r in reads], [True, True, True, False])
+        self.assertEqual([r[1] for r in reads[:3]], [0.0, 0.05, 0.1])
+        self.assertEqual(reads[0][2].shape, (120, 160, 3))
+        self.assertFalse(np.array_equal(reads[0][2], reads[2][2]))
+
+    def test_image_sequence_source(self):
+        for i in range(3):
+            cv2.imwrite(os.path.join(self.tmpdir.name, f'frame{i:03d}.png'), np.full((8, 12, 3), i * 50, np.uint8))
+        source = open_source(self.tmpdir.name, realtime=False)
+        self.assertIsInstance(source, ImageSequenceSource)
+        with source:
+            self.assertEqual(source.resolution, (12, 8))
+            values = [int(source.read()[2][0, 0, 0]) for _ in range(3)]
+            self.assertFalse(source.read()[0])
+        self.assertEqual(values, [0, 50, 100])
+
+    def test_video_file_source(self):
+        path = os.path.join(self.tmpdir.name, 'clip.avi')
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (64, 48))
+        if not writer.isOpened():
+            self.skipTest("No video encoder available")
+        for i in range(5):
+            writer.write(np.full((48, 64, 3), i * 40, np.uint8))
+        writer.release()
+
+        source = open_source(path, realtime=False)
+        self.assertIsInstance(source, VideoFileSource)
+        with source:
+            self.assertEqual(source.resolution, (64, 48))
+            self.assertAlmostEqual(source.fps, 25)
+            timestamps = []
+            while True:
+                ret, timestamp, _ = source.read()
+                if not ret:
+                    break
+                timestamps.append(timestamp)
+        self.assertEqual(len(timestamps), 5)
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_pipeline_runs_on_synthetic_source(self):
+        app = QCoreApplication.instance() or QCoreApplication([])
+        pipeline = FramePipeline(PassTracker())
+        results = []
+        pipeline.result_ready.connect(results.append)
+
+        source = SyntheticSource(64, 48, fps=100, realtime=True)
+        source.open()
+        pipeline.start(source)
+        deadline = time.monotonic() + 5
+        while len(results) < 3 and time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.01)
+        pipeline.stop()
+        source.release()
+
+        self.assertGreaterEqual(len(results), 3)
+        self.assertEqual((results[0].image.width(), results[0].image.height()), (64, 48))
+        self.assertLess(results[0].timestamp, results[-1].timestamp)
+
+
+if __name__ == '__main__':
+    unittest.main()
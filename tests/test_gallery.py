@@ -0,0 +1,108 @@
+import unittest
+import io
+import sys
+import os
+import sqlite3
+import time
+import numpy as np
+from PIL import Image
+from PyQt5.QtWidgets import QApplication
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from gallery import GalleryWindow, ThumbnailCache, make_thumbnail
+from helpers import DatabaseTestCase
+
+
+class TestGallery(DatabaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def add_drawings(self, count, created_at='2026-01-01 12:00:00'):
+        """Drawings rows sharing one created_at, as quick saves within a second do"""
+        conn = sqlite3.connect(self.db_file)
+        conn.executemany('INSERT INTO drawings (filename, created_at, color, mode) VALUES (?, ?, ?, ?)',
+                         [(os.path.join(self.tmpdir.name, f'd{i}.png'), created_at, '(0, 0, 0)', 'mouse')
+                          for i in range(count)])
+        conn.commit()
+        conn.close()
+
+    def write_image(self, name, value=0):
+        path = os.path.join(self.tmpdir.name, name)
+        image = np.full((480, 640, 3), 255, dtype=np.uint8)
+        image[100:300, 100:500] = value
+        Image.fromarray(image).save(path)
+        return path
+
+    def wait_for(self, condition, timeout=10):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            self.app.processEvents()
+            time.sleep(0.01)
+        self.assertTrue(condition())
+
+    def test_keyset_pages_cover_every_drawing_once(self):
+        self.add_drawings(25, '2026-01-01 12:00:00')
+        self.add_drawings(10, '2026-01-02 12:00:00')
+        seen, before = [], None
+        while True:
+            page = self.db.get_drawings(limit=8, before=before)
+            if not page:
+                break
+            seen.extend(row[0] for row in page)
+            before = (page[-1][2], page[-1][0])
+        self.assertEqual(seen, [row[0] for row in self.db.get_drawings()])
+        self.assertEqual(len(set(seen)), 35)
+        self.assertEqual(seen[:10], list(range(35, 25, -1)))
+
+    def test_thumbnail_is_stored_until_file_changes(self):
+        path = self.write_image('a.png')
+        cache = ThumbnailCache(self.db)
+        data = cache.load(1, path)
+        with Image.open(io.BytesIO(data)) as thumb:
+            self.assertEqual(thumb.size, (160, 120))
+        self.assertEqual(self.db.get_thumbnail(1, os.path.getmtime(path)), data)
+
+        self.write_image('a.png', value=128)
+        os.utime(path, (time.time() + 5, time.time() + 5))
+        self.assertNotEqual(cache.load(1, path), data)
+        self.assertIsNone(cache.load(2, os.path.join(self.tmpdir.name, 'missing.png')))
+        self.assertIsNone(make_thumbnail(__file__))
+
+    def test_memory_cache_is_lru(self):
+        paths = [self.write_image(f'{i}.png') for i in range(3)]
+        cache = ThumbnailCache(self.db, capacity=2)
+        ready = []
+        cache.ready.connect(lambda drawing_id, data: ready.append(drawing_id))
+        for i, path in enumerate(paths):
+            self.assertIsNone(cache.get(i, path))
+        self.wait_for(lambda: len(ready) == 3)
+        cache.stop()
+        self.assertIsNone(cache.get(ready[0], paths[ready[0]]))
+        self.assertIsNotNone(cache.get(ready[2], paths[ready[2]]))
+        cache.stop()
+
+    def test_gallery_loads_pages_lazily(self):
+        self.write_image('d0.png')
+        self.add_drawings(200)
+        gallery = GalleryWindow(self.db, page_size=40)
+        gallery.resize(400, 300)
+        gallery.show()
+        self.app.processEvents()
+        first = gallery.list.count()
+        self.assertLess(first, 200)
+        self.assertEqual(first % 40, 0)
+
+        scroll_bar = gallery.list.verticalScrollBar()
+
+        def scrolled_to_end():
+            scroll_bar.setValue(scroll_bar.maximum())
+            return gallery.exhausted
+        self.wait_for(scrolled_to_end)
+        self.assertEqual(gallery.list.count(), 200)
+        item = gallery.items[1]
+        self.wait_for(lambda: not item.icon().isNull())
+        gallery.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,10 @@
 import unittest
+import numpy as np
 from collections import namedtuple
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
-from hand_tracking import HandTracker
+from hand_tracking import HandTracker, classify_gestures
 
 MockLandmark = namedtuple('MockLandmark', ['x', 'y'])
 
@@ -56,3 +57,94 @@ class TestGestureRecognition(unittest.TestCase):
 
         mock_input = MockLandmarkList(landmarks)
         self.assertEqual(self.tracker.recognize_gesture(mock_input), "idle")
+
+
+class TestBatchClassification(unittest.TestCase):
+    def hand(self, up):
+        positions = np.zeros((21, 3), dtype=np.float32)
+        positions[:, 1] = 0.9
+        for tip, pip, is_up in zip([8, 12, 16, 20], [6, 10, 14, 18], up):
+            positions[pip, 1] = 0.5
+            positions[tip, 1] = 0.4 if is_up else 0.6
+        return positions
+
+    def test_batch_matches_single_hand_rules(self):
+        clear = self.hand([False] * 4)
+        clear[4, 1] = 0.7
+        batch = np.stack([self.hand([True, False, False, False]),
+                          self.hand([True, True, False, False]),
+                          self.hand([False] * 4),
+                          clear,
+                          self.hand([True] * 4)])
+        self.assertEqual(list(classify_gestures(batch)), ["drawing", "erase", "idle", "clear", "idle"])
+
+    def test_cache_hits_on_nearby_values(self):
+        tracker = HandTracker(gesture_tolerance=1e-3)
+        positions = self.hand([True, False, False, False])
+        first = tracker.classify_gestures(positions)
+        second = tracker.classify_gestures(positions + 1e-5)
+        self.assertIs(first, second)
+        self.assertIsNot(tracker.classify_gestures(positions + 0.05), first)
+
+    def test_cache_is_bounded(self):
+        tracker = HandTracker(gesture_cache_size=4)
+        for i in range(10):
+            tracker.classify_gestures(self.hand([True, False, False, False]) + i * 0.01)
+        self.assertEqual(len(tracker._gesture_cache), 4)
+
+
+class MockResult:
+    def __init__(self, hands):
+        self.multi_hand_landmarks = hands
+
+
+class BlobHands:
+    """Stand-in for mp Hands that reports the bright pixels of an image as a hand"""
+    def __init__(self):
+        self.shapes = []
+
+    def process(self, image_rgb):
+        self.shapes.append(image_rgb.shape[:2])
+        ys, xs = np.nonzero(image_rgb[:, :, 0] > 128)
+        if len(xs) == 0:
+            return MockResult(None)
+        height, width = image_rgb.shape[:2]
+        corners = ((xs.min(), ys.min()), (xs.max() + 1, ys.max() + 1))
+        points = [MockPoint(x / width, y / height, 0.0) for _ in range(11) for x, y in corners]
+        return MockResult([MockLandmarkList(points)])
+
+
+class MockPoint:
+    def __init__(self, x, y, z):
+        self.x, self.y, self.z = x, y, z
+
+
+class TestRoiTracking(unittest.TestCase):
+    def setUp(self):
+        self.tracker = HandTracker(roi_tracking=True, roi_scale=0.5)
+        self.tracker.hands = BlobHands()
+        self.tracker.mp_drawing = type('NoDraw', (), {'draw_landmarks': staticmethod(lambda *a: None)})
+
+    def frame_with_hand(self, x, y, size=40):
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        frame[y:y + size, x:x + size] = 255
+        return frame
+
+    def test_roi_landmarks_map_back_to_full_frame(self):
+        self.tracker.detect_hands(self.frame_with_hand(300, 200))
+        _, result = self.tracker.detect_hands(self.frame_with_hand(310, 210))
+
+        first, second = self.tracker.hands.shapes
+        self.assertEqual(first, (480, 640))
+        self.assertLess(second[0], 240)
+        lm = result.multi_hand_landmarks[0].landmark
+        self.assertAlmostEqual(lm[0].x, 310 / 640, delta=2 / 640)
+        self.assertAlmostEqual(lm[0].y, 210 / 480, delta=2 / 480)
+        self.assertAlmostEqual(lm[1].x, 350 / 640, delta=2 / 640)
+
+    def test_lost_hand_falls_back_to_full_frame(self):
+        self.tracker.detect_hands(self.frame_with_hand(20, 20))
+        _, result = self.tracker.detect_hands(self.frame_with_hand(560, 400))
+
+        self.assertEqual(self.tracker.hands.shapes[-1], (480, 640))
+        self.assertAlmostEqual(result.multi_hand_landmarks[0].landmark[0].x, 560 / 640, delta=1 / 640)
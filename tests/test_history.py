@@ -0,0 +1,88 @@
+import unittest
+import sys
+import os
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from history import TileHistory
+from canvas import Canvas
+
+
+class TestTileHistory(unittest.TestCase):
+    def setUp(self):
+        self.image = np.full((100, 130, 3), 255, dtype=np.uint8)
+        self.history = TileHistory(tile_size=32)
+
+    def paint(self, x0, y0, x1, y1, value=0):
+        self.history.begin()
+        self.history.touch(self.image, x0, y0, x1, y1)
+        self.image[y0:y1 + 1, x0:x1 + 1] = value
+        return self.history.commit(self.image)
+
+    def test_only_touched_tiles_are_stored(self):
+        entry = self.paint(5, 5, 20, 20)
+        self.assertEqual(len(entry.tiles), 1)
+        entry = self.paint(30, 30, 40, 40)
+        self.assertEqual(len(entry.tiles), 4)
+
+    def test_undo_and_redo_restore_pixels(self):
+        self.paint(5, 5, 20, 20)
+        painted = self.image.copy()
+        self.paint(10, 10, 90, 60, value=100)
+
+        self.history.undo(self.image)
+        np.testing.assert_array_equal(self.image, painted)
+        self.history.undo(self.image)
+        self.assertTrue((self.image == 255).all())
+
+        self.history.redo(self.image)
+        np.testing.assert_array_equal(self.image, painted)
+
+    def test_edge_tiles_are_clipped(self):
+        self.paint(120, 90, 129, 99)
+        self.history.undo(self.image)
+        self.assertTrue((self.image == 255).all())
+
+    def test_memory_budget_evicts_oldest(self):
+        tile_bytes = 32 * 32 * 3 * 2
+        self.history.memory_budget = tile_bytes * 2
+        first = self.paint(0, 0, 1, 1)
+        self.paint(0, 0, 1, 1)
+        self.paint(0, 0, 1, 1)
+        self.assertEqual(len(self.history), 2)
+        self.assertNotIn(first, self.history.undo_stack)
+        self.assertLessEqual(self.history.nbytes, self.history.memory_budget)
+
+    def test_new_operation_drops_redo(self):
+        self.paint(0, 0, 1, 1)
+        self.history.undo(self.image)
+        self.assertEqual(len(self.history.redo_stack), 1)
+        self.paint(0, 0, 1, 1)
+        self.assertEqual(self.history.redo_stack, [])
+
+
+class TestCanvasHistory(unittest.TestCase):
+    def test_draw_records_deltas_not_frames(self):
+        canvas = Canvas()
+        canvas.draw((0.1, 0.1))
+        canvas.draw((0.2, 0.1))
+        canvas.reset_previous_points()
+        self.assertEqual(len(canvas.history), 1)
+        self.assertLess(canvas.history.nbytes, canvas.canvas.nbytes)
+
+    def test_undo_redo_without_database(self):
+        canvas = Canvas()
+        canvas.draw((0.1, 0.1))
+        canvas.draw((0.5, 0.5))
+        canvas.reset_previous_points()
+        drawn = canvas.canvas.copy()
+
+        canvas.undo()
+        self.assertTrue((canvas.canvas == 255).all())
+        self.assertEqual(len(canvas.redo_stack), 1)
+
+        canvas.redo()
+        np.testing.assert_array_equal(canvas.canvas, drawn)
+
+
+if __name__ == '__main__':
+    unittest.main()
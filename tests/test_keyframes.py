@@ -0,0 +1,71 @@
+import unittest
+import sys
+import os
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from canvas import Canvas
+from database import Database
+from helpers import DatabaseTestCase
+from keyframes import KeyframeIndex
+
+
+class TestKeyframeIndex(unittest.TestCase):
+    def test_nearest_and_invalidate(self):
+        index = KeyframeIndex(interval=2, max_keyframes=2)
+        image = np.zeros((4, 4, 3), dtype=np.uint8)
+        for action_id in range(1, 7):
+            image[:] = action_id
+            index.capture(action_id, image)
+
+        self.assertEqual(len(index), 2)
+        kf_id, frame = index.nearest(5)
+        self.assertEqual(kf_id, 4)
+        self.assertTrue((frame == 4).all())
+        self.assertIsNone(index.nearest(3))
+
+        index.invalidate_from(6)
+        self.assertEqual(index.nearest()[0], 4)
+
+
+class TestKeyframedUndo(DatabaseTestCase):
+    def draw_path(self, canvas, count):
+        for i in range(count):
+            canvas.draw((0.05 + 0.02 * i, 0.5 + 0.3 * np.sin(i / 5)))
+            canvas.draw((0.06 + 0.02 * i, 0.45 + 0.3 * np.sin(i / 5)))
+            canvas.reset_previous_points()
+
+    def test_undo_replays_only_tail(self):
+        canvas = Canvas(db=self.db)
+        canvas.keyframes.interval = 10
+        self.draw_path(canvas, 36)
+        canvas.history.clear()
+
+        expected = Canvas(db=None)
+        self.draw_path(expected, 35)
+
+        calls = []
+        get_actions_after = self.db.get_actions_after
+        self.db.get_actions_after = lambda action_id: calls.append(action_id) or get_actions_after(action_id)
+
+        canvas.undo()
+        np.testing.assert_array_equal(canvas.canvas, expected.canvas)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(get_actions_after(calls[0])), 5)
+
+    def test_persisted_keyframes_survive_restart(self):
+        canvas = Canvas(db=self.db)
+        canvas.keyframes.interval = 10
+        self.draw_path(canvas, 31)
+        self.db.close()
+
+        self.db = Database(self.db_file)
+        restarted = Canvas(db=self.db)
+        restarted.undo()
+
+        expected = Canvas(db=None)
+        self.draw_path(expected, 30)
+        np.testing.assert_array_equal(restarted.canvas, expected.canvas)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import sys
+import os
+import csv
+import json
+import tempfile
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from profiler import Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def test_disabled_profiler_records_nothing(self):
+        profiler = Profiler()
+        self.assertIs(profiler.stage('a'), profiler.stage('b'))
+        with profiler.stage('a'):
+            pass
+        profiler.frame()
+        self.assertEqual(profiler.summary(), {'stages': {}, 'fps': 0.0, 'dropped_frames': 0})
+
+    def test_percentiles_over_ring_buffer(self):
+        profiler = Profiler(enabled=True, capacity=100)
+        for i in range(1, 201):
+            profiler.record('stage', i / 1000)
+        stats = profiler.summary()['stages']['stage']
+        self.assertEqual(stats['count'], 200)
+        # Only the newest 100 samples (101..200 ms) are kept
+        self.assertAlmostEqual(stats['p50_ms'], 150.5)
+        self.assertAlmostEqual(stats['max_ms'], 200.0)
+        self.assertGreater(stats['p99_ms'], stats['p95_ms'])
+
+    def test_stage_context_and_fps(self):
+        profiler = Profiler(enabled=True)
+        for _ in range(5):
+            with profiler.stage('sleep'):
+                time.sleep(0.01)
+            profiler.frame()
+        summary = profiler.summary()
+        self.assertGreaterEqual(summary['stages']['sleep']['p50_ms'], 9)
+        self.assertTrue(10 < summary['fps'] < 110)
+        self.assertIn('sleep', '\n'.join(profiler.hud_lines()))
+
+    def test_exports(self):
+        profiler = Profiler(enabled=True)
+        profiler.record('Canvas.draw', 0.002)
+        profiler.dropped_frames = 3
+        with tempfile.TemporaryDirectory() as tmpdir:
+            profiler.export_json(os.path.join(tmpdir, 'p.json'))
+            profiler.export_csv(os.path.join(tmpdir, 'p.csv'))
+            with open(os.path.join(tmpdir, 'p.json')) as f:
+                data = json.load(f)
+            with open(os.path.join(tmpdir, 'p.csv')) as f:
+                rows = list(csv.reader(f))
+        self.assertEqual(data['dropped_frames'], 3)
+        self.assertAlmostEqual(data['stages']['Canvas.draw']['p50_ms'], 2.0)
+        self.assertEqual(rows[1][:2], ['Canvas.draw', '1'])
+        self.assertEqual(rows[-1][:2], ['dropped_frames', '3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
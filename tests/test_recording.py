@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+import tempfile
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from canvas import Canvas
+from gestures import GestureController
+from recording import SessionRecorder, load_recording, replay, HEADER, RECORD_DTYPE, NO_GESTURE
+
+
+def hand_at(x, y):
+    positions = np.full((21, 3), 0.5, dtype=np.float32)
+    positions[8, :2] = (x, y)
+    return positions
+
+
+class TestRecording(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'session.dwrec')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def record_stroke(self, close=True):
+        recorder = SessionRecorder(self.path)
+        for i in range(10):
+            recorder.record(i / 30, hand_at(0.2 + 0.05 * i, 0.5), "drawing")
+        recorder.record(10 / 30, None, None)
+        recorder.record(11 / 30, hand_at(0.5, 0.5), "idle")
+        if close:
+            recorder.close()
+        else:
+            recorder._file.flush()
+        return recorder
+
+    def test_round_trip(self):
+        self.record_stroke()
+        self.assertEqual(os.path.getsize(self.path), HEADER.size + 12 * RECORD_DTYPE.itemsize)
+
+        records = load_recording(self.path)
+        self.assertIsInstance(records, np.memmap)
+        self.assertEqual(len(records), 12)
+        self.assertEqual(records['has_hand'].tolist(), [1] * 10 + [0, 1])
+        self.assertEqual(records['gesture'][10], NO_GESTURE)
+        self.assertAlmostEqual(float(records['landmarks'][3, 8, 0]), 0.35, places=6)
+
+    def test_unclosed_recording_is_readable(self):
+        recorder = self.record_stroke(close=False)
+        try:
+            self.assertEqual(len(load_recording(self.path)), 12)
+        finally:
+            recorder.close()
+
+    def test_rejects_other_files(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\x00' * 64)
+        with self.assertRaises(ValueError):
+            load_recording(self.path)
+
+    def test_replay_matches_direct_drawing(self):
+        self.record_stroke()
+        replayed = Canvas()
+        frames = replay(load_recording(self.path), GestureController(replayed))
+        self.assertEqual(frames, 12)
+
+        direct = Canvas()
+        for i in range(10):
+            x = float(np.float32(0.2 + 0.05 * i))
+            direct.draw((x, 0.5))
+        direct.reset_previous_points()
+
+        self.assertTrue((replayed.canvas != 255).any())
+        self.assertTrue(np.array_equal(replayed.canvas, direct.canvas))
+
+
+if __name__ == '__main__':
+    unittest.main()
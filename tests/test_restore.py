@@ -0,0 +1,105 @@
+import unittest
+import sys
+import os
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from canvas import Canvas
+from database import Database
+from helpers import DatabaseTestCase, draw_line
+from restore import SessionRestore, restore_session, restore_tiles
+
+
+class TestRestore(DatabaseTestCase):
+    def reopen(self):
+        self.db.close()
+        self.db = Database(self.db_file)
+        return Canvas(db=self.db)
+
+    def test_restore_matches_live_canvas(self):
+        canvas = Canvas(db=self.db)
+        canvas.keyframes.interval = 5
+        for i, y in enumerate(np.linspace(0.1, 0.9, 10)):
+            canvas.change_color((25 * i, 0, 255 - 25 * i))
+            canvas.change_brush_size(3 + i)
+            draw_line(canvas, y)
+        draw_line(canvas, 0.5, tool='erase')
+        draw_line(canvas, 0.3, x0=0.9, x1=0.1)
+        expected = canvas.canvas.copy()
+
+        restored = self.reopen()
+        self.assertTrue((restored.canvas == 255).all())
+        calls = []
+        image, last_id = restore_session(self.db, 640, 480, lambda done, total: calls.append((done, total)))
+        np.testing.assert_array_equal(image, expected)
+        self.assertEqual(last_id, self.db.get_all_actions()[-1]['id'])
+        # Started from the newest keyframe, so only the tail was replayed
+        self.assertEqual(calls[-1], (2, 2))
+
+    def test_restore_starts_from_saved_snapshot(self):
+        canvas = Canvas(db=self.db)
+        draw_line(canvas, 0.3)
+        canvas.start_session('save')
+        draw_line(canvas, 0.7)
+        expected = canvas.canvas.copy()
+
+        self.reopen()
+        image, _ = restore_session(self.db, 640, 480)
+        np.testing.assert_array_equal(image, expected)
+
+    def test_strokes_drawn_during_restore_are_kept(self):
+        canvas = Canvas(db=self.db)
+        draw_line(canvas, 0.3)
+        draw_line(canvas, 0.5)
+
+        canvas = self.reopen()
+        image, last_id = restore_session(self.db, 640, 480)
+        draw_line(canvas, 0.7)
+        canvas.restore(image, last_id)
+
+        expected = Canvas()
+        for y in (0.3, 0.5, 0.7):
+            draw_line(expected, y)
+        np.testing.assert_array_equal(canvas.canvas, expected.canvas)
+        self.assertEqual(canvas.take_damage(), (0, 0, 639, 479))
+        canvas.undo()
+        expected.undo()
+        np.testing.assert_array_equal(canvas.canvas, expected.canvas)
+
+    def test_background_restore_emits_image(self):
+        canvas = Canvas(db=self.db)
+        draw_line(canvas, 0.5)
+        expected = canvas.canvas.copy()
+
+        self.reopen()
+        results = []
+        restorer = SessionRestore(self.db, 640, 480)
+        restorer.restored.connect(lambda image, last_id: results.append(image))
+        restorer.run()
+        np.testing.assert_array_equal(results[0], expected)
+
+    def test_tiled_board_is_restored(self):
+        def draw(canvas):
+            for y in (0.2, 0.5, 0.8):
+                draw_line(canvas, y)
+            draw_line(canvas, 0.5, x0=0.4, x1=0.6, tool='erase')
+        draw(Canvas(2000, 1500, db=self.db, tiled=True, tile_size=128))
+        expected = Canvas(2000, 1500, tiled=True, tile_size=128)
+        draw(expected)
+        draw_line(expected, 0.9)
+
+        self.db.close()
+        self.db = Database(self.db_file)
+        canvas = Canvas(2000, 1500, db=self.db, tiled=True, tile_size=128)
+        self.assertEqual(len(canvas.canvas.tiles), 0)
+        calls = []
+        store, last_id = restore_tiles(self.db, 2000, 1500, 128, lambda done, total: calls.append((done, total)))
+        self.assertEqual(calls[-1], (4, 4))
+        # A stroke logged while the restore ran is drawn over the result
+        draw_line(canvas, 0.9)
+        canvas.restore(store, last_id)
+        np.testing.assert_array_equal(canvas.to_array(), expected.to_array())
+        self.assertEqual(set(canvas.canvas.tiles), set(expected.canvas.tiles))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+import unittest
+import sys
+import os
+import sqlite3
+import zlib
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from canvas import Canvas
+from compaction import Compactor
+from database import Database
+from helpers import DatabaseTestCase, draw_line
+from vector_export import export_vector
+
+
+class TestSessions(DatabaseTestCase):
+    def count_actions(self):
+        self.db.flush()
+        conn = sqlite3.connect(self.db_file)
+        count = conn.execute('SELECT COUNT(*) FROM drawing_actions').fetchone()[0]
+        conn.close()
+        return count
+
+    def file_size(self):
+        self.db.flush()
+        wal = self.db_file + '-wal'
+        return os.path.getsize(self.db_file) + (os.path.getsize(wal) if os.path.exists(wal) else 0)
+
+    def test_undo_stops_at_clear(self):
+        canvas = Canvas(db=self.db)
+        for y in (0.2, 0.4, 0.6):
+            draw_line(canvas, y)
+        canvas.clear()
+        draw_line(canvas, 0.8)
+        canvas.history.clear()
+
+        get_all_actions = self.db.get_all_actions
+        self.db.get_all_actions = lambda: self.fail("replay read the whole log")
+        canvas.undo()
+        canvas.undo()
+        self.db.get_all_actions = get_all_actions
+        self.assertTrue((canvas.canvas == 255).all())
+        self.assertEqual(len(get_all_actions()), 3)
+
+    def test_clear_logs_the_open_stroke(self):
+        canvas = Canvas(db=self.db)
+        draw_line(canvas, 0.3)
+        for i in range(5):
+            canvas.draw((0.1 + 0.1 * i, 0.6))
+        drawn = canvas.canvas.copy()
+        closed = self.db.session_id
+        canvas.clear()
+
+        self.assertEqual(len(self.db.get_session_actions(closed)), 2)
+        np.testing.assert_array_equal(self.db.get_snapshot(closed), drawn)
+
+    def test_session_after_save_continues_from_snapshot(self):
+        canvas = Canvas(db=self.db)
+        draw_line(canvas, 0.3)
+        saved = canvas.canvas.copy()
+        first = self.db.session_id
+        canvas.start_session('save')
+        self.assertNotEqual(self.db.session_id, first)
+        self.assertEqual(self.db.get_session(self.db.session_id)['base_session'], first)
+
+        draw_line(canvas, 0.7)
+        canvas.history.clear()
+        canvas.undo()
+        np.testing.assert_array_equal(canvas.canvas, saved)
+
+    def test_tiled_snapshot_keeps_only_allocated_tiles(self):
+        canvas = Canvas(2000, 1500, db=self.db, tiled=True, tile_size=128)
+        draw_line(canvas, 0.3, x0=0.1, x1=0.2)
+        saved = canvas.to_array()
+        closed = self.db.session_id
+        canvas.start_session('save')
+        draw_line(canvas, 0.7)
+
+        conn = sqlite3.connect(self.db_file)
+        size = conn.execute('SELECT LENGTH(snapshot) FROM sessions WHERE id = ?', (closed,)).fetchone()[0]
+        conn.close()
+        self.assertLess(size, 2000)
+        np.testing.assert_array_equal(self.db.get_snapshot(closed), saved)
+        base = self.db.get_session_base(self.db.session_id, tile_size=256)
+        self.assertEqual(base.tile_size, 256)
+        np.testing.assert_array_equal(base.to_array(), saved)
+
+        canvas.history.clear()
+        canvas.undo()
+        np.testing.assert_array_equal(canvas.to_array(), saved)
+
+    def test_drawings_and_replay_stay_in_their_session(self):
+        canvas = Canvas(db=self.db)
+        draw_line(canvas, 0.3)
+        first = self.db.session_id
+        canvas.start_session('save')
+        draw_line(canvas, 0.7)
+        canvas.end_stroke()
+        second = self.db.get_all_actions()[-1]['id']
+
+        self.assertEqual([a['id'] for a in self.db.get_actions_after(0)], [second])
+        drawing_id = self.db.save_drawing('out.png', (0, 0, 0), 'gesture')
+        conn = sqlite3.connect(self.db_file)
+        tagged = dict(conn.execute('SELECT session_id, drawing_id FROM drawing_actions').fetchall())
+        conn.close()
+        self.assertEqual(tagged, {first: None, self.db.session_id: drawing_id})
+
+    def test_open_session_is_resumed_after_restart(self):
+        canvas = Canvas(db=self.db)
+        draw_line(canvas, 0.5)
+        session = self.db.session_id
+        self.db.close()
+
+        self.db = Database(self.db_file)
+        Canvas(db=self.db)
+        self.assertEqual(self.db.session_id, session)
+        Canvas(320, 240, db=self.db)
+        self.assertNotEqual(self.db.session_id, session)
+
+    def test_compaction_keeps_only_snapshots(self):
+        canvas = Canvas(db=self.db)
+        canvas.keyframes.interval = 2
+        for y in (0.2, 0.4, 0.6, 0.8):
+            draw_line(canvas, y)
+        before_clear = canvas.canvas.copy()
+        closed = self.db.session_id
+        canvas.clear()
+        draw_line(canvas, 0.5)
+
+        self.assertEqual(Compactor(self.db).run(), 1)
+        self.assertEqual(self.count_actions(), 1)
+        session = self.db.get_session(closed)
+        self.assertEqual(session['action_count'], 4)
+        self.assertEqual(session['end_reason'], 'clear')
+        self.assertIsNotNone(session['compacted_at'])
+        np.testing.assert_array_equal(self.db.get_snapshot(closed), before_clear)
+        conn = sqlite3.connect(self.db_file)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM keyframes').fetchone()[0], 0)
+        conn.close()
+        self.assertEqual(Compactor(self.db).run(), 0)
+
+    def test_sessions_without_snapshot_are_rendered(self):
+        canvas = Canvas(db=self.db)
+        draw_line(canvas, 0.5)
+        expected = canvas.canvas.copy()
+        closed = self.db.session_id
+        Canvas(320, 240, db=self.db)
+
+        Compactor(self.db).run()
+        np.testing.assert_array_equal(self.db.get_snapshot(closed), expected)
+
+    def test_prune_and_vacuum(self):
+        canvas = Canvas(db=self.db)
+        for i in range(6):
+            for y in np.linspace(0.1, 0.9, 20):
+                draw_line(canvas, y + 0.01 * i)
+            canvas.clear()
+        compactor = Compactor(self.db, keep_sessions=2, vacuum_ratio=0.0)
+        size_before = self.file_size()
+        compactor.run()
+
+        conn = sqlite3.connect(self.db_file)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0], 2)
+        conn.close()
+        self.assertIsNotNone(self.db.get_setting('last_vacuum'))
+        self.assertLess(self.file_size(), size_before)
+        self.assertFalse(compactor.maybe_vacuum())
+
+    def test_export_draws_session_over_its_base(self):
+        canvas = Canvas(db=self.db)
+        draw_line(canvas, 0.3)
+        canvas.start_session('save')
+        draw_line(canvas, 0.7)
+        canvas.end_stroke()
+        session = self.db.session_id
+        base = self.db.get_session_base(session)
+
+        svg = os.path.join(self.tmpdir.name, 'out.svg')
+        pdf = os.path.join(self.tmpdir.name, 'out.pdf')
+        self.assertEqual(export_vector(self.db.iter_actions(session_id=session), svg, 640, 480, image=base), 1)
+        export_vector(self.db.iter_actions(session_id=session), pdf, 640, 480, image=base)
+        with open(svg) as f:
+            self.assertIn('href="data:image/png;base64,', f.read())
+        with open(pdf, 'rb') as f:
+            data = f.read()
+        self.assertIn(b'/XObject << /Im0 4 0 R >>', data)
+        start = data.index(b'stream\n', data.index(b'5 0 obj')) + len(b'stream\n')
+        content = zlib.decompress(data[start:data.index(b'\nendstream', start)])
+        self.assertIn(b'/Im0 Do', content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from PyQt5.QtCore import QCoreApplication
+from database import Database
+from startup import StartupTimer, Warmup
+
+
+class TestStartupTimer(unittest.TestCase):
+    def test_marks_are_recorded_once(self):
+        timer = StartupTimer(start=time.perf_counter())
+        first = timer.mark('stage')
+        time.sleep(0.01)
+        self.assertEqual(timer.mark('stage'), first)
+        self.assertEqual(list(timer.summary()), ['stage'])
+
+
+class TestWarmup(unittest.TestCase):
+    def test_prepares_tracker_and_source_in_background(self):
+        app = QCoreApplication.instance() or QCoreApplication([])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_file = os.path.join(tmpdir, 'test.db')
+            db = Database(db_file, use_journal=False)
+            db.save_setting('frame_source', 'synthetic')
+
+            warmup = Warmup(db_file)
+            ready = []
+            warmup.ready.connect(lambda: ready.append(True))
+            warmup.start()
+            self.assertIsNotNone(warmup.wait_for_db(timeout=10))
+
+            deadline = time.monotonic() + 30
+            while not ready and time.monotonic() < deadline:
+                app.processEvents()
+                time.sleep(0.01)
+            self.assertTrue(ready)
+
+            db, tracker, source, camera_index, cameras = warmup.take()
+            self.assertIsNotNone(tracker)
+            self.assertTrue(source.is_opened())
+            self.assertEqual(camera_index, 0)
+            self.assertIsNone(warmup.source)
+            source.release()
+            db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
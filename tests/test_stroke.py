@@ -0,0 +1,134 @@
+import unittest
+import sys
+import os
+import tempfile
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from canvas import Canvas
+from database import Database
+from gestures import GestureController
+from stroke import Stroke
+
+
+class TestStroke(unittest.TestCase):
+    def test_points_are_packed_int16(self):
+        stroke = Stroke("draw", (1, 2, 3), 4)
+        stroke.add_point((10, 20))
+        stroke.add_point((30, 40))
+        self.assertEqual(len(stroke), 2)
+        self.assertEqual(stroke.points.typecode, 'h')
+        self.assertEqual(stroke.point_list(), [(10, 20), (30, 40)])
+        self.assertEqual(stroke.last_point(), (30, 40))
+
+    def test_round_trip_through_action_row(self):
+        stroke = Stroke("erase", (255, 255, 255), 20, [1, 2, 3, 4], 1.0, 2.0)
+        action = {'action_type': 'erase', 'points': [[1, 2], [3, 4]], 'color': [255, 255, 255],
+                  'width': 20, 'started_at': 1.0, 'ended_at': 2.0}
+        copy = Stroke.from_action(action, default_width=5)
+        self.assertEqual(copy.point_list(), stroke.point_list())
+        self.assertEqual(copy.width, 20)
+        self.assertEqual(copy.color, (255, 255, 255))
+
+
+class TestStrokeCanvas(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.tmpdir.name, 'test.db'))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_one_row_per_stroke(self):
+        canvas = Canvas(db=self.db)
+        for i in range(20):
+            canvas.draw((0.1 + i * 0.02, 0.5))
+        canvas.reset_previous_points()
+        canvas.erase((0.2, 0.5))
+        canvas.erase((0.3, 0.5))
+        canvas.reset_previous_points()
+
+        actions = self.db.get_all_actions()
+        self.assertEqual([a['action_type'] for a in actions], ['draw', 'erase'])
+        self.assertEqual(len(actions[0]['points']), 20)
+        self.assertEqual(actions[0]['width'], canvas.brush_size)
+        self.assertEqual(len(canvas.history), 2)
+
+    def test_replay_uses_recorded_width(self):
+        canvas = Canvas(db=self.db)
+        canvas.change_brush_size(25)
+        canvas.draw((0.2, 0.5))
+        canvas.draw((0.8, 0.5))
+        canvas.reset_previous_points()
+        canvas.draw((0.2, 0.2))
+        canvas.draw((0.8, 0.2))
+        canvas.reset_previous_points()
+        expected = canvas.canvas.copy()
+        canvas.draw((0.5, 0.1))
+        canvas.draw((0.5, 0.9))
+        canvas.reset_previous_points()
+
+        canvas.change_brush_size(3)
+        canvas.history.clear()
+        canvas.undo()
+        np.testing.assert_array_equal(canvas.canvas, expected)
+
+    def test_switching_tool_ends_stroke(self):
+        canvas = Canvas(db=self.db)
+        canvas.draw((0.1, 0.1))
+        canvas.draw((0.2, 0.2))
+        canvas.erase((0.5, 0.5))
+        canvas.draw((0.6, 0.6))
+        canvas.draw((0.7, 0.7))
+        canvas.reset_previous_points()
+        self.assertEqual([a['action_type'] for a in self.db.get_all_actions()],
+                         ['draw', 'erase', 'draw'])
+
+    def test_erase_gesture_sweeps_one_stroke(self):
+        canvas = Canvas(db=self.db)
+        canvas.canvas[:] = 0
+        gestures = GestureController(canvas)
+        positions = np.zeros((21, 3), dtype=np.float32)
+        for x in (0.2, 0.4, 0.6):
+            positions[[8, 12], 0] = x
+            positions[[8, 12], 1] = (0.48, 0.52)
+            gestures.handle("erase", positions)
+        gestures.handle("idle", positions)
+
+        actions = self.db.get_all_actions()
+        self.assertEqual([a['action_type'] for a in actions], ['erase'])
+        self.assertEqual(actions[0]['width'], gestures.erase_width)
+        self.assertEqual(len(canvas.history), 1)
+        # No gaps between frames: the whole swept band is cleared
+        band = canvas.canvas[235:245, int(0.2 * 640):int(0.6 * 640)]
+        self.assertTrue((band == 255).all())
+        self.assertTrue((canvas.canvas[240, :int(0.2 * 640) - 20] == 0).all())
+
+    def test_gap_in_tracking_ends_the_stroke(self):
+        canvas = Canvas(db=self.db)
+        canvas.canvas[:] = 0
+        gestures = GestureController(canvas, max_gap=0.2)
+        positions = np.zeros((21, 3), dtype=np.float32)
+
+        def erase(x, now):
+            positions[[8, 12], 0] = x
+            positions[[8, 12], 1] = (0.48, 0.52)
+            gestures.handle("erase", positions, now=now)
+
+        erase(0.1, 0.0)
+        erase(0.2, 0.1)
+        gestures.lost_tracking()
+        erase(0.4, 0.2)
+        # Hand found again, but too long after the last point
+        erase(0.7, 1.0)
+        erase(0.8, 1.1)
+        gestures.handle("idle", positions)
+
+        self.assertEqual([len(a['points']) for a in self.db.get_all_actions()], [2, 1, 2])
+        # Nothing was swept across either gap
+        self.assertTrue((canvas.canvas[240, int(0.25 * 640):int(0.35 * 640)] == 0).all())
+        self.assertTrue((canvas.canvas[240, int(0.45 * 640):int(0.65 * 640)] == 0).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
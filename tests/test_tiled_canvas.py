@@ -0,0 +1,127 @@
+import unittest
+import sys
+import os
+import tempfile
+import numpy as np
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QColor
+from canvas import Canvas
+from canvas_widget import CanvasWidget
+from database import Database
+from tiled_canvas import TileStore, Viewport
+
+
+def draw_path(canvas, points):
+    for point in points:
+        canvas.draw(point)
+    canvas.reset_previous_points()
+
+
+class TestTileStore(unittest.TestCase):
+    def test_allocates_only_where_ink_lands(self):
+        store = TileStore(1000, 600, tile_size=100)
+        region = store[50:250, 150:350]
+        self.assertTrue((region == 255).all())
+        self.assertEqual(len(store.tiles), 0)
+
+        region[100:110, 0:200] = 0
+        store[50:250, 150:350] = region
+        self.assertEqual(sorted(store.tiles), [(1, 1), (1, 2), (1, 3)])
+        self.assertTrue((store[150:160, 150:350] == 0).all())
+        self.assertTrue((store[0:50, :] == 255).all())
+
+        # Erasing the ink frees the tiles again
+        store[150:160, 150:350] = 255
+        self.assertEqual(len(store.tiles), 0)
+
+    def test_clear_and_memmap(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = TileStore(512, 512, tile_size=128, path=os.path.join(tmpdir, 'tiles.bin'))
+            store[10:20, 300:310] = 7
+            self.assertEqual(list(store.tiles), [(0, 2)])
+            self.assertIsInstance(store.tiles[(0, 2)], np.memmap)
+            self.assertEqual(int(store.to_array()[15, 305, 0]), 7)
+            store[:] = 255
+            self.assertEqual(len(store.tiles), 0)
+            del store
+
+
+class TestViewport(unittest.TestCase):
+    def test_zoom_keeps_point_under_cursor(self):
+        viewport = Viewport(8000, 6000, 640, 480)
+        viewport.pan(-1000, -500)
+        before = viewport.to_canvas(200 / 640, 100 / 480)
+        viewport.zoom_at(2.0, 200, 100)
+        self.assertEqual(viewport.zoom, 2.0)
+        after = viewport.to_canvas(200 / 640, 100 / 480)
+        self.assertLessEqual(abs(after[0] - before[0]), 1)
+        self.assertLessEqual(abs(after[1] - before[1]), 1)
+
+    def test_pan_and_zoom_are_clamped(self):
+        viewport = Viewport(8000, 6000, 640, 480)
+        viewport.pan(500, 500)
+        self.assertEqual((viewport.x, viewport.y), (0.0, 0.0))
+        viewport.zoom_at(1e-6, 0, 0)
+        self.assertAlmostEqual(viewport.zoom, 0.08)
+        self.assertEqual(viewport.visible_rect(), (0, 0, 8000, 6000))
+
+
+class TestTiledCanvas(unittest.TestCase):
+    path = [(0.1 + 0.02 * i, 0.2 + 0.01 * i) for i in range(30)]
+
+    def test_matches_dense_canvas(self):
+        dense = Canvas(2048, 1536)
+        tiled = Canvas(2048, 1536, tiled=True)
+        tiled.viewport.fit()
+        draw_path(dense, self.path)
+        draw_path(tiled, self.path)
+
+        self.assertTrue(np.array_equal(tiled.to_array(), dense.canvas))
+        self.assertLess(tiled.canvas.nbytes, dense.canvas.nbytes / 4)
+
+        tiled.undo()
+        self.assertEqual(len(tiled.canvas.tiles), 0)
+        tiled.redo()
+        self.assertTrue(np.array_equal(tiled.to_array(), dense.canvas))
+
+    def test_large_board_stays_sparse_and_replays(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = Database(os.path.join(tmpdir, 'test.db'))
+            canvas = Canvas(7680, 4320, db=db, tiled=True)
+            canvas.viewport.zoom_at(1.0, 0, 0)
+            canvas.viewport.pan(-3000, -2000)
+            draw_path(canvas, self.path)
+            tiles = dict(canvas.canvas.tiles)
+            self.assertLessEqual(len(tiles), 4)
+            self.assertTrue(all(3000 <= tx * 256 + 256 and ty * 256 + 256 >= 2000 for ty, tx in tiles))
+
+            expected = canvas.to_array()
+            canvas.redraw_from_history()
+            self.assertEqual(sorted(canvas.canvas.tiles), sorted(tiles))
+            self.assertTrue(np.array_equal(canvas.to_array(), expected))
+            db.close()
+
+
+class TestTiledWidget(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def test_paints_visible_tiles_through_viewport(self):
+        canvas = Canvas(4096, 4096, tiled=True)
+        widget = CanvasWidget(canvas)
+        widget.setFixedSize(640, 480)
+        canvas.viewport.zoom_at(2.0, 0, 0)
+        canvas.draw((0.25, 0.5))
+        canvas.draw((0.75, 0.5))
+        canvas.reset_previous_points()
+
+        image = widget.grab().toImage()
+        self.assertEqual(QColor(image.pixel(320, 240)), QColor(0, 0, 0))
+        self.assertEqual(QColor(image.pixel(320, 100)), QColor(255, 255, 255))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import sys
+import os
+import math
+import re
+import tempfile
+import zlib
+import xml.etree.ElementTree as ET
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from canvas import Canvas
+from database import Database
+from vector_export import export_vector, iter_polylines, MAX_POLYLINE_POINTS
+
+SVG = '{http://www.w3.org/2000/svg}'
+
+
+def action(tool, points, color=(0, 0, 0), width=4):
+    return {'action_type': tool, 'points': points, 'color': color, 'width': width}
+
+
+class TestIterPolylines(unittest.TestCase):
+    def test_joined_segments_merge(self):
+        actions = [action('draw', [(0, 0), (10, 0)]),
+                   action('draw', [(10, 0), (10, 10)]),
+                   action('draw', [(10, 10), (0, 10)])]
+        lines = list(iter_polylines(actions))
+        self.assertEqual(lines, [([(0, 0), (10, 0), (10, 10), (0, 10)], (0, 0, 0), 4)])
+
+    def test_style_change_or_gap_starts_a_new_polyline(self):
+        actions = [action('draw', [(0, 0), (10, 0)]),
+                   action('draw', [(10, 0), (20, 0)], color=(255, 0, 0)),
+                   action('draw', [(30, 0), (40, 0)], color=(255, 0, 0)),
+                   action('erase', [(40, 0), (50, 0)], color=None, width=None)]
+        lines = list(iter_polylines(actions))
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[3], ([(40, 0), (50, 0)], (255, 255, 255), 20))
+
+    def test_straight_runs_collapse_to_their_ends(self):
+        lines = list(iter_polylines([action('draw', [(0, 0), (1, 1), (2, 2), (3, 3), (3, 4)])]))
+        self.assertEqual(lines[0][0], [(0, 0), (3, 3), (3, 4)])
+
+    def test_long_runs_are_split_without_gaps(self):
+        points = [(i, 3 * (i % 2)) for i in range(MAX_POLYLINE_POINTS * 2 + 10)]
+        lines = list(iter_polylines([action('draw', points)]))
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(all(len(p) <= MAX_POLYLINE_POINTS for p, _, _ in lines))
+        self.assertEqual(lines[1][0][0], lines[0][0][-1])
+        self.assertEqual(sum(len(p) for p, _, _ in lines), len(points) + 2)
+
+
+class TestVectorExport(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.tmpdir.name, 'test.db'))
+        self.canvas = Canvas(db=self.db)
+        for row in range(20):
+            y = 0.05 + row * 0.045
+            for i in range(30):
+                self.canvas.draw((0.1 + i * 0.025, y + 0.015 * math.sin(i / 3 + row)))
+            self.canvas.end_stroke()
+        self.canvas.erase((0.5, 0.5))
+        self.canvas.erase((0.6, 0.6))
+        self.canvas.end_stroke()
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_svg_has_one_path_per_stroke(self):
+        count = export_vector(self.db.iter_actions(batch_size=3), self.path('out.svg'), 640, 480)
+        self.assertEqual(count, 21)
+        root = ET.parse(self.path('out.svg')).getroot()
+        self.assertEqual(root.get('viewBox'), '0 0 640 480')
+        paths = root.iter(SVG + 'path')
+        first = next(paths)
+        self.assertEqual(first.get('stroke'), '#000000')
+        self.assertEqual(first.get('stroke-width'), '10')
+        self.assertTrue(first.get('d').startswith('M64,'))
+        self.assertEqual(list(paths)[-1].get('stroke'), '#ffffff')
+
+    def test_pdf_is_well_formed(self):
+        count = export_vector(self.db.iter_actions(), self.path('out.pdf'), 640, 480)
+        self.assertEqual(count, 21)
+        with open(self.path('out.pdf'), 'rb') as f:
+            data = f.read()
+        self.assertTrue(data.startswith(b'%PDF-1.4'))
+        self.assertTrue(data.rstrip().endswith(b'%%EOF'))
+
+        xref = int(re.search(rb'startxref\n(\d+)', data).group(1))
+        self.assertTrue(data[xref:].startswith(b'xref'))
+        offsets = [int(o) for o in re.findall(rb'(\d{10}) 00000 n', data)]
+        for number, offset in enumerate(offsets, 1):
+            self.assertTrue(data[offset:].startswith(b'%d 0 obj' % number))
+
+        length = int(re.search(rb'5 0 obj\n(\d+)', data).group(1))
+        start = data.index(b'stream\n') + len(b'stream\n')
+        content = zlib.decompress(data[start:start + length]).decode()
+        self.assertEqual(content.count(' S\n'), 21)
+
+    def test_vector_output_is_smaller_than_png(self):
+        export_vector(self.db.iter_actions(), self.path('out.svg'), 640, 480)
+        export_vector(self.db.iter_actions(), self.path('out.pdf'), 640, 480)
+        self.canvas.save(self.path('out.png'))
+        png = os.path.getsize(self.path('out.png'))
+        self.assertLess(os.path.getsize(self.path('out.pdf')), png)
+        self.assertLess(os.path.getsize(self.path('out.svg')), png)
+
+    def test_unknown_extension_is_rejected(self):
+        with self.assertRaises(ValueError):
+            export_vector([], self.path('out.bmp'), 640, 480)
+
+
+if __name__ == '__main__':
+    unittest.main()